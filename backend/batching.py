@@ -0,0 +1,156 @@
+"""
+Dynamic micro-batching.
+
+Concurrent requests submit single items; a worker thread collects them
+for up to ``max_wait_ms`` (or until ``max_batch_size`` items are waiting),
+runs them through one batched model call and hands each caller its own
+result.
+"""
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+from backend.config import settings
+from backend.executors import Overloaded
+from backend.metrics import batch_latency, batch_size, rejected, stage_errors
+from backend.registry import registry
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        max_pending: int = 64,
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_pending = max(1, max_pending)
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pending = 0
+        self._batches = 0
+        self._items = 0
+
+    # ----- public -----
+
+    def submit(self, item: Any) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                rejected.inc(queue=self.name)
+                raise Overloaded(self.name)
+            self._pending += 1
+            self._ensure_worker()
+
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    async def run(self, item: Any) -> Any:
+        return await asyncio.wrap_future(self.submit(item))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "pending": self._pending,
+            "batches": self._batches,
+            "mean_batch_size": (self._items / self._batches) if self._batches else 0.0,
+        }
+
+    # ----- internals -----
+
+    def _ensure_worker(self) -> None:
+        # started lazily so a worker thread is never inherited across fork()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._worker, name=f"viralens-batch-{self.name}", daemon=True
+            )
+            self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                self._run_batch(batch)
+            finally:
+                with self._lock:
+                    self._pending -= len(batch)
+
+    def _run_batch(self, batch) -> None:
+        # drop callers that gave up while waiting
+        live = [(item, fut) for item, fut in batch if fut.set_running_or_notify_cancel()]
+        if not live:
+            return
+
+        start = time.perf_counter()
+        try:
+            results = list(self.batch_fn([item for item, _ in live]))
+            if len(results) != len(live):
+                raise RuntimeError(
+                    f"{self.name}: batch_fn returned {len(results)} results for {len(live)} items"
+                )
+        except Exception as e:
+            stage_errors.inc(stage=self.name, error=type(e).__name__)
+            for _, fut in live:
+                fut.set_exception(e)
+            return
+
+        batch_latency.observe(time.perf_counter() - start, batcher=self.name)
+        batch_size.observe(len(live), batcher=self.name)
+        self._batches += 1
+        self._items += len(live)
+        for (_, fut), result in zip(live, results):
+            fut.set_result(result)
+
+
+detector_batcher = MicroBatcher(
+    "detector",
+    lambda images: registry.detector.load_batch(images),
+    max_batch_size=settings.detect_batch_size,
+    max_wait_ms=settings.detect_batch_wait_ms,
+    max_pending=settings.detect_batch_queue,
+)
+
+caption_batcher = MicroBatcher(
+    "caption",
+    lambda captions: registry.caption.analyze_batch(captions),
+    max_batch_size=settings.caption_batch_size,
+    max_wait_ms=settings.caption_batch_wait_ms,
+    max_pending=settings.caption_batch_queue,
+)
+
+
+clip_batcher = MicroBatcher(
+    "clip",
+    lambda images: list(registry.clip.embed_images(images)),
+    max_batch_size=settings.clip_batch_size,
+    max_wait_ms=settings.clip_batch_wait_ms,
+    max_pending=settings.clip_batch_queue,
+)
+
+
+def batcher_stats() -> Dict[str, Dict[str, Any]]:
+    return {b.name: b.stats() for b in (detector_batcher, caption_batcher, clip_batcher)}
@@ -0,0 +1,287 @@
+"""
+Content-addressed cache for pipeline stage outputs.
+
+Keys are "<namespace>:<stage>:<sha256 of the input>" (image bytes for
+the image stages, caption text for the caption stage). The namespace is
+settings.cache_namespace plus a fingerprint of the engine settings that
+change stage outputs, so switching e.g. the detector model or the colour
+mode never serves results computed under the old configuration. Values
+live in an in-memory LRU bounded by total pickled size, and optionally
+in an on-disk tier, also LRU and size-bounded, that survives restarts.
+Concurrent requests for the same key share a single computation.
+"""
+import asyncio
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from backend.config import settings
+from backend.metrics import cache_lookups
+
+
+# where a value came from
+MEMORY = "memory"
+DISK = "disk"
+COALESCED = "coalesced"
+MISS = "miss"
+
+
+def content_digest(data: Union[bytes, str]) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+# settings that change what a cached stage returns
+FINGERPRINT_SETTINGS = (
+    "detector_model", "detector_imgsz", "detector_classes", "detector_max_det", "detector_conf",
+    "clip_backend", "caption_backend",
+    "color_mode", "color_pixel_budget",
+    "geometry_max_side",
+)
+_fingerprints: Dict[Tuple, str] = {}
+
+
+def settings_fingerprint() -> str:
+    """Short, process-independent hash of FINGERPRINT_SETTINGS."""
+    values = tuple(getattr(settings, name) for name in FINGERPRINT_SETTINGS)
+    fp = _fingerprints.get(values)
+    if fp is None:
+        fp = _fingerprints[values] = hashlib.sha256(repr(values).encode("utf-8")).hexdigest()[:12]
+    return fp
+
+
+def stage_key(stage: str, digest: str) -> str:
+    return f"{settings.cache_namespace}-{settings_fingerprint()}:{stage}:{digest}"
+
+
+def _stage_of(key: str) -> str:
+    # "<namespace>:<stage>:<digest>" -> stage
+    parts = key.split(":")
+    return parts[1] if len(parts) == 3 else "other"
+
+
+class ResultCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 disk_max_bytes: Optional[int] = None):
+        self.max_bytes = max(0, max_bytes)
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+
+        self._mem: "OrderedDict[str, bytes]" = OrderedDict()
+        self._mem_bytes = 0
+        # disk entry path -> size, least recently used first
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._scan_disk()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._counts = {"hits_memory": 0, "hits_disk": 0, "coalesced": 0, "misses": 0}
+
+    # ----- memory tier -----
+
+    def _mem_get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            blob = self._mem.get(key)
+            if blob is not None:
+                self._mem.move_to_end(key)
+            return blob
+
+    def _mem_put(self, key: str, blob: bytes) -> None:
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._mem.pop(key, None)
+            if old is not None:
+                self._mem_bytes -= len(old)
+            self._mem[key] = blob
+            self._mem_bytes += len(blob)
+            while self._mem_bytes > self.max_bytes:
+                _, evicted = self._mem.popitem(last=False)
+                self._mem_bytes -= len(evicted)
+
+    # ----- disk tier -----
+
+    def _disk_path(self, key: str) -> str:
+        name = key.replace(":", "_")
+        return os.path.join(self.disk_dir, name[-2:], name + ".pkl")
+
+    def _scan_disk(self) -> None:
+        # recency survives restarts as the files' mtime
+        entries = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if not name.endswith(".pkl"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, path, st.st_size))
+        for _, path, size in sorted(entries):
+            self._disk[path] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _touch_disk(self, path: str, size: int) -> None:
+        with self._lock:
+            old = self._disk.pop(path, None)
+            if old is not None:
+                self._disk_bytes -= old
+            self._disk[path] = size
+            self._disk_bytes += size
+
+    def _evict_disk(self) -> None:
+        if self.disk_max_bytes is None:
+            return
+        victims = []
+        with self._lock:
+            while self._disk_bytes > self.disk_max_bytes and self._disk:
+                path, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                victims.append(path)
+        for path in victims:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass  # already gone (e.g. evicted by another worker)
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._touch_disk(path, len(blob))
+        return blob
+
+    def _disk_put(self, key: str, blob: bytes) -> None:
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write-then-rename so readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return
+        self._touch_disk(path, len(blob))
+        self._evict_disk()
+
+    # ----- public -----
+
+    async def get(self, key: str, record: bool = True) -> Tuple[bool, Any, str]:
+        """
+        Returns (found, value, source). The lookup is counted in stats()
+        and the cache lookup metric unless record is False (for callers
+        that count it themselves).
+        """
+        found, value, source = await self._get(key)
+        if record:
+            if not found:
+                self._counts["misses"] += 1
+            cache_lookups.inc(stage=_stage_of(key), source=source)
+        return found, value, source
+
+    async def _get(self, key: str) -> Tuple[bool, Any, str]:
+        blob = self._mem_get(key)
+        if blob is not None:
+            self._counts["hits_memory"] += 1
+            return True, pickle.loads(blob), MEMORY
+
+        if self.disk_dir:
+            blob = await asyncio.to_thread(self._disk_get, key)
+            if blob is not None:
+                try:
+                    value = pickle.loads(blob)
+                except Exception:
+                    value, blob = None, None  # unreadable entry: treat as a miss
+                if blob is not None:
+                    self._mem_put(key, blob)
+                    self._counts["hits_disk"] += 1
+                    return True, value, DISK
+
+        return False, None, MISS
+
+    async def put(self, key: str, value: Any) -> None:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._mem_put(key, blob)
+        if self.disk_dir:
+            await asyncio.to_thread(self._disk_put, key, blob)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+        """
+        Return the cached value for key, or compute and store it. Callers
+        asking for a key that is already being computed wait for that
+        result instead of computing it again. Returns (value, source).
+        """
+        stage = _stage_of(key)
+        found, value, source = await self.get(key, record=False)
+        if found:
+            cache_lookups.inc(stage=stage, source=source)
+            return value, source
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._counts["coalesced"] += 1
+            cache_lookups.inc(stage=stage, source=COALESCED)
+            return await asyncio.shield(task), COALESCED
+
+        self._counts["misses"] += 1
+        cache_lookups.inc(stage=stage, source=MISS)
+        # the computation is its own task, so it keeps going for the other
+        # waiters even if the caller that started it is cancelled
+        task = asyncio.ensure_future(self._compute_and_store(key, compute))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task), MISS
+
+    async def _compute_and_store(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        value = await compute()
+        await self.put(key, value)
+        return value
+
+    def _finish(self, key: str, task: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter went away
+
+    def stats(self) -> Dict[str, Any]:
+        counts = dict(self._counts)
+        hits = counts["hits_memory"] + counts["hits_disk"] + counts["coalesced"]
+        total = hits + counts["misses"]
+        return {
+            **counts,
+            "hit_rate": (hits / total) if total else 0.0,
+            "entries": len(self._mem),
+            "bytes": self._mem_bytes,
+            "max_bytes": self.max_bytes,
+            "disk_dir": self.disk_dir,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+            "disk_max_bytes": self.disk_max_bytes,
+        }
+
+
+result_cache = ResultCache(
+    max_bytes=settings.cache_max_bytes if settings.cache_enabled else 0,
+    disk_dir=settings.cache_dir if settings.cache_enabled else None,
+    disk_max_bytes=settings.cache_disk_max_bytes,
+)
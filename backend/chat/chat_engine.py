@@ -1,6 +1,5 @@
 import os
 from typing import Optional, Dict, Any
-from openai import OpenAI
 
 
 class ChatEngine:
@@ -9,7 +8,8 @@ class ChatEngine:
         if not api_key:
             raise ValueError("GROQ_API_KEY environment variable is missing")
 
-        # Groq OpenAI-compatible client
+        # Groq OpenAI-compatible client (imported here: openai is slow to import)
+        from openai import OpenAI
         self.client = OpenAI(
             api_key=api_key,
             base_url="https://api.groq.com/openai/v1",
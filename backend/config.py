@@ -0,0 +1,152 @@
+"""
+Service settings.
+
+Every field can be overridden with an environment variable named
+VIRALENS_<FIELD_NAME>, e.g. VIRALENS_INFERENCE_WORKERS=4.
+"""
+import os
+import typing
+from dataclasses import dataclass, fields
+from typing import Any, Optional
+
+
+_TRUE = {"1", "true", "yes", "on"}
+
+
+def _parse(raw: str, type_: Any) -> Any:
+    # Optional[X] -> X, with "" meaning None
+    if typing.get_origin(type_) is typing.Union:
+        args = [a for a in typing.get_args(type_) if a is not type(None)]
+        if raw.strip() == "":
+            return None
+        type_ = args[0]
+
+    if type_ is bool:
+        return raw.strip().lower() in _TRUE
+    if type_ in (int, float):
+        return type_(raw)
+    return raw
+
+
+@dataclass
+class Settings:
+    # Load every engine in the background right after startup instead of
+    # on first request; routes answer 503 "warming_up" until theirs is ready
+    warmup: bool = True
+
+    # Threads for model calls that don't go through a micro-batcher:
+    # trend-bank lookups, aesthetic scores, /caption/batch and the
+    # batched calls of /full/batch (the models live in this process and
+    # torch releases the GIL). Single-item YOLO / CLIP / caption calls
+    # run on the three batcher threads instead, so up to
+    # inference_workers + 3 model calls can run at once.
+    inference_workers: int = 2
+    inference_queue: int = 16
+
+    # CPU-bound work (KMeans, SSIM, Canny): "thread" or "process"
+    cpu_pool: str = "thread"
+    cpu_workers: int = 4
+    cpu_queue: int = 32
+
+    # YOLO detector. Only the largest box is used (rule of thirds), so a
+    # CPU-friendly setup is e.g. detector_imgsz=320, detector_max_det=20
+    # and an exported model (cv_engine.detector.export_detector).
+    # detector_classes: comma-separated class ids to keep ("" = all)
+    # detector_device: e.g. "cpu" or "cuda:0" ("" = ultralytics picks)
+    detector_model: str = "yolov8n.pt"
+    detector_imgsz: int = 640
+    detector_classes: Optional[str] = None
+    detector_max_det: int = 300
+    detector_conf: float = 0.25
+    detector_device: Optional[str] = None
+
+    # Detector micro-batching: wait up to detect_batch_wait_ms for up to
+    # detect_batch_size images, then run them in one YOLO forward pass
+    detect_batch_size: int = 8
+    detect_batch_wait_ms: float = 5.0
+    detect_batch_queue: int = 64
+
+    # Caption micro-batching (single /caption and /full requests) and the
+    # largest list accepted by /caption/batch
+    caption_batch_size: int = 16
+    caption_batch_wait_ms: float = 5.0
+    caption_batch_queue: int = 128
+    caption_batch_limit: int = 1000
+
+    # CLIP image-embedding micro-batching (the one CLIP pass per image
+    # shared by trend similarity and the aesthetic score)
+    clip_batch_size: int = 16
+    clip_batch_wait_ms: float = 5.0
+    clip_batch_queue: int = 64
+
+    # CLIP image tower: "torch", "int8" (torch dynamic quantization),
+    # "onnx" or "onnx-int8" (onnxruntime; exported graphs are cached in
+    # clip_onnx_dir, default ~/.cache/viralens)
+    clip_backend: str = "torch"
+    clip_onnx_dir: Optional[str] = None
+
+    # /full/batch: items processed together (bounds memory) and the most
+    # items accepted per request
+    full_batch_chunk: int = 8
+    full_batch_limit: int = 500
+
+    # Stage result cache: in-memory LRU of at most cache_max_bytes, plus
+    # an optional on-disk LRU tier of at most cache_disk_max_bytes. Keys
+    # already include the engine settings that affect results; bump
+    # cache_namespace to invalidate both tiers for any other reason.
+    cache_enabled: bool = True
+    cache_max_bytes: int = 64 * 1024 * 1024
+    cache_dir: Optional[str] = None
+    cache_disk_max_bytes: int = 1024 * 1024 * 1024
+    cache_namespace: str = "v1"
+
+    # Caption feature cache inside CaptionAnalyzer (shared by /caption and
+    # /full): entry count and optional time-to-live in seconds
+    caption_cache_size: int = 4096
+    caption_cache_ttl: Optional[float] = None
+
+    # Sentiment model behind CaptionAnalyzer: same choices as clip_backend
+    # ("torch", "int8", "onnx", "onnx-int8"); exports are cached in
+    # caption_onnx_dir, default ~/.cache/viralens
+    caption_backend: str = "torch"
+    caption_onnx_dir: Optional[str] = None
+
+    # Dominant colors: "fast" clusters an area-downsampled copy of at most
+    # color_pixel_budget pixels, "exact" clusters every pixel
+    color_mode: str = "fast"
+    color_pixel_budget: int = 65536
+
+    # Symmetry / clutter run on a copy whose longer side is at most this
+    # many pixels ("" = full resolution)
+    geometry_max_side: Optional[int] = 1024
+
+    # Viral-bank nearest-neighbour index: "exact", "ivf" or "auto" (exact
+    # up to trend_index_threshold embeddings, then IVF probing
+    # trend_nprobe cells per query)
+    trend_index: str = "auto"
+    trend_index_threshold: int = 50000
+    trend_nprobe: int = 16
+
+    # Viral-bank segment dtype for a new bank: "float32" is searched in
+    # place from the page cache, "float16" halves disk and cache size
+    trend_bank_dtype: str = "float32"
+
+    # ?profile=sample writes collapsed-stack profiles here (off when
+    # unset), sampling every profile_interval_ms
+    profile_dir: Optional[str] = None
+    profile_interval_ms: float = 5.0
+
+    # Seconds clients are told to wait after a 503
+    retry_after: int = 1
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        values = {}
+        for f in fields(cls):
+            raw = os.getenv(f"VIRALENS_{f.name.upper()}")
+            if raw is not None:
+                values[f.name] = _parse(raw, f.type)
+        return cls(**values)
+
+
+settings = Settings.from_env()
@@ -0,0 +1,112 @@
+"""
+Bounded executors for blocking work.
+
+Routers are async, but decoding, KMeans, SSIM and the models are
+blocking. Work is submitted to one of the pools below (or, for single
+YOLO / CLIP / caption calls, to a backend.batching micro-batcher)
+instead of running on the event loop. Each pool accepts at most
+``max_workers`` running plus ``max_queue`` waiting calls; anything
+beyond that is rejected straight away with ``Overloaded`` (turned into
+a 503 by backend.main).
+"""
+import asyncio
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from backend.config import settings
+from backend.metrics import rejected
+
+
+class Overloaded(RuntimeError):
+    """Raised when a pool has no room left for more work."""
+
+    def __init__(self, pool: str):
+        super().__init__(f"{pool} pool is at capacity")
+        self.pool = pool
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, max_workers: int, max_queue: int, kind: str = "thread"):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown pool kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    @property
+    def pending(self) -> int:
+        """Running + queued calls."""
+        return self._pending
+
+    def _get_executor(self):
+        # created on first use so a pool is never inherited across fork()
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.max_workers,
+                            thread_name_prefix=f"viralens-{self.name}",
+                        )
+        return self._executor
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        with self._lock:
+            if self._pending >= self.capacity:
+                rejected.inc(queue=self.name)
+                raise Overloaded(self.name)
+            self._pending += 1
+
+        try:
+            future = self._get_executor().submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn in the pool and await its result."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+inference_pool = BoundedExecutor(
+    "inference", settings.inference_workers, settings.inference_queue, kind="thread"
+)
+cpu_pool = BoundedExecutor(
+    "cpu", settings.cpu_workers, settings.cpu_queue, kind=settings.cpu_pool
+)
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    return {pool.name: pool.stats() for pool in (inference_pool, cpu_pool)}
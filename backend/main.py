@@ -1,8 +1,12 @@
+import time
+from contextlib import asynccontextmanager
+
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from backend.routers.detect_router import router as detect_router
 from backend.routers.caption_router import router as caption_router
@@ -11,9 +15,24 @@ from backend.routers.virality_router import router as virality_router
 from backend.routers.full_router import router as full_router
 from backend.routers.chat_router import router as chat_router
 from backend.image_gen.image_router import router as image_router
+from backend.registry import WarmingUp, registry
+from backend.config import settings
+from backend.executors import Overloaded, pool_stats
+from backend.batching import batcher_stats
+from backend.cache import result_cache
+from backend.metrics import http_latency, http_requests, metrics as prometheus
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load every engine in the background so the server answers (and
+    # /healthz passes) straight away; /readyz turns 200 once loaded
+    if settings.warmup:
+        registry.warmup_in_background()
+    yield
 
-app = FastAPI(title="ViraLens API", version="1.0")
+
+app = FastAPI(title="ViraLens API", version="1.0", lifespan=lifespan)
 
 # CORS for frontend
 app.add_middleware(
@@ -24,12 +43,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # the route template (not the raw path) keeps label cardinality bounded
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        http_latency.observe(time.perf_counter() - start, method=request.method, route=path)
+        http_requests.inc(method=request.method, route=path, status=str(status))
+
+
+def requires(*engines):
+    """Route dependency: 503 "warming_up" while any of the engines is loading."""
+    def check():
+        registry.require(engines)
+    return Depends(check)
+
+
+ANALYSIS_ENGINES = ("detector", "clip", "trend", "aesthetic", "caption", "color", "scorer")
+
 # Register routes
-app.include_router(detect_router, prefix="/detect", tags=["Detection"])
-app.include_router(caption_router, prefix="/caption", tags=["Caption"])
-app.include_router(trend_router, prefix="/trend", tags=["Trend"])
-app.include_router(virality_router, prefix="/virality", tags=["Virality"])
-app.include_router(full_router, prefix="/full", tags=["Full Analysis"])
+app.include_router(detect_router, prefix="/detect", tags=["Detection"],
+                   dependencies=[requires("detector")])
+app.include_router(caption_router, prefix="/caption", tags=["Caption"],
+                   dependencies=[requires("caption")])
+app.include_router(trend_router, prefix="/trend", tags=["Trend"],
+                   dependencies=[requires("clip", "trend")])
+app.include_router(virality_router, prefix="/virality", tags=["Virality"],
+                   dependencies=[requires("scorer")])
+app.include_router(full_router, prefix="/full", tags=["Full Analysis"],
+                   dependencies=[requires(*ANALYSIS_ENGINES)])
 app.include_router(chat_router, prefix="/chatbot")
 app.include_router(image_router)
 
@@ -37,3 +88,69 @@ app.include_router(image_router)
 @app.get("/")
 async def root():
     return {"message": "ViraLens API Running 🚀"}
+
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: 200 once no engine is still loading, else 503."""
+    ready = registry.ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "warming_up",
+            "engines": {name: registry.state(name) for name in registry.names()},
+        },
+    )
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    # Fail fast instead of queueing without bound
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc), "pool": exc.pool},
+        headers={"Retry-After": str(settings.retry_after)},
+    )
+
+
+@app.exception_handler(WarmingUp)
+async def warming_up_handler(request: Request, exc: WarmingUp):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "warming_up", "engines": exc.engines},
+        headers={"Retry-After": str(settings.retry_after)},
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text format: latencies, queue depth, cache and engine stats."""
+    return PlainTextResponse(prometheus.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/models")
+async def models():
+    """Load state, load time and memory cost of each engine."""
+    return registry.stats()
+
+
+@app.get("/pools")
+async def pools():
+    """Size and current load of the worker pools and batchers."""
+    return {**pool_stats(), **batcher_stats()}
+
+
+@app.get("/cache")
+async def cache():
+    """Hit / miss counts of the stage result cache and the caption cache."""
+    stats = {"stages": result_cache.stats()}
+    # don't load the caption model just to report on it
+    if registry.is_loaded("caption"):
+        stats["captions"] = registry.caption.cache_stats()
+    return stats
@@ -0,0 +1,276 @@
+"""
+Prometheus metrics, served as text by GET /metrics.
+
+Counters and histograms are updated inline (a dict lookup and a lock per
+observation); queue depths, cache counts and engine load times are read
+from the pools, caches and registry only when /metrics is scraped. Each
+process keeps its own values, so with several workers every scrape
+reports the worker that answered it.
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# seconds; from sub-millisecond cache hits to multi-second cold model calls
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """
+    Samples read from a callback at scrape time. kind="counter" for
+    totals that are already counted elsewhere (e.g. cache hits).
+    """
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), collect: Optional[Callable[[], Iterable]] = None,
+                 kind: str = "gauge"):
+        super().__init__(name, help, labels)
+        self.kind = kind
+        # collect() yields (label values tuple, value)
+        self._collect = collect
+
+    def samples(self):
+        out = []
+        for key, value in self._collect() if self._collect else ():
+            if value is None:
+                continue
+            out.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return out
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][i] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return sum(state[0]) if state else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._values.items())
+        out = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                out.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            out.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            out.append(f"{self.name}_count{labels} {cumulative}")
+        return out
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=(), collect=None, kind="gauge") -> Gauge:
+        return self.register(Gauge(name, help, labels, collect, kind))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                samples = metric.samples()
+            except Exception:
+                continue  # a broken collector must not take /metrics down
+            lines += metric.header() + samples
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+# ---------- Request / pipeline metrics (updated inline) ----------
+
+http_requests = metrics.counter(
+    "viralens_http_requests_total", "HTTP requests by route template and status.",
+    ("method", "route", "status"),
+)
+http_latency = metrics.histogram(
+    "viralens_http_request_duration_seconds", "HTTP request latency by route template.",
+    ("method", "route"),
+)
+stage_latency = metrics.histogram(
+    "viralens_stage_duration_seconds",
+    "Latency of each analysis stage (decode, detect, symmetry, colors, clip_embed, caption, score, ...).",
+    ("stage",),
+)
+stage_errors = metrics.counter(
+    "viralens_stage_errors_total", "Analysis stages that raised, by stage and exception type.",
+    ("stage", "error"),
+)
+cache_lookups = metrics.counter(
+    "viralens_cache_lookups_total",
+    "Stage result cache lookups by stage and source (memory, disk, coalesced, miss).",
+    ("stage", "source"),
+)
+batch_latency = metrics.histogram(
+    "viralens_batch_duration_seconds", "Model call time per micro-batch.", ("batcher",),
+)
+batch_size = metrics.histogram(
+    "viralens_batch_size", "Items per micro-batch.", ("batcher",), buckets=SIZE_BUCKETS,
+)
+rejected = metrics.counter(
+    "viralens_rejected_total", "Work refused with 503 because a pool or batcher was full.", ("queue",),
+)
+
+
+# ---------- Collected at scrape time ----------
+
+def _queue_depths():
+    from backend.batching import batcher_stats
+    from backend.executors import pool_stats
+    for name, stats in {**pool_stats(), **batcher_stats()}.items():
+        yield (name,), stats["pending"]
+
+
+def _engine_stat(field):
+    def collect():
+        from backend.registry import registry
+        for name, info in registry.stats().items():
+            value = info[field]
+            yield (name,), float(value) if value is not None else None
+    return collect
+
+
+def _caption_cache():
+    from backend.registry import registry
+    # don't load the caption model just to report on it
+    if registry.is_loaded("caption"):
+        stats = registry.caption.cache_stats()
+        yield ("hit",), stats["hits"]
+        yield ("miss",), stats["misses"]
+
+
+def _result_cache_bytes():
+    from backend.cache import result_cache
+    yield (), result_cache.stats()["bytes"]
+
+
+metrics.gauge(
+    "viralens_queue_depth", "Running + queued calls per pool and batcher.", ("queue",), _queue_depths,
+)
+metrics.gauge(
+    "viralens_engine_loaded", "1 once the engine is loaded.", ("engine",), _engine_stat("loaded"),
+)
+metrics.gauge(
+    "viralens_engine_load_seconds", "Time taken to build each engine.", ("engine",),
+    _engine_stat("load_seconds"),
+)
+metrics.gauge(
+    "viralens_engine_rss_delta_bytes", "Resident memory added while building each engine.", ("engine",),
+    _engine_stat("rss_delta_bytes"),
+)
+metrics.gauge(
+    "viralens_caption_cache_lookups_total", "CaptionAnalyzer feature cache hits and misses.", ("result",),
+    _caption_cache, kind="counter",
+)
+metrics.gauge(
+    "viralens_result_cache_bytes", "Bytes held by the in-memory stage result cache.", (),
+    _result_cache_bytes,
+)
@@ -1,14 +1,29 @@
 from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+from backend.models.profile_model import ProfiledResponse
 
 
 class CaptionRequest(BaseModel):
     caption: str
 
 
-class CaptionResponse(BaseModel):
+class CaptionScores(BaseModel):
     sentiment_score: float
     hook_score: float
     cta_score: float
     length_score: float
     emoji_score: float
     overall_caption_score: float
+
+
+class CaptionResponse(CaptionScores, ProfiledResponse):
+    profile: Optional[Dict[str, Any]] = None
+
+
+class CaptionBatchRequest(BaseModel):
+    captions: List[str]
+
+
+class CaptionBatchResponse(BaseModel):
+    results: List[CaptionScores]
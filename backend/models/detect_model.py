@@ -1,10 +1,12 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
+from backend.models.profile_model import ProfiledResponse
 
-class DetectResponse(BaseModel):
+
+class DetectResponse(ProfiledResponse):
     boxes: List[List[float]]
     classes: List[float]
     confidences: List[float]
     main_box: Optional[List[float]]
     image_size: List[int]
+    profile: Optional[Dict[str, Any]] = None
@@ -0,0 +1,12 @@
+from pydantic import BaseModel, model_serializer
+
+
+class ProfiledResponse(BaseModel):
+    """Base for responses with a ``profile`` field: the key is left out when profiling is off."""
+
+    @model_serializer(mode="wrap")
+    def _drop_empty_profile(self, handler):
+        data = handler(self)
+        if data.get("profile") is None:
+            data.pop("profile", None)
+        return data
@@ -1,4 +1,17 @@
+from typing import Any, Dict, List, Optional
+
 from pydantic import BaseModel
 
-class TrendResponse(BaseModel):
+from backend.models.profile_model import ProfiledResponse
+
+
+class TrendNeighbour(BaseModel):
+    score: float
+    path: str
+    label: str
+
+
+class TrendResponse(ProfiledResponse):
     trend_similarity: float
+    neighbours: Optional[List[TrendNeighbour]] = None
+    profile: Optional[Dict[str, Any]] = None
@@ -0,0 +1,172 @@
+"""
+Building blocks of the full analysis, shared by /full/full/ and /full/batch.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from backend.metrics import stage_errors, stage_latency
+from cv_engine.geometry import (
+    rule_of_thirds_score,
+    symmetry_score,
+    clutter_score,
+    brightness_score,
+    contrast_score
+)
+
+
+def subject_center(main_box: Optional[List[float]], w: int, h: int):
+    """Center of the main detection, or the image center if none."""
+    if main_box:
+        x1, y1, x2, y2 = main_box
+        return int((x1 + x2) / 2), int((y1 + y2) / 2)
+    return w // 2, h // 2
+
+
+def image_metrics(img, max_side: Optional[int] = None) -> Dict[str, float]:
+    """Detector-independent geometry + lighting metrics for one image."""
+    return {
+        "symmetry": symmetry_score(img, max_side),
+        "clutter": clutter_score(img, max_side),
+        "brightness": brightness_score(img),
+        "contrast": contrast_score(img),
+    }
+
+
+def subject_rule_of_thirds(main_box: Optional[List[float]], w: int, h: int) -> float:
+    cx, cy = subject_center(main_box, w, h)
+    return rule_of_thirds_score(cx, cy, w, h)
+
+
+def assemble(
+    scorer,
+    rule_of_thirds: float,
+    metrics: Dict[str, float],
+    dominant_colors: List[List[float]],
+    trend_score: float,
+    cap,
+    aesthetic_score: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Combine stage outputs into the /full/full/ response. aesthetic_score
+    is the CLIP AestheticScorer score; without one, a brightness +
+    contrast estimate is used.
+    """
+    geometry_scores = {
+        "rule_of_thirds": rule_of_thirds,
+        "symmetry": metrics["symmetry"],
+        "clutter": metrics["clutter"]
+    }
+
+    color_scores = {
+        "brightness": metrics["brightness"],
+        "contrast": metrics["contrast"]
+    }
+
+    if aesthetic_score is None:
+        # simple version: brightness + contrast
+        aesthetic_score = (metrics["brightness"] * 0.4) + (metrics["contrast"] * 0.6)
+
+    result = scorer.compute(
+        aesthetic_score=aesthetic_score,
+        geometry_scores=geometry_scores,
+        color_scores=color_scores,
+        caption_score=cap.overall_caption_score,
+        trend_similarity=trend_score,
+    )
+
+    return {
+        "dominant_colors": dominant_colors,
+        "geometry": geometry_scores,
+        "color": color_scores,
+        "trend_similarity": trend_score,
+        "caption_analysis": cap,
+        "aesthetic_score": aesthetic_score,
+        "virality": result.to_dict()
+    }
+
+
+# ---------- Stage graph ----------
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[..., Awaitable[Any]]   # called with dependency results as kwargs
+    deps: Tuple[str, ...] = ()
+    key: Optional[str] = None           # cache key, if the output is cacheable
+
+
+@dataclass
+class GraphRun:
+    results: Dict[str, Any] = field(default_factory=dict)
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    cache: Dict[str, str] = field(default_factory=dict)   # stage -> cache source
+
+
+class StageGraph:
+    """
+    A small dependency graph of async stages. Every stage starts as soon
+    as its dependencies are done, so independent stages overlap and the
+    wall-clock time is roughly the longest dependency chain.
+
+    Stages added with a ``key`` are looked up in (and stored to) the
+    given cache instead of always being computed.
+    """
+
+    def __init__(self, cache=None) -> None:
+        self._stages: Dict[str, Stage] = {}
+        self._cache = cache
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[..., Awaitable[Any]],
+        *deps: str,
+        key: Optional[str] = None,
+    ) -> "StageGraph":
+        # deps must already exist, which also keeps the graph acyclic
+        missing = [d for d in deps if d not in self._stages]
+        if missing:
+            raise ValueError(f"Stage {name!r} depends on unknown stages: {missing}")
+        if name in self._stages:
+            raise ValueError(f"Duplicate stage: {name!r}")
+        self._stages[name] = Stage(name, fn, tuple(deps), key)
+        return self
+
+    async def run(self) -> GraphRun:
+        run = GraphRun()
+        tasks: Dict[str, asyncio.Future] = {}
+
+        async def run_stage(stage: Stage):
+            inputs = {d: await tasks[d] for d in stage.deps}
+            start = time.perf_counter()
+            try:
+                if stage.key is not None and self._cache is not None:
+                    result, source = await self._cache.get_or_compute(
+                        stage.key, lambda: stage.fn(**inputs)
+                    )
+                    run.cache[stage.name] = source
+                else:
+                    result = await stage.fn(**inputs)
+            except Exception as e:
+                stage_errors.inc(stage=stage.name, error=type(e).__name__)
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                run.timings_ms[stage.name] = elapsed * 1000.0
+                stage_latency.observe(elapsed, stage=stage.name)
+            run.results[stage.name] = result
+            return result
+
+        for stage in self._stages.values():
+            tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for t in tasks.values():
+                t.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        return run
@@ -0,0 +1,166 @@
+"""
+Opt-in per-request profiling.
+
+Routers take ``?profile=timings`` or ``?profile=sample``. With either,
+the response gets a "profile" object: wall time per stage, input and
+working image sizes, and which cache tier served each cached stage.
+``sample`` additionally runs a stack sampler for the duration of the
+request and writes the samples as collapsed stacks ("frame;frame;frame
+count" lines, readable by flamegraph.pl, speedscope and inferno) to
+settings.profile_dir. The sampler sees every thread of the process, so
+requests running at the same time show up in the same profile.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Literal, Optional
+
+from fastapi import HTTPException, Query, Request
+
+from backend.config import settings
+from backend.metrics import stage_latency
+from cv_engine.features import as_features
+
+
+class StackSampler:
+    """Samples the Python stacks of all other threads every interval seconds."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="viralens-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def write(self, path: str) -> str:
+        """Write collapsed stacks to path (atomically)."""
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        os.replace(tmp, path)
+        return path
+
+
+class RequestProfile:
+    """
+    Stage timings, sizes and cache sources of one request. Timings are
+    always recorded (they also feed the stage latency metric); finish()
+    returns None unless profiling was asked for.
+    """
+
+    def __init__(self, mode: Optional[str] = None, route: str = "request"):
+        self.mode = mode
+        self.route = route
+        self.stages_ms: Dict[str, float] = {}
+        self.cache: Dict[str, str] = {}
+        self.sizes: Dict[str, Any] = {}
+        self._start = time.perf_counter()
+        self._sampler = None
+        if mode == "sample":
+            self._sampler = StackSampler(settings.profile_interval_ms / 1000.0)
+            self._sampler.start()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode is not None
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages_ms[name] = elapsed * 1000.0
+            stage_latency.observe(elapsed, stage=name)
+
+    def add_run(self, run) -> None:
+        """Merge a pipeline.GraphRun (already counted in the stage metric)."""
+        self.stages_ms.update(run.timings_ms)
+        self.cache.update(run.cache)
+
+    def image(self, image, n_bytes: int, *stages: str) -> None:
+        """
+        Record the input size, plus the size each of the given stages
+        ("geometry", "colors", "detector") actually works at.
+        """
+        self.sizes["input"] = {"width": image.width, "height": image.height, "bytes": n_bytes}
+        features = as_features(image)
+        if "geometry" in stages:
+            self.sizes["geometry"] = list(features.working_size(settings.geometry_max_side))
+        if "colors" in stages:
+            budget = settings.color_pixel_budget if settings.color_mode == "fast" else None
+            self.sizes["colors"] = list(features.downsampled_size(budget))
+        if "detector" in stages:
+            self.sizes["detector"] = settings.detector_imgsz  # longer side after letterboxing
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        out = {
+            "mode": self.mode,
+            "total_ms": (time.perf_counter() - self._start) * 1000.0,
+            "stages_ms": dict(self.stages_ms),
+            "cache": dict(self.cache),
+            "sizes": dict(self.sizes),
+        }
+        if self._sampler is not None:
+            self.close()
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.route}-{uuid.uuid4().hex[:8]}.folded"
+            out["samples"] = sum(self._sampler.samples.values())
+            out["profile_file"] = self._sampler.write(os.path.join(settings.profile_dir, name))
+        return out
+
+    def close(self) -> None:
+        """Stop the sampler, if any (safe to call more than once)."""
+        if self._sampler is not None:
+            self._sampler.stop()
+
+
+def request_profile(
+    request: Request,
+    profile: Optional[Literal["timings", "sample"]] = Query(
+        None, description='"timings": add a per-stage breakdown to the response; '
+                          '"sample": also write a sampled flame-graph profile'
+    ),
+) -> Iterator[RequestProfile]:
+    """Route dependency: the RequestProfile for this request."""
+    if profile == "sample" and not settings.profile_dir:
+        raise HTTPException(status_code=400, detail="Sampling profiler is off: set VIRALENS_PROFILE_DIR")
+    route = request.url.path.strip("/").replace("/", "-") or "root"
+    prof = RequestProfile(profile, route=route)
+    try:
+        yield prof
+    finally:
+        prof.close()  # the request may have failed before finish()
@@ -0,0 +1,284 @@
+"""
+Process-wide registry of analysis engines.
+
+Each engine (YOLO detector, CLIP encoder, RoBERTa caption model, ...)
+is built once per process, either on first use or by an explicit
+``warmup()`` / ``warmup_in_background()``. Load time and memory cost are
+recorded per engine so they can be reported by the API.
+
+While an engine is loading, ``require()`` raises ``WarmingUp`` so callers
+can answer straight away (backend.main turns it into a 503) instead of
+waiting on the load.
+"""
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from backend.config import settings
+
+
+def _rss_bytes() -> int:
+    """Current resident set size of this process (0 if unknown)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    # ru_maxrss is a peak value, but it is the best we have off Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _param_bytes(engine: Any) -> Optional[int]:
+    """Size of the torch weights held by an engine, if it has any."""
+    model = getattr(engine, "model", None)
+    if model is None or not hasattr(model, "parameters"):
+        return None
+
+    total = 0
+    for p in model.parameters():
+        total += p.numel() * p.element_size()
+    if hasattr(model, "buffers"):
+        for b in model.buffers():
+            total += b.numel() * b.element_size()
+    return total
+
+
+class WarmingUp(RuntimeError):
+    """Raised by require() for engines that are still loading."""
+
+    def __init__(self, engines: List[str]):
+        super().__init__(f"warming up: {', '.join(engines)}")
+        self.engines = engines
+
+
+@dataclass
+class EngineInfo:
+    name: str
+    loaded: bool = False
+    load_seconds: Optional[float] = None
+    rss_delta_bytes: Optional[int] = None
+    param_bytes: Optional[int] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ModelRegistry:
+    def __init__(self) -> None:
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._engines: Dict[str, Any] = {}
+        self._info: Dict[str, EngineInfo] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        # queued by warmup_in_background() and not tried yet
+        self._pending: Set[str] = set()
+
+    # ----- registration -----
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        """Register (or replace) the factory used to build an engine."""
+        with self._lock:
+            self._factories[name] = factory
+            self._engines.pop(name, None)
+            self._info[name] = EngineInfo(name=name)
+            self._locks.setdefault(name, threading.Lock())
+
+    def names(self):
+        return list(self._factories)
+
+    # ----- access -----
+
+    def get(self, name: str) -> Any:
+        engine = self._engines.get(name)
+        if engine is not None:
+            return engine
+
+        if name not in self._factories:
+            raise KeyError(f"Unknown engine: {name}")
+
+        with self._locks[name]:
+            # another thread may have finished loading while we waited
+            engine = self._engines.get(name)
+            if engine is not None:
+                return engine
+            engine = self._load(name)
+            self._engines[name] = engine
+            return engine
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._engines
+
+    def _load(self, name: str) -> Any:
+        info = self._info[name]
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        try:
+            engine = self._factories[name]()
+        except Exception as e:
+            info.error = f"{type(e).__name__}: {e}"
+            raise
+
+        info.loaded = True
+        info.error = None
+        info.load_seconds = time.perf_counter() - start
+        info.rss_delta_bytes = max(0, _rss_bytes() - rss_before)
+        info.param_bytes = _param_bytes(engine)
+        return engine
+
+    def warmup(self, names: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Load the given engines (all by default). Errors are recorded, not raised."""
+        for name in list(names or self.names()):
+            try:
+                self.get(name)
+            except Exception:
+                pass
+            finally:
+                self._pending.discard(name)
+        return self.stats()
+
+    def warmup_in_background(self, names: Optional[Iterable[str]] = None) -> threading.Thread:
+        """warmup() on a daemon thread; returns the thread."""
+        names = list(names or self.names())
+        with self._lock:
+            self._pending.update(n for n in names if n not in self._engines)
+        thread = threading.Thread(target=self.warmup, args=(names,), name="viralens-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    # ----- readiness -----
+
+    def state(self, name: str) -> str:
+        """"loaded", "loading", "pending" (queued for warmup), "failed" or "unloaded"."""
+        if name in self._engines:
+            return "loaded"
+        if self._locks[name].locked():
+            return "loading"
+        if name in self._pending:
+            return "pending"
+        if self._info[name].error is not None:
+            return "failed"
+        return "unloaded"
+
+    def require(self, names: Iterable[str]) -> None:
+        """Raise WarmingUp if any of the engines is loading or queued to load."""
+        waiting = [n for n in names if self.state(n) in ("loading", "pending")]
+        if waiting:
+            raise WarmingUp(waiting)
+
+    def ready(self) -> bool:
+        """True once nothing is loading and no warmed-up engine failed."""
+        return all(self.state(n) in ("loaded", "unloaded") for n in self.names())
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: {**info.to_dict(), "state": self.state(name)} for name, info in self._info.items()}
+
+    # ----- convenience accessors -----
+
+    @property
+    def detector(self):
+        return self.get("detector")
+
+    @property
+    def trend(self):
+        return self.get("trend")
+
+    @property
+    def clip(self):
+        return self.get("clip")
+
+    @property
+    def aesthetic(self):
+        return self.get("aesthetic")
+
+    @property
+    def caption(self):
+        return self.get("caption")
+
+    @property
+    def color(self):
+        return self.get("color")
+
+    @property
+    def scorer(self):
+        return self.get("scorer")
+
+
+# ---------- Default engines ----------
+# Imports live inside the factories so that importing this module does not
+# pull in torch / ultralytics / open_clip.
+
+def _build_detector():
+    from cv_engine.detector import ObjectDetector
+    classes = None
+    if settings.detector_classes:
+        classes = [int(c) for c in settings.detector_classes.split(",") if c.strip()]
+    return ObjectDetector(
+        model_path=settings.detector_model,
+        imgsz=settings.detector_imgsz,
+        classes=classes,
+        max_det=settings.detector_max_det,
+        conf=settings.detector_conf,
+        device=settings.detector_device,
+    )
+
+
+def _build_clip():
+    from cv_engine.clip_model import ClipEncoder
+    return ClipEncoder(backend=settings.clip_backend, onnx_dir=settings.clip_onnx_dir)
+
+
+def _build_trend():
+    from cv_engine.trend_similarity import TrendSimilarity
+    return TrendSimilarity(
+        clip=registry.clip,
+        index=settings.trend_index,
+        index_threshold=settings.trend_index_threshold,
+        nprobe=settings.trend_nprobe,
+        bank_dtype=settings.trend_bank_dtype,
+    )
+
+
+def _build_aesthetic():
+    from cv_engine.aesthetic import AestheticScorer
+    return AestheticScorer(clip=registry.clip)
+
+
+def _build_caption():
+    from text_engine.caption_analysis import CaptionAnalyzer
+    return CaptionAnalyzer(
+        cache_size=settings.caption_cache_size,
+        cache_ttl=settings.caption_cache_ttl,
+        backend=settings.caption_backend,
+        onnx_dir=settings.caption_onnx_dir,
+    )
+
+
+def _build_color():
+    from cv_engine.color import ColorAnalyzer
+    return ColorAnalyzer(mode=settings.color_mode, pixel_budget=settings.color_pixel_budget)
+
+
+def _build_scorer():
+    from scoring.virality_score import ViralityScorer
+    return ViralityScorer()
+
+
+registry = ModelRegistry()
+registry.register("detector", _build_detector)
+registry.register("clip", _build_clip)
+registry.register("trend", _build_trend)
+registry.register("aesthetic", _build_aesthetic)
+registry.register("caption", _build_caption)
+registry.register("color", _build_color)
+registry.register("scorer", _build_scorer)
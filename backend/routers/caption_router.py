@@ -1,13 +1,35 @@
-from fastapi import APIRouter
-from backend.models.caption_model import CaptionRequest, CaptionResponse
-from text_engine.caption_analysis import CaptionAnalyzer
+from fastapi import APIRouter, Depends, HTTPException
+from backend.models.caption_model import (
+    CaptionRequest,
+    CaptionResponse,
+    CaptionScores,
+    CaptionBatchRequest,
+    CaptionBatchResponse,
+)
+from backend.registry import registry
+from backend.config import settings
+from backend.executors import inference_pool
+from backend.batching import caption_batcher
+from backend.profiling import RequestProfile, request_profile
 
 router = APIRouter()
-analyzer = CaptionAnalyzer()  # load once
 
 
 @router.post("/", response_model=CaptionResponse)
-async def analyze_caption(data: CaptionRequest):
-    result = analyzer.analyze(data.caption)
-    return CaptionResponse(**result.to_dict())
+async def analyze_caption(data: CaptionRequest, prof: RequestProfile = Depends(request_profile)):
+    # joins other in-flight captions in a single forward pass
+    with prof.stage("caption"):
+        result = await caption_batcher.run(data.caption)
+    return CaptionResponse(**result.to_dict(), profile=prof.finish())
 
+
+@router.post("/batch", response_model=CaptionBatchResponse)
+async def analyze_caption_batch(data: CaptionBatchRequest):
+    if len(data.captions) > settings.caption_batch_limit:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.caption_batch_limit} captions per request",
+        )
+
+    results = await inference_pool.run(lambda: registry.caption.analyze_batch(data.captions))
+    return CaptionBatchResponse(results=[CaptionScores(**r.to_dict()) for r in results])
@@ -1,10 +1,28 @@
-from fastapi import APIRouter
+import threading
+
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from backend.chat.chat_engine import ChatEngine
 
 
 router = APIRouter()
-chatbot = ChatEngine()
+
+# built on first use so a missing GROQ_API_KEY only disables this route
+_chatbot = None
+_chatbot_lock = threading.Lock()
+
+
+def get_chatbot() -> ChatEngine:
+    global _chatbot
+    if _chatbot is None:
+        with _chatbot_lock:
+            if _chatbot is None:
+                try:
+                    _chatbot = ChatEngine()
+                except ValueError as e:
+                    raise HTTPException(status_code=503, detail=str(e))
+    return _chatbot
+
 
 class ChatRequest(BaseModel):
     message: str
@@ -12,5 +30,5 @@ class ChatRequest(BaseModel):
 
 @router.post("/chat/")
 async def chat_api(req: ChatRequest):
-    reply = chatbot.chat(req.message, req.metrics)
+    reply = get_chatbot().chat(req.message, req.metrics)
     return {"reply": reply}
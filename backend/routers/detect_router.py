@@ -1,24 +1,27 @@
-from fastapi import APIRouter, UploadFile, File
-import shutil
-import uuid
-from cv_engine.detector import ObjectDetector
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from backend.batching import detector_batcher
+from backend.executors import cpu_pool
 from backend.models.detect_model import DetectResponse
+from backend.profiling import RequestProfile, request_profile
+from cv_engine.image_io import DecodedImage
 
 
 router = APIRouter()
-detector = ObjectDetector()  # load YOLO once
 
 
 @router.post("/", response_model=DetectResponse)
-async def detect_image(file: UploadFile = File(...)):
-    # save temporary file
-    ext = file.filename.split(".")[-1]
-    temp_path = f"temp_{uuid.uuid4()}.{ext}"
-
-    with open(temp_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+async def detect_image(file: UploadFile = File(...), prof: RequestProfile = Depends(request_profile)):
+    # decode in memory (no temp file)
+    data = await file.read()
+    try:
+        with prof.stage("decode"):
+            image = await cpu_pool.run(DecodedImage.from_bytes, data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    prof.image(image, len(data), "detector")
 
     # run detector
-    result = detector.load(temp_path)
+    with prof.stage("detect"):
+        result = await detector_batcher.run(image)
 
-    return DetectResponse(**result)
+    return DetectResponse(**result, profile=prof.finish())
@@ -1,126 +1,341 @@
-import uuid
-import cv2
-import numpy as np
-from fastapi import APIRouter, UploadFile, File, Form
-from scoring.virality_score import ViralityScorer
-from cv_engine.detector import ObjectDetector
+import asyncio
+import json
+import logging
+import zipfile
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, List, Tuple
+
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
+from fastapi.responses import StreamingResponse
+
+from backend.registry import registry
+from backend.config import settings
+from backend.executors import inference_pool, cpu_pool, Overloaded
+from backend.batching import detector_batcher, caption_batcher, clip_batcher
+from backend.cache import result_cache, content_digest, stage_key
+from backend.metrics import stage_errors
+from backend.profiling import RequestProfile, request_profile
+from backend.pipeline import StageGraph, assemble, image_metrics, subject_rule_of_thirds
 from cv_engine.geometry import (
-    rule_of_thirds_score,
     symmetry_score,
     clutter_score,
     brightness_score,
     contrast_score
 )
-from cv_engine.color import ColorAnalyzer
-from cv_engine.trend_similarity import TrendSimilarity
-from text_engine.caption_analysis import CaptionAnalyzer
+from cv_engine.image_io import DecodedImage
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-# Load engines once
-detector = ObjectDetector()
-color_engine = ColorAnalyzer()
-trend_engine = TrendSimilarity()
-caption_engine = CaptionAnalyzer()
-scorer = ViralityScorer()
+
+def _decode(data: bytes) -> Tuple[DecodedImage, str]:
+    """Decoded image and content hash of an upload (run in cpu_pool)."""
+    return DecodedImage.from_bytes(data), content_digest(data)
 
 
 @router.post("/full/")
 async def full_analysis(
     file: UploadFile = File(...),
-    caption: str = Form(...)
+    caption: str = Form(...),
+    prof: RequestProfile = Depends(request_profile),
 ):
     # --------------------------------------------
-    # 1. Save file temporarily
+    # 1. Decode once, in memory
     # --------------------------------------------
-    temp_path = f"tmp_{uuid.uuid4()}.webp"
-    with open(temp_path, "wb") as f:
-        f.write(await file.read())
-
-    # Load image with OpenCV
-    img = cv2.imread(temp_path)
-    if img is None:
+    data = await file.read()
+    try:
+        with prof.stage("decode"):
+            # cache keys: image stages by content hash, caption by text hash
+            image, image_hash = await cpu_pool.run(_decode, data)
+    except ValueError:
+        stage_errors.inc(stage="decode", error="ValueError")
         return {"error": "Could not read image"}
+    prof.image(image, len(data), "geometry", "colors", "detector")
+    caption_hash = content_digest(caption)
 
-    h, w = img.shape[:2]
+    # gray / edges / histogram etc. computed once, shared by all metrics
+    feats = image.features
+    w, h = image.width, image.height
 
     # --------------------------------------------
-    # 2. Object Detection
+    # 2. Stage graph: everything runs concurrently
+    #    except rule-of-thirds, which needs main_box
     # --------------------------------------------
-    det = detector.load(temp_path)
-    main_box = det["main_box"]
+    async def rule_of_thirds(detect):
+        return subject_rule_of_thirds(detect["main_box"], w, h)
 
-    # If no objects detected → fallback center
-    if main_box:
-        x1, y1, x2, y2 = main_box
-        cx, cy = int((x1 + x2) / 2), int((y1 + y2) / 2)
-    else:
-        cx, cy = w // 2, h // 2
+    # one CLIP pass feeds both the trend-bank lookup and the aesthetic
+    # score; only the embedding is cached, since the bank can change.
+    # registry.trend / .aesthetic are read on the worker: building them
+    # (opening the bank, embedding the aesthetic prompts) is slow
+    async def trend(clip_embed):
+        return await inference_pool.run(lambda: registry.trend.similarity_from_embedding(clip_embed))
 
-    # --------------------------------------------
-    # 3. Geometry Metrics
-    # --------------------------------------------
-    rule = rule_of_thirds_score(cx, cy, w, h)
-    sym = symmetry_score(img)
-    clt = clutter_score(img)
-    bright = brightness_score(img)
-    cont = contrast_score(img)
-
-    geometry_scores = {
-        "rule_of_thirds": rule,
-        "symmetry": sym,
-        "clutter": clt
-    }
-
-    color_scores = {
-        "brightness": bright,
-        "contrast": cont
-    }
+    async def aesthetic(clip_embed):
+        return await inference_pool.run(lambda: registry.aesthetic.score_from_embedding(clip_embed))
 
-    # --------------------------------------------
-    # 4. Color + Lighting
-    # --------------------------------------------
-    dominant_colors = color_engine.extract_colors(img)
+    def image_stage(name, fn):
+        graph.add(name, fn, key=stage_key(name, image_hash))
 
-    # --------------------------------------------
-    # 5. Trend Similarity
-    # --------------------------------------------
-    trend_score = trend_engine.similarity_score(temp_path)
+    graph = StageGraph(cache=result_cache)
+    # object detection
+    image_stage("detect", lambda: detector_batcher.run(image))
+    graph.add("rule_of_thirds", rule_of_thirds, "detect")
+    # geometry + lighting
+    image_stage("symmetry", lambda: cpu_pool.run(symmetry_score, feats, settings.geometry_max_side))
+    image_stage("clutter", lambda: cpu_pool.run(clutter_score, feats, settings.geometry_max_side))
+    image_stage("brightness", lambda: cpu_pool.run(brightness_score, feats))
+    image_stage("contrast", lambda: cpu_pool.run(contrast_score, feats))
+    # color
+    image_stage("colors", lambda: cpu_pool.run(registry.color.extract_colors, feats))
+    # CLIP embedding -> trend similarity + aesthetic
+    image_stage("clip_embed", lambda: clip_batcher.run(image))
+    graph.add("trend", trend, "clip_embed")
+    graph.add("aesthetic", aesthetic, "clip_embed", key=stage_key("aesthetic", image_hash))
+    # caption analysis
+    graph.add("caption", lambda: caption_batcher.run(caption), key=stage_key("caption", caption_hash))
 
+    run = await graph.run()
+    r = run.results
+    prof.add_run(run)
+    logger.debug("full_analysis stage timings (ms): %s, cache: %s", run.timings_ms, run.cache)
 
     # --------------------------------------------
-    # 6. Caption Analysis
+    # 3. Aesthetic + Virality Score, combined output
     # --------------------------------------------
-    cap = caption_engine.analyze(caption)
-    caption_score = cap.overall_caption_score
+    metrics = {name: r[name] for name in ("symmetry", "clutter", "brightness", "contrast")}
+    with prof.stage("score"):
+        out = assemble(
+            registry.scorer,
+            r["rule_of_thirds"],
+            metrics,
+            r["colors"],
+            r["trend"],
+            r["caption"],
+            r["aesthetic"],
+        )
+    if prof.enabled:
+        out["profile"] = prof.finish()
+    return out
 
 
-    # --------------------------------------------
-    # 7. Aesthetic score (simple version: brightness + contrast)
-    # (You can replace with CLIP model later)
-    # --------------------------------------------
-    aesthetic_score = (bright * 0.4) + (cont * 0.6)
+# ==================================================
+# Batch analysis: many image+caption pairs, NDJSON out
+# ==================================================
 
-    # --------------------------------------------
-    # 8. Virality Score (FINAL FIX)
-    # --------------------------------------------
-    result = scorer.compute(
-        aesthetic_score=aesthetic_score,
-        geometry_scores=geometry_scores,
-        color_scores=color_scores,
-        caption_score=caption_score,
-        trend_similarity=trend_score,
-    )
+@dataclass
+class _BatchItem:
+    index: int
+    name: str
+    read: Callable[[], Awaitable[bytes]]
+    caption: str
 
-    # --------------------------------------------
-    # 9. Return combined output
-    # --------------------------------------------
-    return {
-        "dominant_colors": dominant_colors,
-        "geometry": geometry_scores,
-        "color": color_scores,
-        "trend_similarity": trend_score,
-        "caption_analysis": cap,
-        "aesthetic_score": aesthetic_score,
-        "virality": result.to_dict()
-    }
+
+def _upload_items(files: List[UploadFile], captions: List[str]) -> List[_BatchItem]:
+    items = []
+    for i, f in enumerate(files):
+        caption = captions[i] if i < len(captions) else ""
+        items.append(_BatchItem(i, f.filename or str(i), f.read, caption))
+    return items
+
+
+def _archive_items(archive: UploadFile) -> List[_BatchItem]:
+    """
+    Zip of images, plus an optional captions.json mapping
+    file name -> caption.
+    """
+    try:
+        zf = zipfile.ZipFile(archive.file)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="archive is not a zip file")
+
+    names = [n for n in zf.namelist() if not n.endswith("/")]
+    captions = {}
+    if "captions.json" in names:
+        names.remove("captions.json")
+        try:
+            captions = json.loads(zf.read("captions.json"))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="captions.json is not valid JSON")
+        if not isinstance(captions, dict):
+            raise HTTPException(status_code=400, detail="captions.json must map file names to captions")
+
+    def reader(name):
+        # members are decompressed lazily, one chunk at a time
+        async def read():
+            return zf.read(name)
+        return read
+
+    return [
+        _BatchItem(i, name, reader(name), str(captions.get(name, "")))
+        for i, name in enumerate(sorted(names))
+    ]
+
+
+async def _cached_batched(keys: List[str], batch_fn: Callable, single_fn: Callable, items: List[Any]) -> List[Any]:
+    """_batched() for the cache misses only; hits are served from the cache."""
+    results: List[Any] = [None] * len(items)
+    missing = []
+    for i, key in enumerate(keys):
+        found, value, _ = await result_cache.get(key)
+        if found:
+            results[i] = value
+        else:
+            missing.append(i)
+
+    if missing:
+        computed = await _batched(batch_fn, single_fn, [items[i] for i in missing])
+        for i, value in zip(missing, computed):
+            results[i] = value
+            if not isinstance(value, Exception):
+                await result_cache.put(keys[i], value)
+    return results
+
+
+async def _batched(batch_fn: Callable, single_fn: Callable, items: List[Any]) -> List[Any]:
+    """
+    One batched model call. If it fails, retry item by item so a single
+    bad input only fails itself; failures are returned as exceptions.
+    """
+    try:
+        return await inference_pool.run(batch_fn, items)
+    except Overloaded:
+        raise
+    except Exception:
+        results = []
+        for item in items:
+            try:
+                results.append(await inference_pool.run(single_fn, item))
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+def _ndjson(obj) -> bytes:
+    return (json.dumps(obj, default=lambda o: o.to_dict()) + "\n").encode("utf-8")
+
+
+def _error(item: _BatchItem, exc: Exception) -> bytes:
+    return _ndjson({"index": item.index, "name": item.name, "error": str(exc) or type(exc).__name__})
+
+
+async def _run_chunk(chunk: List[_BatchItem]):
+    decoded = []
+    for item in chunk:
+        data = await item.read()
+        try:
+            decoded.append((item, *await cpu_pool.run(_decode, data)))
+        except ValueError as e:
+            yield _error(item, e)
+
+    if not decoded:
+        return
+
+    images = [image for _, image, _ in decoded]
+    hashes = [digest for _, _, digest in decoded]
+    captions = [item.caption for item, _, _ in decoded]
+
+    # batched model stages, shared by every item of the chunk
+    dets = asyncio.ensure_future(_cached_batched(
+        [stage_key("detect", d) for d in hashes],
+        lambda xs: registry.detector.load_batch(xs),
+        lambda x: registry.detector.load(x),
+        images,
+    ))
+    embeds = asyncio.ensure_future(_cached_batched(
+        [stage_key("clip_embed", d) for d in hashes],
+        lambda xs: list(registry.clip.embed_images(xs)),
+        lambda x: registry.clip.embed_image(x),
+        images,
+    ))
+    caps = asyncio.ensure_future(_cached_batched(
+        [stage_key("caption", content_digest(c)) for c in captions],
+        lambda xs: registry.caption.analyze_batch(xs),
+        lambda x: registry.caption.analyze(x),
+        captions,
+    ))
+
+    async def analyze(i: int, item: _BatchItem, image: DecodedImage, digest: str):
+        try:
+            (metrics, _), (dominant_colors, _) = await asyncio.gather(
+                result_cache.get_or_compute(
+                    stage_key("metrics", digest),
+                    lambda: cpu_pool.run(image_metrics, image.features, settings.geometry_max_side),
+                ),
+                result_cache.get_or_compute(
+                    stage_key("colors", digest),
+                    lambda: cpu_pool.run(registry.color.extract_colors, image.features),
+                ),
+            )
+            det, emb, cap = (await dets)[i], (await embeds)[i], (await caps)[i]
+            for out in (det, emb, cap):
+                if isinstance(out, Exception):
+                    raise out
+
+            def aesthetic():
+                return inference_pool.run(lambda: registry.aesthetic.score_from_embedding(emb))
+
+            # the trend score depends on the bank as well, so it isn't cached
+            trend_score, (aesthetic_score, _) = await asyncio.gather(
+                inference_pool.run(lambda: registry.trend.similarity_from_embedding(emb)),
+                result_cache.get_or_compute(
+                    stage_key("aesthetic", digest),
+                    aesthetic,
+                ),
+            )
+
+            rule = subject_rule_of_thirds(det["main_box"], image.width, image.height)
+            result = assemble(
+                registry.scorer, rule, metrics, dominant_colors, trend_score, cap, aesthetic_score
+            )
+            return _ndjson({"index": item.index, "name": item.name, **result})
+        except Exception as e:
+            stage_errors.inc(stage="batch_item", error=type(e).__name__)
+            return _error(item, e)
+
+    tasks = [
+        asyncio.ensure_future(analyze(i, item, image, digest))
+        for i, (item, image, digest) in enumerate(decoded)
+    ]
+    try:
+        # stream each item as soon as it is done
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for t in tasks + [dets, embeds, caps]:
+            t.cancel()
+        await asyncio.gather(*tasks, dets, embeds, caps, return_exceptions=True)
+
+
+async def _stream_batch(items: List[_BatchItem]):
+    size = max(1, settings.full_batch_chunk)
+    for start in range(0, len(items), size):
+        async for line in _run_chunk(items[start:start + size]):
+            yield line
+
+
+@router.post("/batch")
+async def full_batch(
+    files: List[UploadFile] = File(None),
+    captions: List[str] = Form(None),
+    archive: UploadFile = File(None),
+):
+    """
+    Full analysis for many image+caption pairs, as multipart files (with
+    captions in the same order) or a zip archive. Streams one JSON line
+    per item as soon as it is done; failed items carry an "error" key.
+    """
+    if archive is not None:
+        items = _archive_items(archive)
+    else:
+        items = _upload_items(files or [], captions or [])
+
+    if not items:
+        raise HTTPException(status_code=400, detail="No images provided")
+    if len(items) > settings.full_batch_limit:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.full_batch_limit} items per request",
+        )
+
+    return StreamingResponse(_stream_batch(items), media_type="application/x-ndjson")
@@ -1,25 +1,39 @@
-from fastapi import APIRouter, UploadFile, File
-import uuid
-import shutil
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query
 
 from backend.models.trend_model import TrendResponse
-from cv_engine.trend_similarity import TrendSimilarity
+from backend.registry import registry
+from backend.executors import cpu_pool, inference_pool
+from backend.batching import clip_batcher
+from backend.profiling import RequestProfile, request_profile
+from cv_engine.image_io import DecodedImage
 
 router = APIRouter()
-ts = TrendSimilarity()   # CLIP model loaded once
 
 
 @router.post("/", response_model=TrendResponse)
-async def trend_similarity(file: UploadFile = File(...)):
-    # save temporary file
-    ext = file.filename.split(".")[-1]
-    temp_path = f"temp_{uuid.uuid4()}.{ext}"
-
-    with open(temp_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    # compute similarity
-    score = ts.similarity_score(temp_path)
-
-    return TrendResponse(trend_similarity=score)
-
+async def trend_similarity(
+    file: UploadFile = File(...),
+    k: int = Query(0, ge=0, le=50, description="Also return the k nearest viral-bank entries"),
+    prof: RequestProfile = Depends(request_profile),
+):
+    # decode in memory (no temp file)
+    data = await file.read()
+    try:
+        with prof.stage("decode"):
+            image = await cpu_pool.run(DecodedImage.from_bytes, data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    prof.image(image, len(data))
+
+    # compute similarity from the (micro-batched) CLIP embedding
+    with prof.stage("clip_embed"):
+        emb = await clip_batcher.run(image)
+    if k == 0:
+        with prof.stage("trend"):
+            score = await inference_pool.run(lambda: registry.trend.similarity_from_embedding(emb))
+        return TrendResponse(trend_similarity=score, profile=prof.finish())
+
+    with prof.stage("trend"):
+        neighbours = await inference_pool.run(lambda: registry.trend.top_k_from_embedding(emb, k))
+    score = neighbours[0]["score"] if neighbours else 0.5
+    return TrendResponse(trend_similarity=score, neighbours=neighbours, profile=prof.finish())
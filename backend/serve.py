@@ -0,0 +1,196 @@
+"""
+Pre-fork server: load the models once, then fork uvicorn workers that
+share them.
+
+    python -m backend.serve [--host 0.0.0.0] [--port 8000] [--workers 4]
+
+The parent process builds every engine, moves torch weights into shared
+memory and freezes the garbage collector, then binds the listening
+socket and forks the workers. Each worker runs its own event loop and
+pools on the inherited socket and reads the parent's weights and the
+memory-mapped viral bank instead of holding a copy, so extra workers
+cost their private memory only (see worker_memory). Workers that die
+are replaced; SIGINT / SIGTERM stop them all.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Any, Dict, List
+
+from backend.config import settings
+from backend.registry import registry
+
+logger = logging.getLogger(__name__)
+
+
+def share_weights(engine: Any) -> int:
+    """
+    Move the torch modules held by an engine (directly or one level down,
+    e.g. YOLO().model) into shared memory. Returns the bytes moved.
+
+    Forked workers see copy-on-write pages either way, but shared-memory
+    storages can never be copied by a stray write, and they show up as
+    shared (not private) in each worker's RSS.
+    """
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return 0
+
+    moved = 0
+    seen = set()
+    candidates = list(vars(engine).values()) if hasattr(engine, "__dict__") else []
+    candidates += [getattr(c, "model", None) for c in candidates]
+    for module in candidates:
+        if not isinstance(module, torch.nn.Module) or id(module) in seen:
+            continue
+        seen.add(id(module))
+        for t in list(module.parameters()) + list(module.buffers()):
+            if not t.is_shared() and t.device.type == "cpu":
+                moved += t.numel() * t.element_size()
+        module.share_memory()
+    return moved
+
+
+def prepare_parent(names=None) -> Dict[str, Dict[str, Any]]:
+    """Load the engines, share their weights and freeze the heap for fork()."""
+    stats = registry.warmup(names)
+    for name in registry.names():
+        if registry.is_loaded(name):
+            moved = share_weights(registry.get(name))
+            if moved:
+                logger.info("%s: %.0f MB of weights in shared memory", name, moved / 2**20)
+
+    # every object allocated so far is left alone by the collector, so
+    # it doesn't write to (and un-share) their pages in the workers
+    gc.collect()
+    gc.freeze()
+    return stats
+
+
+def worker_memory(pid: int = 0) -> Dict[str, int]:
+    """rss / pss / private bytes of a process (Linux; empty elsewhere)."""
+    path = f"/proc/{pid or 'self'}/smaps_rollup"
+    out = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                    out[key.lower()] = int(rest.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        return {}
+    out["private"] = out.pop("private_clean", 0) + out.pop("private_dirty", 0)
+    return out
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(sock: socket.socket, threads: int) -> None:
+    import uvicorn
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        # workers split the cores instead of each using all of them
+        torch.set_num_threads(threads)
+
+    from backend.main import app
+    config = uvicorn.Config(app, log_level="info", lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _spawn(sock: socket.socket, threads: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(sock, threads)
+        except BaseException:
+            logger.exception("worker crashed")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def serve(host: str = "0.0.0.0", port: int = 8000, workers: int = 2) -> None:
+    start = time.perf_counter()
+    # imported before fork: fails early and the modules are shared too
+    import uvicorn  # noqa: F401
+    import backend.main  # noqa: F401
+    prepare_parent()
+    logger.info("engines loaded in %.1fs", time.perf_counter() - start)
+    # workers start with every engine loaded; nothing left to warm up
+    settings.warmup = False
+
+    sock = _bind(host, port)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    started: Dict[int, float] = {}
+
+    def spawn():
+        pid = _spawn(sock, threads)
+        started[pid] = time.monotonic()
+        return pid
+
+    children: List[int] = [spawn() for _ in range(workers)]
+    logger.info("serving on %s:%d with %d workers", host, port, workers)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        if pid not in children:
+            continue
+        children.remove(pid)
+        if not stopping:
+            logger.warning("worker %d exited (status %d), restarting", pid, status)
+            if time.monotonic() - started.pop(pid) < 5:
+                time.sleep(1)  # don't spin on a worker that dies at startup
+            if not stopping:
+                children.append(spawn())
+    sock.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    serve(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+CaptionAnalyzer sentiment backends: torch float vs int8 vs onnxruntime.
+
+    python -m benchmarks.bench_caption [--backends torch,int8,onnx,onnx-int8]
+                                       [--batch-sizes 1,16] [--model NAME|random]
+
+For each backend, reports load time, resident memory added by the
+analyzer, latency per batch and per caption, and the largest
+sentiment_score difference from the float torch model over a fixed
+caption set. --model random builds a randomly initialised checkpoint of
+the same shape as twitter-roberta-base (same seed for every backend, with
+a small BPE vocabulary trained on the captions), so it runs offline; the
+ONNX graphs are then re-exported on every load, which is included in
+load_s. Backends are measured in separate processes so their memory
+doesn't mix.
+"""
+import argparse
+import gc
+import json
+import multiprocessing as mp
+import tempfile
+import time
+
+from benchmarks.synthetic import malloc_trim, rss_bytes, synthetic_captions, time_call
+
+MODEL_NAME = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+
+
+def random_checkpoint(path, captions):
+    """Save a randomly initialised RoBERTa-base classifier to path."""
+    import torch
+    import transformers
+    from tokenizers import ByteLevelBPETokenizer, processors
+
+    bpe = ByteLevelBPETokenizer()
+    bpe.train_from_iterator(
+        captions, vocab_size=2000, min_frequency=1,
+        special_tokens=["<s>", "<pad>", "</s>", "<unk>", "<mask>"],
+    )
+    bpe.post_processor = processors.RobertaProcessing(("</s>", 2), ("<s>", 0))
+    transformers.RobertaTokenizerFast(tokenizer_object=bpe).save_pretrained(path)
+
+    torch.manual_seed(0)
+    # twitter-roberta-base shapes, including its 50265-token embedding table
+    config = transformers.RobertaConfig(vocab_size=50265, max_position_embeddings=514, num_labels=3)
+    transformers.RobertaForSequenceClassification(config).save_pretrained(path)
+    return path
+
+
+def _measure(backend, model_name, captions, batch_sizes, repeat, onnx_dir, out):
+    from text_engine.caption_analysis import CaptionAnalyzer
+
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    analyzer = CaptionAnalyzer(device="cpu", backend=backend, onnx_dir=onnx_dir, model_name=model_name)
+    load_s = time.perf_counter() - start
+    analyzer._sentiment_probs(captions[:1])  # warm up
+    gc.collect()
+    malloc_trim()  # hand freed load/export buffers back to the OS
+    rss_loaded = rss_bytes() - rss_before
+
+    row = {"backend": backend, "load_s": load_s, "rss_mb": rss_loaded / 2**20}
+    for bs in batch_sizes:
+        # _sentiment_probs skips the feature cache, so every call runs the model
+        t = time_call(lambda: analyzer._sentiment_probs(captions[:bs], batch_size=bs), repeat=repeat)
+        row[f"batch{bs}_ms"] = t["best_ms"]
+        row[f"batch{bs}_ms_per_caption"] = t["best_ms"] / bs
+    row["scores"] = [r.sentiment_score for r in analyzer.analyze_batch(captions)]
+    out.put(row)
+
+
+def run(backends, batch_sizes, model_name, repeat, n_captions=64):
+    captions = synthetic_captions(max(n_captions, *batch_sizes))
+    ctx = mp.get_context("spawn")
+    with tempfile.TemporaryDirectory(prefix="bench-caption-") as workdir:
+        if model_name == "random":
+            model_name = random_checkpoint(f"{workdir}/random-roberta", captions)
+
+        rows, reference = [], None
+        for backend in backends:
+            out = ctx.Queue()
+            proc = ctx.Process(
+                target=_measure,
+                args=(backend, model_name, captions, batch_sizes, repeat, workdir, out),
+            )
+            proc.start()
+            row = out.get()
+            proc.join()
+
+            scores = row.pop("scores")
+            if reference is None and backend == "torch":
+                reference = scores
+            if reference is not None:
+                row["max_sentiment_diff_vs_torch"] = max(abs(a - b) for a, b in zip(scores, reference))
+            rows.append(row)
+            print(json.dumps(row))
+        return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="torch,int8,onnx,onnx-int8")
+    parser.add_argument("--batch-sizes", default="1,16")
+    parser.add_argument("--model", default=MODEL_NAME, help='hub name or local checkpoint, or "random"')
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    backends = args.backends.split(",")
+    if "torch" in backends:
+        # the float model is the reference for the diff column
+        backends = ["torch"] + [b for b in backends if b != "torch"]
+    run(backends, [int(b) for b in args.batch_sizes.split(",")], args.model, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+CLIP image-encoder backends: torch float vs int8 vs onnxruntime.
+
+    python -m benchmarks.bench_clip [--backends torch,int8,onnx,onnx-int8]
+                                    [--batch-sizes 1,8] [--pretrained openai|none]
+
+For each backend, reports load time, resident memory added by the
+encoder, latency per batch and per image, and the worst cosine similarity
+to the float torch embeddings. --pretrained none uses randomly
+initialised weights (same seed for every backend), so it runs offline;
+the ONNX graphs are then re-exported on every load, which is included in
+load_s.
+Backends are measured in separate processes so their memory doesn't mix.
+"""
+import argparse
+import gc
+import json
+import multiprocessing as mp
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import malloc_trim, rss_bytes, synthetic_scene, time_call
+
+
+def _measure(backend, pretrained, batch_sizes, repeat, onnx_dir, out):
+    import torch
+    from cv_engine.clip_model import ClipEncoder
+
+    torch.manual_seed(0)
+    images = [synthetic_scene(480, 640, seed=s) for s in range(max(batch_sizes))]
+
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    enc = ClipEncoder(pretrained=pretrained, device="cpu", backend=backend, onnx_dir=onnx_dir)
+    load_s = time.perf_counter() - start
+    tensors = torch.stack([enc.preprocess(enc.load_image(im)) for im in images])
+    enc.embed_preprocessed(tensors[:1])  # warm up
+    gc.collect()
+    malloc_trim()  # hand freed load/export buffers back to the OS
+    rss_loaded = rss_bytes() - rss_before
+
+    row = {"backend": backend, "load_s": load_s, "rss_mb": rss_loaded / 2**20}
+    for bs in batch_sizes:
+        t = time_call(lambda: enc.embed_preprocessed(tensors[:bs]), repeat=repeat)
+        row[f"batch{bs}_ms"] = t["best_ms"]
+        row[f"batch{bs}_ms_per_image"] = t["best_ms"] / bs
+    row["embeddings"] = enc.embed_preprocessed(tensors).tolist()
+    out.put(row)
+
+
+def run(backends, batch_sizes, pretrained, repeat):
+    ctx = mp.get_context("spawn")
+    with tempfile.TemporaryDirectory(prefix="bench-clip-") as onnx_dir:
+        rows, reference = [], None
+        for backend in backends:
+            out = ctx.Queue()
+            proc = ctx.Process(target=_measure, args=(backend, pretrained, batch_sizes, repeat, onnx_dir, out))
+            proc.start()
+            row = out.get()
+            proc.join()
+
+            embs = np.asarray(row.pop("embeddings"), dtype=np.float32)
+            if reference is None and backend == "torch":
+                reference = embs
+            if reference is not None:
+                row["min_cosine_vs_torch"] = float((embs * reference).sum(axis=1).min())
+            rows.append(row)
+            print(json.dumps(row))
+        return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="torch,int8,onnx,onnx-int8")
+    parser.add_argument("--batch-sizes", default="1,8")
+    parser.add_argument("--pretrained", default="openai", help='open_clip tag, or "none"')
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    backends = args.backends.split(",")
+    if "torch" in backends:
+        # the float model is the reference for the cosine column
+        backends = ["torch"] + [b for b in backends if b != "torch"]
+    run(
+        backends,
+        [int(b) for b in args.batch_sizes.split(",")],
+        None if args.pretrained.lower() == "none" else args.pretrained,
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+ColorAnalyzer exact vs fast dominant colors.
+
+    python -m benchmarks.bench_color [--sizes vga,1080p,4k,12mp] [--budget 65536]
+
+Reports latency of both modes, the speedup and the palette difference
+(max ΔE after matching clusters) for each image size.
+"""
+import argparse
+import json
+
+from benchmarks.synthetic import IMAGE_SIZES, synthetic_image, time_call, palette_delta_e
+from cv_engine.color import ColorAnalyzer
+
+
+def run(sizes, budget, repeat):
+    exact = ColorAnalyzer(mode="exact")
+    fast = ColorAnalyzer(mode="fast", pixel_budget=budget)
+
+    rows = []
+    for label, h, w in IMAGE_SIZES:
+        if label not in sizes:
+            continue
+        img = synthetic_image(h, w)
+
+        exact_t = time_call(lambda: exact.dominant_colors(img), repeat=1)
+        fast_t = time_call(lambda: fast.dominant_colors(img), repeat=repeat)
+        delta = palette_delta_e(exact.dominant_colors(img), fast.dominant_colors(img))
+
+        rows.append({
+            "size": label,
+            "pixels": h * w,
+            "exact_ms": exact_t["best_ms"],
+            "fast_ms": fast_t["best_ms"],
+            "speedup": exact_t["best_ms"] / fast_t["best_ms"],
+            "max_delta_e": delta,
+        })
+        print(json.dumps(rows[-1]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default=",".join(s[0] for s in IMAGE_SIZES))
+    parser.add_argument("--budget", type=int, default=65536)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.sizes.split(","), args.budget, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+ObjectDetector: default path vs CPU-optimized settings / exported models.
+
+    python -m benchmarks.bench_detector [--model yolov8n.pt] [--images DIR]
+                                        [--configs default,cpu320,onnx320,openvino320-int8]
+
+Reports per-image latency of each configuration and how often its
+main_box (the largest box, all that /full uses) agrees with the default
+path: same "no detection" outcome, or IoU >= 0.5.
+
+--model yolov8n.yaml builds randomly initialised weights, so latency can be
+measured offline; agreement is only meaningful with real weights and
+real photos (--images). Exported models are written next to the weights
+(or into the working directory for a .yaml model).
+"""
+import argparse
+import glob
+import json
+import os
+
+import cv2
+
+from benchmarks.synthetic import synthetic_scene, time_call
+from cv_engine.detector import ObjectDetector, export_detector
+
+# name -> (export format or None, imgsz, int8, max_det)
+CONFIGS = {
+    "default": (None, 640, False, 300),
+    "cpu320": (None, 320, False, 20),
+    "onnx320": ("onnx", 320, False, 20),
+    "openvino320-int8": ("openvino", 320, True, 20),
+}
+
+
+def _iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _agrees(a, b, threshold=0.5):
+    if a is None or b is None:
+        return a is None and b is None
+    return _iou(a, b) >= threshold
+
+
+def _load_images(directory, n):
+    if directory:
+        paths = sorted(glob.glob(os.path.join(directory, "*")))
+        images = [cv2.imread(p) for p in paths]
+        return [im for im in images if im is not None][:n]
+    return [synthetic_scene(720, 960, seed=s) for s in range(n)]
+
+
+def run(model, configs, images, repeat):
+    reference = None
+    rows = []
+    for name in configs:
+        fmt, imgsz, int8, max_det = CONFIGS[name]
+        path = model
+        if fmt is not None:
+            try:
+                path = export_detector(model, format=fmt, imgsz=imgsz, int8=int8)
+            except Exception as e:  # missing optional runtime (openvino, ...)
+                print(json.dumps({"config": name, "skipped": f"{type(e).__name__}: {e}"}))
+                continue
+
+        detector = ObjectDetector(model_path=path, imgsz=imgsz, max_det=max_det, device="cpu")
+        detector.load(images[0])  # warm up
+        t = time_call(lambda: [detector.load(im) for im in images], repeat=repeat)
+        boxes = [detector.load(im)["main_box"] for im in images]
+        if reference is None:
+            reference = boxes
+
+        rows.append({
+            "config": name,
+            "model": str(path),
+            "imgsz": imgsz,
+            "ms_per_image": t["best_ms"] / len(images),
+            "main_box_agreement": sum(_agrees(a, b) for a, b in zip(reference, boxes)) / len(images),
+        })
+        print(json.dumps(rows[-1]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--images", default=None, help="directory of photos (default: synthetic scenes)")
+    parser.add_argument("--n", type=int, default=16, help="number of images")
+    parser.add_argument("--configs", default=",".join(CONFIGS))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.model, args.configs.split(","), _load_images(args.images, args.n), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
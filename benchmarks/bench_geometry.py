@@ -0,0 +1,74 @@
+"""
+Symmetry / clutter: full-resolution reference vs working-resolution
+implementation.
+
+    python -m benchmarks.bench_geometry [--sizes 4k,12mp] [--max-side 1024]
+
+The reference versions are the original implementations (skimage SSIM
+with full=True, Canny at full resolution). Reports best latency and peak
+traced allocation for each.
+"""
+import argparse
+import json
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import IMAGE_SIZES, synthetic_scene, time_call, peak_memory
+from cv_engine.geometry import symmetry_score, clutter_score
+
+
+def reference_symmetry(image_bgr):
+    from skimage.metrics import structural_similarity as ssim
+    gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY).astype("float32")
+    flipped = cv2.flip(gray, 1)
+    score, _ = ssim(gray, flipped, full=True, data_range=255.0)
+    return float(score)
+
+
+def reference_clutter(image_bgr):
+    gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(gray, 100, 200)
+    return float(np.sum(edges > 0) / (image_bgr.shape[0] * image_bgr.shape[1]))
+
+
+def measure(fn, img, repeat):
+    value, peak = peak_memory(lambda: fn(img))
+    t = time_call(lambda: fn(img), repeat=repeat)
+    return {"value": value, "best_ms": t["best_ms"], "peak_mb": peak / 2**20}
+
+
+def run(sizes, max_side, repeat):
+    rows = []
+    for label, h, w in IMAGE_SIZES:
+        if label not in sizes:
+            continue
+        img = synthetic_scene(h, w)
+        for metric, ref, new in [
+            ("symmetry", reference_symmetry, lambda im: symmetry_score(im, max_side=max_side)),
+            ("clutter", reference_clutter, lambda im: clutter_score(im, max_side=max_side)),
+        ]:
+            before = measure(ref, img, repeat)
+            after = measure(new, img, repeat)
+            rows.append({
+                "size": label,
+                "metric": metric,
+                "reference": before,
+                "working_res": after,
+                "speedup": before["best_ms"] / after["best_ms"],
+            })
+            print(json.dumps(rows[-1]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="4k,12mp")
+    parser.add_argument("--max-side", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.sizes.split(","), args.max_side, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
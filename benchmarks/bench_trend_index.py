@@ -0,0 +1,120 @@
+"""
+Viral-bank nearest-neighbour search: exact blocked matmul vs IVF.
+
+    python -m benchmarks.bench_trend_index [--sizes 10k,100k,1m] [--k 10] [--nprobe 8,16,32]
+
+For each bank size, reports build time (including generating the
+synthetic vectors), per-query latency (batches of one, as /trend sees
+them) and recall@k of the IVF index against exact search.
+Vectors are streamed in chunks and the IVF quantizer is trained on a
+sample first, so the 1m bank needs a little over 2 GB of RAM.
+"""
+import argparse
+import gc
+import json
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_embedding_chunks
+from cv_engine.ann_index import ExactIndex, IVFIndex
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+
+def _queries(bank, n, seed=1):
+    # perturbed bank entries: realistic "near a known trend" queries
+    rng = np.random.default_rng(seed)
+    q = bank[rng.choice(len(bank), n, replace=False)].copy()
+    q += rng.standard_normal(q.shape).astype(np.float32) * (0.3 / np.sqrt(q.shape[1]))
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+def _per_query_ms(index, queries, k, **kwargs):
+    start = time.perf_counter()
+    for q in queries:
+        index.search(q, k, **kwargs)
+    return (time.perf_counter() - start) * 1000.0 / len(queries)
+
+
+def _recall(truth, found):
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / truth.size
+
+
+def run(sizes, k, nprobes, n_queries, dim=512):
+    rows = []
+    for label in sizes:
+        n = SIZES[label]
+
+        exact = ExactIndex(dim)
+        start = time.perf_counter()
+        for chunk in synthetic_embedding_chunks(n, dim):
+            exact.add(chunk)
+        exact_build_ms = (time.perf_counter() - start) * 1000.0
+
+        queries = _queries(next(synthetic_embedding_chunks(n, dim)), n_queries)
+        truth = exact.search(queries, k)[1]
+        exact_ms = _per_query_ms(exact, queries, k)
+        start = time.perf_counter()
+        exact.search(queries, k)
+        batch_ms = (time.perf_counter() - start) * 1000.0
+        del exact
+        gc.collect()
+
+        # train on the first chunk(s), then file everything into cells
+        # nlist is sized for the final bank, so no retraining while it fills
+        ivf = IVFIndex(dim, nlist=max(1, int(2 * np.sqrt(n))), retrain_growth=None)
+        start = time.perf_counter()
+        chunks = synthetic_embedding_chunks(n, dim)
+        sample = []
+        for chunk in chunks:
+            sample.append(chunk)
+            if sum(map(len, sample)) >= ivf.nlist * ivf.train_sample:
+                break
+        sample = np.concatenate(sample)
+        ivf.train(sample)
+        ivf.add(sample)
+        del sample
+        for chunk in chunks:
+            ivf.add(chunk)
+        ivf_build_ms = (time.perf_counter() - start) * 1000.0
+
+        for nprobe in nprobes:
+            found = ivf.search(queries, k, nprobe=nprobe)[1]
+            rows.append({
+                "size": label,
+                "vectors": n,
+                "k": k,
+                "nlist": ivf.nlist,
+                "nprobe": nprobe,
+                "exact_build_ms": exact_build_ms,
+                "ivf_build_ms": ivf_build_ms,
+                "exact_query_ms": exact_ms,
+                "exact_batch_query_ms": batch_ms / n_queries,
+                "ivf_query_ms": _per_query_ms(ivf, queries, k, nprobe=nprobe),
+                "recall": _recall(truth, found),
+            })
+            print(json.dumps(rows[-1]))
+        del ivf
+        gc.collect()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default=",".join(SIZES))
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", default="8,16,32")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    run(
+        args.sizes.split(","),
+        args.k,
+        [int(p) for p in args.nprobe.split(",")],
+        args.queries,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,545 @@
+"""
+Load test for the FastAPI service: throughput, latency percentiles and
+memory over time under a mix of concurrent requests.
+
+    python -m benchmarks.loadtest [--server inprocess|local|http://host:port]
+                                  [--mix full=6,detect=1,trend=1,caption=1,virality=1]
+                                  [--concurrency 8] [--duration 30] [--rate RPS]
+                                  [--stub] [--stub-ms detector=5+20,clip=5+25,caption=2+5]
+                                  [--workers 2] [--size 1080p] [--images 16] [--unique]
+                                  [--out report.json]
+
+--server inprocess drives backend.main.app through httpx's ASGI
+transport, in this process and event loop: no sockets, but the client
+shares the CPU and the GIL with the app, so use it to compare changes,
+not to size nodes. --server local starts ``backend.serve`` (pre-fork,
+--workers workers) on a free port and sends real HTTP; a URL targets a
+server that is already running (pass --pid to sample its memory).
+
+--stub replaces the detector, CLIP and caption models with fakes that
+sleep a fixed time per call, "fixed+per_item" milliseconds (sleeping
+releases the GIL, as the real models do), so the serving layer -
+decoding, pools, batchers, caches, scoring - is measured on its own.
+The trend bank, colour, geometry and scoring code stay real.
+
+Without --rate, --concurrency clients send back-to-back requests (closed
+loop: the most the node sustains at that concurrency). With --rate,
+requests are started on a fixed schedule, at most --concurrency at a
+time, and latency counts from the scheduled start, so time spent
+waiting behind a slow server is not hidden. Images are cycled from a
+pool of --images synthetic JPEGs; --unique makes every upload and
+caption distinct, so the stage result cache never hits.
+
+The report (JSON on stdout or --out, a summary on stderr) has the
+request and status counts, throughput of 2xx responses, p50 / p95 / p99
+latency overall and per route, and a timeline of throughput, p95 and
+server memory (RSS and PSS; summed over the workers for --server local)
+every --interval seconds.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.synthetic import IMAGE_SIZES, synthetic_captions, synthetic_embeddings, synthetic_scene
+
+ROUTES = ("full", "detect", "trend", "caption", "caption_batch", "virality")
+DEFAULT_MIX = "full=6,detect=1,trend=1,caption=1,virality=1"
+DEFAULT_STUB_MS = "detector=5+20,clip=5+25,caption=2+5"
+
+
+# ---------- stub models ----------
+
+def _sleep_ms(costs: Tuple[float, float], n: int) -> None:
+    fixed, per_item = costs
+    time.sleep((fixed + per_item * n) / 1000.0)
+
+
+class StubDetector:
+    """ObjectDetector stand-in: one centred box, fixed cost per call."""
+
+    def __init__(self, costs):
+        self.costs = costs
+
+    def load(self, image_source):
+        return self.load_batch([image_source])[0]
+
+    def load_batch(self, image_sources):
+        from cv_engine.image_io import DecodedImage
+
+        _sleep_ms(self.costs, len(image_sources))
+        out = []
+        for src in image_sources:
+            img = src.bgr if isinstance(src, DecodedImage) else src
+            h, w = img.shape[:2]
+            box = [w * 0.25, h * 0.25, w * 0.75, h * 0.75]
+            out.append({
+                "boxes": [box], "classes": [0.0], "confidences": [0.9],
+                "main_box": box, "image_size": (w, h),
+            })
+        return out
+
+
+class StubClip:
+    """ClipEncoder stand-in: unit vectors derived from the mean colour."""
+
+    device = "cpu"
+    preprocess = None
+
+    def __init__(self, costs):
+        self.costs = costs
+
+    def embed_image(self, image):
+        return self.embed_images([image])[0]
+
+    def embed_images(self, images):
+        from cv_engine.image_io import DecodedImage
+
+        _sleep_ms(self.costs, len(images))
+        embs = np.zeros((len(images), 512), dtype=np.float32)
+        for i, im in enumerate(images):
+            img = im.bgr if isinstance(im, DecodedImage) else np.asarray(im)
+            embs[i, :3] = img[::16, ::16].reshape(-1, 3).mean(axis=0) / 255.0
+            embs[i, 3] = 1.0
+        return embs / np.linalg.norm(embs, axis=1, keepdims=True)
+
+    def embed_texts(self, texts):
+        embs = np.zeros((len(texts), 512), dtype=np.float32)
+        embs[np.arange(len(texts)), np.arange(len(texts)) % 512] = 1.0
+        return embs
+
+
+class StubCaption:
+    """CaptionAnalyzer stand-in: a constant result, fixed cost per call."""
+
+    def __init__(self, costs):
+        self.costs = costs
+
+    def analyze(self, caption):
+        return self.analyze_batch([caption])[0]
+
+    def analyze_batch(self, captions, batch_size=32):
+        from text_engine.caption_analysis import CaptionAnalysisResult
+
+        _sleep_ms(self.costs, len(captions))
+        return [CaptionAnalysisResult(0.5, 0.0, 0.0, 0.5, 0.0, 0.3) for _ in captions]
+
+    def cache_stats(self):
+        return {"hits": 0, "misses": 0}
+
+
+def parse_stub_ms(spec: str) -> Dict[str, Tuple[float, float]]:
+    """ "detector=5+20,clip=10" -> {"detector": (5.0, 20.0), "clip": (0.0, 10.0)}"""
+    costs = {}
+    for part in filter(None, spec.split(",")):
+        name, _, value = part.partition("=")
+        fixed, plus, per_item = value.partition("+")
+        costs[name] = (float(fixed), float(per_item)) if plus else (0.0, float(fixed))
+    return costs
+
+
+def install_stubs(costs: Dict[str, Tuple[float, float]], bank_dir: str, bank_size: int = 1000) -> None:
+    """
+    Register the stub models with the global registry. Trend and
+    aesthetic are built for real on top of the stub CLIP, the trend bank
+    in bank_dir (owned by the caller) filled with bank_size synthetic
+    embeddings.
+    """
+    from backend.registry import registry
+    from cv_engine.aesthetic import AestheticScorer
+    from cv_engine.trend_similarity import TrendSimilarity
+
+    def build_trend():
+        trend = TrendSimilarity(bank_dir=bank_dir, clip=registry.clip)
+        if bank_size:
+            meta = [{"path": str(i), "label": "viral"} for i in range(bank_size)]
+            trend.add_embeddings(synthetic_embeddings(bank_size), meta)
+            trend.store.wait()
+        return trend
+
+    registry.register("detector", lambda: StubDetector(costs.get("detector", (0.0, 0.0))))
+    registry.register("clip", lambda: StubClip(costs.get("clip", (0.0, 0.0))))
+    registry.register("caption", lambda: StubCaption(costs.get("caption", (0.0, 0.0))))
+    registry.register("trend", build_trend)
+    registry.register("aesthetic", lambda: AestheticScorer(clip=registry.clip))
+
+
+# ---------- requests ----------
+
+class Workload:
+    """Builds the requests of the mix from a pool of synthetic inputs."""
+
+    def __init__(self, mix: Dict[str, float], size: str = "1080p", images: int = 16,
+                 unique: bool = False, seed: int = 0):
+        import cv2
+
+        unknown = set(mix) - set(ROUTES)
+        if unknown:
+            raise ValueError(f"Unknown routes in mix: {sorted(unknown)} (choose from {ROUTES})")
+        h, w = next((h, w) for label, h, w in IMAGE_SIZES if label == size)
+        self.images = []
+        for i in range(images):
+            ok, buf = cv2.imencode(".jpg", synthetic_scene(h, w, seed=seed + i), [cv2.IMWRITE_JPEG_QUALITY, 90])
+            self.images.append(buf.tobytes())
+        self.captions = synthetic_captions(max(64, images), seed=seed)
+        self.unique = unique
+        self.routes = list(mix)
+        self.weights = [mix[r] for r in self.routes]
+        self._rng = random.Random(seed)
+        self._n = 0
+
+    def next(self) -> Tuple[str, str, Dict]:
+        """(route, path, httpx request kwargs) for the next request."""
+        route = self._rng.choices(self.routes, self.weights)[0]
+        n = self._n
+        self._n += 1
+        image = self.images[n % len(self.images)]
+        caption = self.captions[n % len(self.captions)]
+        if self.unique:
+            # bytes after the JPEG end marker are ignored by the decoder
+            # but change the content hash
+            image += b"loadtest%016d" % n
+            caption = f"{caption} #{n}"
+        upload = {"file": ("image.jpg", image, "image/jpeg")}
+
+        if route == "full":
+            return route, "/full/full/", {"files": upload, "data": {"caption": caption}}
+        if route == "detect":
+            return route, "/detect/", {"files": upload}
+        if route == "trend":
+            return route, "/trend/", {"files": upload}
+        if route == "caption":
+            return route, "/caption/", {"json": {"caption": caption}}
+        if route == "caption_batch":
+            captions = [self.captions[(n + i) % len(self.captions)] for i in range(16)]
+            if self.unique:
+                captions = [f"{c} #{n}" for c in captions]
+            return route, "/caption/batch", {"json": {"captions": captions}}
+        body = {
+            "aesthetic_score": 0.6,
+            "geometry_scores": {"rule_of_thirds": 0.7, "symmetry": 0.4, "clutter": 0.2},
+            "color_scores": {"brightness": 0.6, "contrast": 0.5},
+            "caption_score": 0.55,
+            "trend_similarity": 0.4,
+        }
+        return route, "/virality/", {"json": body}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in filter(None, spec.split(",")):
+        name, _, weight = part.partition("=")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# ---------- memory ----------
+
+def _children(pid: int) -> List[int]:
+    out = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                out += [int(c) for c in f.read().split()]
+    except OSError:
+        pass
+    return out
+
+
+def process_memory(pid: int, tree: bool = False) -> Dict[str, int]:
+    """rss / pss bytes of pid, summed with all its descendants if tree."""
+    from backend.serve import worker_memory
+
+    pids, total = [pid], {"rss": 0, "pss": 0, "processes": 0}
+    while pids:
+        p = pids.pop()
+        mem = worker_memory(p)
+        if mem:
+            total["rss"] += mem.get("rss", 0)
+            total["pss"] += mem.get("pss", 0)
+            total["processes"] += 1
+        if tree:
+            pids += _children(p)
+    return total
+
+
+# ---------- running ----------
+
+def _latency_stats(latencies: List[float]) -> Dict[str, Optional[float]]:
+    if not latencies:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None, "max_ms": None}
+    ms = np.asarray(latencies) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2),
+        "mean_ms": round(float(ms.mean()), 2), "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def _summarize(records: List[Tuple], duration: float) -> Dict:
+    # records: (end offset s, latency s, route, status)
+    statuses: Dict[str, int] = {}
+    for _, _, _, status in records:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    ok = [lat for _, lat, _, status in records if isinstance(status, int) and status < 300]
+    return {
+        "requests": len(records),
+        "ok": len(ok),
+        "statuses": statuses,
+        "throughput_rps": round(len(ok) / duration, 2) if duration > 0 else None,
+        "latency": _latency_stats(ok),
+    }
+
+
+async def _drive(client, workload: Workload, concurrency: int, duration: float,
+                 rate: Optional[float], interval: float, memory_pid: Optional[int], tree: bool):
+    records: List[Tuple] = []
+    memory: List[Dict] = []
+    start = time.perf_counter()
+    deadline = start + duration
+    next_slot = 0
+
+    async def one():
+        route, path, kwargs = workload.next()
+        try:
+            response = await client.post(path, **kwargs)
+            return route, response.status_code
+        except Exception as e:
+            return route, f"error:{type(e).__name__}"
+
+    async def worker():
+        nonlocal next_slot
+        while True:
+            if rate:
+                sent = start + next_slot / rate
+                next_slot += 1
+                if sent >= deadline:
+                    return
+                await asyncio.sleep(max(0.0, sent - time.perf_counter()))
+            else:
+                sent = time.perf_counter()
+                if sent >= deadline:
+                    return
+            route, status = await one()
+            end = time.perf_counter()
+            records.append((end - start, end - sent, route, status))
+
+    async def sample_memory():
+        while True:
+            if memory_pid is not None:
+                mem = await asyncio.to_thread(process_memory, memory_pid, tree)
+                memory.append({"t": round(time.perf_counter() - start, 2), **mem})
+            await asyncio.sleep(interval)
+
+    sampler = asyncio.create_task(sample_memory())
+    try:
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+    finally:
+        sampler.cancel()
+    if memory_pid is not None:
+        memory.append({"t": round(time.perf_counter() - start, 2), **process_memory(memory_pid, tree)})
+    return records, memory, time.perf_counter() - start
+
+
+def _timeline(records: List[Tuple], memory: List[Dict], interval: float, duration: float) -> List[Dict]:
+    rows = []
+    n = max(1, int(np.ceil(duration / interval)))
+    for i in range(n):
+        lo, hi = i * interval, (i + 1) * interval
+        window = [r for r in records if lo <= r[0] < hi]
+        ok = [lat for _, lat, _, status in window if isinstance(status, int) and status < 300]
+        row = {
+            "t": round(hi, 2),
+            "requests": len(window),
+            "ok_rps": round(len(ok) / interval, 2),
+            "p95_ms": _latency_stats(ok)["p95_ms"],
+        }
+        # the last memory sample taken in (or before) the window
+        mem = [m for m in memory if m["t"] < hi]
+        if mem:
+            row["rss_mb"] = round(mem[-1]["rss"] / 2**20, 1)
+            row["pss_mb"] = round(mem[-1]["pss"] / 2**20, 1)
+        rows.append(row)
+    return rows
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(client, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            if (await client.get("/readyz")).status_code == 200:
+                return
+        except Exception:
+            pass
+        if time.perf_counter() > deadline:
+            raise RuntimeError(f"server not ready after {timeout:.0f}s")
+        await asyncio.sleep(0.25)
+
+
+async def _run(args, bank_dir: str) -> Dict:
+    import httpx
+
+    workload = Workload(parse_mix(args.mix), size=args.size, images=args.images, unique=args.unique)
+    server, memory_pid, tree = None, args.pid, True
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    if args.server == "inprocess":
+        if args.stub:
+            install_stubs(parse_stub_ms(args.stub_ms), bank_dir, args.bank_size)
+        from backend.main import app
+        from backend.registry import registry
+
+        registry.warmup()
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout)
+        memory_pid, tree = os.getpid(), False
+    else:
+        base_url = args.server
+        if args.server == "local":
+            port = _free_port()
+            cmd = [sys.executable, "-m", "benchmarks.loadtest", "--serve", "--port", str(port),
+                   "--workers", str(args.workers), "--bank-size", str(args.bank_size)]
+            if args.stub:
+                cmd += ["--stub", "--stub-ms", args.stub_ms]
+            server = subprocess.Popen(cmd)
+            base_url, memory_pid = f"http://127.0.0.1:{port}", server.pid
+        client = httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits)
+
+    try:
+        async with client:
+            if args.server != "inprocess":
+                await _wait_ready(client, args.ready_timeout)
+            # one of each route first: lazy imports, pools and batcher threads
+            for route in workload.routes:
+                while True:
+                    r, path, kwargs = workload.next()
+                    if r == route:
+                        await client.post(path, **kwargs)
+                        break
+            records, memory, elapsed = await _drive(
+                client, workload, args.concurrency, args.duration, args.rate,
+                args.interval, memory_pid, tree,
+            )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = {"summary": _summarize(records, elapsed), "routes": {}}
+    for route in workload.routes:
+        report["routes"][route] = _summarize([r for r in records if r[2] == route], elapsed)
+    if memory:
+        rss = [m["rss"] for m in memory]
+        pss = [m["pss"] for m in memory]
+        report["memory"] = {
+            "processes": memory[-1]["processes"],
+            "rss_start_mb": round(rss[0] / 2**20, 1),
+            "rss_end_mb": round(rss[-1] / 2**20, 1),
+            "rss_peak_mb": round(max(rss) / 2**20, 1),
+            "pss_start_mb": round(pss[0] / 2**20, 1),
+            "pss_end_mb": round(pss[-1] / 2**20, 1),
+            "growth_mb": round((pss[-1] - pss[0]) / 2**20, 1),
+        }
+    report["timeline"] = _timeline(records, memory, args.interval, elapsed)
+    return report
+
+
+def run(args) -> Dict:
+    from benchmarks.run import _meta
+
+    # holds the stub trend bank of --stub --server inprocess
+    with tempfile.TemporaryDirectory(prefix="loadtest-bank-") as bank_dir:
+        report = asyncio.run(_run(args, bank_dir))
+    return {"meta": _meta(args), **report}
+
+
+def _print_report(report: Dict) -> None:
+    def line(name, s):
+        lat = s["latency"]
+        if lat["p50_ms"] is None:
+            return f"{name:14s} {s['requests']:7d} req {s['ok']:7d} ok   (no successful requests)"
+        return (
+            f"{name:14s} {s['requests']:7d} req {s['ok']:7d} ok {s['throughput_rps']:8.1f} req/s   "
+            f"p50 {lat['p50_ms']:8.1f}  p95 {lat['p95_ms']:8.1f}  p99 {lat['p99_ms']:8.1f} ms"
+        )
+
+    print(line("all", report["summary"]), file=sys.stderr)
+    for route, s in report["routes"].items():
+        print(line(route, s), file=sys.stderr)
+    print(f"statuses: {report['summary']['statuses']}", file=sys.stderr)
+    mem = report.get("memory")
+    if mem:
+        print(
+            f"memory ({mem['processes']} process(es)): pss {mem['pss_start_mb']} -> {mem['pss_end_mb']} MB "
+            f"({mem['growth_mb']:+} MB), rss peak {mem['rss_peak_mb']} MB",
+            file=sys.stderr,
+        )
+
+
+def _serve(args) -> None:
+    """--server local: the child process that runs the service."""
+    import logging
+    from backend.serve import serve
+
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory(prefix="loadtest-bank-") as bank_dir:
+        if args.stub:
+            install_stubs(parse_stub_ms(args.stub_ms), bank_dir, args.bank_size)
+        # serve() returns on SIGTERM, so the bank goes away with the server
+        serve("127.0.0.1", args.port, args.workers)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", default="inprocess", help='"inprocess", "local" or a base URL')
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"route=weight pairs from {', '.join(ROUTES)}")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--rate", type=float, default=None, help="requests/s to start (default: closed loop)")
+    parser.add_argument("--stub", action="store_true", help="replace detector, CLIP and caption with fakes")
+    parser.add_argument("--stub-ms", default=DEFAULT_STUB_MS, help="model=fixed+per_item ms per call")
+    parser.add_argument("--bank-size", type=int, default=1000, help="synthetic trend bank size with --stub")
+    parser.add_argument("--workers", type=int, default=2, help="with --server local")
+    parser.add_argument("--pid", type=int, default=None, help="server pid to sample memory from (with a URL)")
+    parser.add_argument("--size", default="1080p", help="upload size from benchmarks.synthetic")
+    parser.add_argument("--images", type=int, default=16, help="distinct images to cycle through")
+    parser.add_argument("--unique", action="store_true", help="make every request distinct (no cache hits)")
+    parser.add_argument("--interval", type=float, default=1.0, help="timeline resolution, seconds")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout, seconds")
+    parser.add_argument("--ready-timeout", type=float, default=600.0)
+    parser.add_argument("--out", default=None, help="write the report JSON here (default: stdout)")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=8000, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        _serve(args)
+        return
+
+    report = run(args)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
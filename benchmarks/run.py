@@ -0,0 +1,261 @@
+"""
+Offline micro-benchmark suite for cv_engine, text_engine and scoring.
+
+    python -m benchmarks.run [--suites geometry,color,detector,trend,caption,scoring]
+                             [--sizes vga,1080p,4k] [--bank-sizes 1k,10k,100k]
+                             [--repeat 5] [--out results.json]
+                             [--baseline baseline.json] [--tolerance 0.25]
+
+Every input is synthetic and deterministic (benchmarks.synthetic), and
+the models are randomly initialised at their real sizes (YOLOv8n from
+yolov8n.yaml, CLIP ViT-B/32 without pretrained weights, a RoBERTa-base
+shaped sentiment classifier), so nothing is downloaded. Latency does not
+depend on the weights; the values computed do, so only timings are
+compared. Pass --detector-model / --caption-model to time real weights.
+
+Results are written as JSON: {"meta": {...}, "results": {name: {"best_ms",
+"mean_ms", ...}}}. With --baseline, each benchmark's best_ms is compared
+with the baseline's and the run exits with status 1 if any is more than
+--tolerance slower.
+
+    python -m benchmarks.run --out baseline.json          # on main
+    python -m benchmarks.run --baseline baseline.json     # on the branch
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import closing
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from benchmarks.synthetic import (
+    IMAGE_SIZES,
+    synthetic_captions,
+    synthetic_embeddings,
+    synthetic_scene,
+    time_call,
+)
+
+SUITES = ("geometry", "color", "detector", "trend", "caption", "scoring")
+BANK_SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+
+Bench = Tuple[str, Callable[[], object]]
+
+
+# ---------- suites ----------
+# Each suite yields (name, fn) pairs; fn is timed after one warm-up call.
+
+def geometry_suite(args) -> Iterator[Bench]:
+    from cv_engine.geometry import (
+        brightness_score, clutter_score, contrast_score, rule_of_thirds_score, symmetry_score,
+    )
+    for label, h, w in _sizes(args):
+        img = synthetic_scene(h, w)
+        yield f"geometry.symmetry_score[{label}]", lambda img=img: symmetry_score(img)
+        yield f"geometry.clutter_score[{label}]", lambda img=img: clutter_score(img)
+        yield f"geometry.brightness_score[{label}]", lambda img=img: brightness_score(img)
+        yield f"geometry.contrast_score[{label}]", lambda img=img: contrast_score(img)
+    yield "geometry.rule_of_thirds_score", lambda: rule_of_thirds_score(320, 240, 640, 480)
+
+
+def color_suite(args) -> Iterator[Bench]:
+    from cv_engine.color import ColorAnalyzer
+    for mode in ("fast", "exact"):
+        analyzer = ColorAnalyzer(mode=mode)
+        for label, h, w in _sizes(args):
+            if mode == "exact" and h * w > 1920 * 1080:
+                continue  # seconds per call; fast mode is the one served
+            img = synthetic_scene(h, w)
+            yield f"color.extract_colors.{mode}[{label}]", lambda a=analyzer, img=img: a.extract_colors(img)
+
+
+def detector_suite(args) -> Iterator[Bench]:
+    from cv_engine.detector import ObjectDetector
+    detector = ObjectDetector(model_path=args.detector_model, device="cpu")
+    for label, h, w in _sizes(args):
+        img = synthetic_scene(h, w)
+        yield f"detector.load[{label}]", lambda img=img: detector.load(img)
+
+
+def trend_suite(args) -> Iterator[Bench]:
+    import torch
+    from cv_engine.clip_model import ClipEncoder
+    from cv_engine.trend_similarity import TrendSimilarity
+
+    torch.manual_seed(0)
+    clip = ClipEncoder(pretrained=None, device="cpu")
+    img = synthetic_scene(480, 640)
+    emb = clip.embed_image(img)
+    yield "trend.embed_image", lambda: clip.embed_image(img)
+
+    for label in args.bank_sizes.split(","):
+        n = BANK_SIZES[label]
+        with tempfile.TemporaryDirectory(prefix="bench-bank-") as bank_dir:
+            trend = TrendSimilarity(bank_dir=bank_dir, clip=clip)
+            trend.add_embeddings(synthetic_embeddings(n), [{"path": str(i), "label": "viral"} for i in range(n)])
+            trend.store.wait()
+            if hasattr(trend.index, "train"):
+                trend.index.train()
+            yield f"trend.similarity_score[{label}]", lambda t=trend: t.similarity_score(img)
+            yield f"trend.similarity_from_embedding[{label}]", lambda t=trend: t.similarity_from_embedding(emb)
+
+
+def caption_suite(args) -> Iterator[Bench]:
+    from text_engine.caption_analysis import CaptionAnalyzer
+
+    captions = synthetic_captions(64)
+    with tempfile.TemporaryDirectory(prefix="bench-caption-") as workdir:
+        model = args.caption_model
+        if model == "random":
+            from benchmarks.bench_caption import random_checkpoint
+            model = random_checkpoint(workdir, captions)
+        # cache_size=0: every call runs the model
+        analyzer = CaptionAnalyzer(device="cpu", cache_size=0, model_name=model)
+
+        short, long = min(captions, key=len), max(captions, key=len)
+        yield "caption.analyze[short]", lambda: analyzer.analyze(short)
+        yield "caption.analyze[long]", lambda: analyzer.analyze(long)
+        yield "caption.analyze_batch[16]", lambda: analyzer.analyze_batch(captions[:16])
+
+
+def scoring_suite(args) -> Iterator[Bench]:
+    from scoring.virality_score import ViralityScorer
+    scorer = ViralityScorer()
+    geometry = {"rule_of_thirds": 0.7, "symmetry": 0.4, "clutter": 0.2}
+    color = {"brightness": 0.6, "contrast": 0.5}
+    yield "scoring.compute", lambda: scorer.compute(0.55, geometry, color, 0.6, 0.4)
+
+
+def _sizes(args):
+    wanted = args.sizes.split(",")
+    return [(label, h, w) for label, h, w in IMAGE_SIZES if label in wanted]
+
+
+# ---------- running / comparing ----------
+
+def _calibrate(fn, min_ms: float = 20.0) -> int:
+    """
+    Warm fn up (lazy init, caches, thread pools), then pick how many calls
+    to time together so that fast functions aren't measured in timer noise.
+    """
+    fn()
+    once = time_call(fn, repeat=1)["best_ms"]
+    return max(1, min(100_000, int(min_ms / max(once, 1e-4))))
+
+
+def _meta(args) -> Dict:
+    try:
+        rev = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        rev = None
+    versions = {}
+    for module in ("numpy", "cv2", "torch", "transformers", "ultralytics", "open_clip", "sklearn"):
+        mod = sys.modules.get(module)
+        if mod is not None:
+            versions[module] = getattr(mod, "__version__", None)
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_rev": rev,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+        "args": vars(args),
+    }
+
+
+def run(args) -> Dict:
+    suites = {name: globals()[f"{name}_suite"] for name in SUITES}
+    results = {}
+    for suite in args.suites.split(","):
+        start = time.perf_counter()
+        # closing(): a suite's temporary files go away as soon as it ends,
+        # even when a benchmark fails
+        with closing(suites[suite](args)) as benches:
+            for name, fn in benches:
+                loops = _calibrate(fn)
+                t = time_call(lambda: [fn() for _ in range(loops)], repeat=args.repeat)
+                results[name] = {k: round(v / loops, 4) for k, v in t.items()}
+                results[name]["loops"] = loops
+                print(f"{name:48s} {results[name]['best_ms']:10.3f} ms", file=sys.stderr)
+        print(f"# {suite}: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return {"meta": _meta(args), "results": results}
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = 0.25) -> List[Dict]:
+    """
+    One row per benchmark in either run. status is "regression" when
+    best_ms grew by more than tolerance (0.25 = 25%), "improved" when it
+    shrank by as much, "new" / "missing" when only one run has it.
+    """
+    cur, base = current["results"], baseline["results"]
+    rows = []
+    for name in sorted(set(cur) | set(base)):
+        if name not in base:
+            rows.append({"name": name, "status": "new", "current_ms": cur[name]["best_ms"]})
+            continue
+        if name not in cur:
+            rows.append({"name": name, "status": "missing", "baseline_ms": base[name]["best_ms"]})
+            continue
+        before, after = base[name]["best_ms"], cur[name]["best_ms"]
+        ratio = after / before if before > 0 else float("inf")
+        if ratio > 1 + tolerance:
+            status = "regression"
+        elif ratio < 1 / (1 + tolerance):
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append({"name": name, "status": status, "baseline_ms": before, "current_ms": after, "ratio": ratio})
+    return rows
+
+
+def _print_comparison(rows: List[Dict]) -> None:
+    for row in rows:
+        if "ratio" in row:
+            print(
+                f"{row['status']:10s} {row['name']:48s} {row['baseline_ms']:10.3f} -> "
+                f"{row['current_ms']:10.3f} ms  x{row['ratio']:.2f}",
+                file=sys.stderr,
+            )
+        else:
+            print(f"{row['status']:10s} {row['name']}", file=sys.stderr)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suites", default=",".join(SUITES))
+    parser.add_argument("--sizes", default="vga,1080p,4k", help="image sizes from benchmarks.synthetic")
+    parser.add_argument("--bank-sizes", default=",".join(BANK_SIZES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--detector-model", default="yolov8n.yaml")
+    parser.add_argument("--caption-model", default="random", help='hub name or local checkpoint, or "random"')
+    parser.add_argument("--out", default=None, help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", default=None, help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.tolerance)
+        _print_comparison(rows)
+        if any(row["status"] == "regression" for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Deterministic synthetic inputs and small timing helpers shared by the
+benchmarks. Nothing here touches the network.
+"""
+import time
+import tracemalloc
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+
+# (label, height, width)
+IMAGE_SIZES = [
+    ("vga", 480, 640),
+    ("1080p", 1080, 1920),
+    ("4k", 2160, 3840),
+    ("12mp", 3000, 4000),
+]
+
+
+def synthetic_image(h: int, w: int, seed: int = 0) -> np.ndarray:
+    """
+    BGR uint8 image with smooth gradients, a solid block and noise, so
+    that color, edge and symmetry metrics have something to measure.
+    """
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    img = np.stack([
+        255 * x / w,
+        255 * y / h,
+        128 + 100 * np.sin(x / (w / 7)) * np.cos(y / (h / 5)),
+    ], axis=-1)
+    img[h // 3: 2 * h // 3, w // 4: w // 2] = (30, 200, 90)
+    img += rng.normal(0, 12, img.shape).astype(np.float32)
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def synthetic_scene(h: int, w: int, seed: int = 0, noise: float = 2.0) -> np.ndarray:
+    """
+    BGR uint8 "photo" of flat shapes over a gradient. Shapes are placed in
+    relative coordinates, so the same seed gives the same scene at any
+    resolution (useful for resolution-stability checks).
+    """
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    shapes = np.random.default_rng(1000 + seed)
+
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    img = np.stack([
+        200 * x / w + 20,
+        160 * y / h + 40,
+        90 + 60 * (x / w) * (y / h),
+    ], axis=-1)
+
+    for _ in range(12):
+        cx, cy, r = shapes.uniform(0.1, 0.9), shapes.uniform(0.1, 0.9), shapes.uniform(0.03, 0.15)
+        color = shapes.uniform(0, 255, 3).tolist()
+        cv2.circle(img, (int(cx * w), int(cy * h)), int(r * min(h, w)), color, -1, lineType=cv2.LINE_AA)
+    for _ in range(6):
+        x1, y1 = shapes.uniform(0, 0.8, 2)
+        dx, dy = shapes.uniform(0.05, 0.2, 2)
+        color = shapes.uniform(0, 255, 3).tolist()
+        cv2.rectangle(img, (int(x1 * w), int(y1 * h)), (int((x1 + dx) * w), int((y1 + dy) * h)), color, -1)
+
+    img += rng.normal(0, noise, img.shape).astype(np.float32)
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def synthetic_embedding_chunks(n: int, dim: int = 512, seed: int = 0,
+                               n_topics: int = 1000, spread: float = 0.6,
+                               chunk: int = 65536):
+    """
+    Yields (m, dim) float32 unit vectors, n in total, drawn around n_topics
+    random directions: a rough stand-in for CLIP embeddings of a bank of
+    trending images, which cluster by subject.
+    """
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((n_topics, dim)).astype(np.float32)
+    topics /= np.linalg.norm(topics, axis=1, keepdims=True)
+
+    for start in range(0, n, chunk):
+        m = min(chunk, n - start)
+        x = topics[rng.integers(0, n_topics, m)]
+        x += rng.standard_normal((m, dim)).astype(np.float32) * (spread / np.sqrt(dim))
+        x /= np.linalg.norm(x, axis=1, keepdims=True)
+        yield x
+
+
+def synthetic_embeddings(n: int, dim: int = 512, seed: int = 0, **kwargs) -> np.ndarray:
+    """All of synthetic_embedding_chunks(...) as one (n, dim) array."""
+    return np.concatenate(list(synthetic_embedding_chunks(n, dim, seed, **kwargs)))
+
+
+_CAPTION_WORDS = (
+    "the a my this our new best worst love hate today again finally honestly "
+    "sunset coffee beach city team video post reel trip dinner launch week "
+    "amazing terrible great boring crazy proud tired happy sad excited "
+    "did you know stop scrolling link in bio follow for more save this"
+).split()
+_CAPTION_EMOJI = ["🔥", "😎", "🙌", "💛", "😭", "✨"]
+
+
+def synthetic_captions(n: int, seed: int = 0, max_words: int = 40):
+    """n social-media-like captions of 1..max_words words, some with emoji."""
+    rng = np.random.default_rng(seed)
+    captions = []
+    for _ in range(n):
+        words = list(rng.choice(_CAPTION_WORDS, size=int(rng.integers(1, max_words + 1))))
+        if rng.random() < 0.4:
+            words.append(str(rng.choice(_CAPTION_EMOJI)))
+        captions.append(" ".join(words))
+    return captions
+
+
+def time_call(fn: Callable, repeat: int = 3) -> Dict[str, float]:
+    """Best and mean wall time in milliseconds over `repeat` calls."""
+    times = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return {"best_ms": min(times), "mean_ms": sum(times) / len(times)}
+
+
+def peak_memory(fn: Callable) -> Tuple[object, int]:
+    """Run fn once; return (result, peak bytes allocated by numpy/python)."""
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def malloc_trim() -> None:
+    """Hand memory freed by Python / torch back to the OS (glibc only)."""
+    import ctypes
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process (Linux; 0 elsewhere)."""
+    import os
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def rgb_to_lab(colors_01: np.ndarray) -> np.ndarray:
+    """RGB colors in [0,1] -> CIELAB (L in [0,100])."""
+    import cv2
+    rgb = np.clip(np.asarray(colors_01, dtype=np.float32), 0, 1)[None]
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2LAB)[0].astype(np.float64)
+
+
+def palette_delta_e(a, b) -> float:
+    """
+    Largest CIE76 ΔE between two palettes after matching their colors
+    one-to-one (cluster order is arbitrary).
+    """
+    from scipy.optimize import linear_sum_assignment
+    la, lb = rgb_to_lab(a), rgb_to_lab(b)
+    dist = np.linalg.norm(la[:, None, :] - lb[None, :, :], axis=-1)
+    rows, cols = linear_sum_assignment(dist)
+    return float(dist[rows, cols].max())
@@ -1,24 +1,26 @@
-import torch
-import clip
-from PIL import Image
+import numpy as np
 import requests
+from PIL import Image
 from io import BytesIO
 
+from cv_engine.clip_model import ClipEncoder
 
-class AestheticScorer:
-    def __init__(self, device=None):
-        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-        self.model, self.preprocess = clip.load("ViT-B/32", device=self.device)
+PROMPTS = [
+    "a professional, high-quality, beautiful, aesthetic photo",
+    "a low-quality, ugly, noisy, poorly composed photo"
+]
 
-        prompts = [
-            "a professional, high-quality, beautiful, aesthetic photo",
-            "a low-quality, ugly, noisy, poorly composed photo"
-        ]
 
-        tokens = clip.tokenize(prompts).to(self.device)
-        with torch.no_grad():
-            text_embeds = self.model.encode_text(tokens)
-            self.text_features = text_embeds / text_embeds.norm(dim=-1, keepdim=True)
+class AestheticScorer:
+    def __init__(self, device=None, clip=None):
+        """
+        clip: a shared ClipEncoder (one is created if not given). The
+        prompt embeddings are computed once here, so scoring an image that
+        is already embedded is a single dot product.
+        """
+        self.clip = clip or ClipEncoder(device=device)
+        self.device = self.clip.device
+        self.text_features = self.clip.embed_texts(PROMPTS)
 
     def load_image(self, src):
         if isinstance(src, str):
@@ -27,20 +29,24 @@ class AestheticScorer:
                 img = Image.open(BytesIO(resp.content)).convert("RGB")
             else:
                 img = Image.open(src).convert("RGB")
+        elif isinstance(src, (Image.Image, np.ndarray)) or hasattr(src, "to_pil"):
+            img = self.clip.load_image(src)
         else:
-            raise ValueError("Image must be URL or filepath")
+            raise ValueError("Image must be URL, filepath or decoded image")
         return img
 
     def score(self, src):
         img = self.load_image(src)
-        img_input = self.preprocess(img).unsqueeze(0).to(self.device)
+        return self.score_from_embedding(self.clip.embed_image(img))
+
+    def score_from_embedding(self, emb):
+        """Aesthetic score (0–1) of an image from its CLIP embedding."""
+        return self.score_from_embeddings([emb])[0]
 
-        with torch.no_grad():
-            img_feats = self.model.encode_image(img_input)
-            img_feats = img_feats / img_feats.norm(dim=-1, keepdim=True)
-            sims = (img_feats @ self.text_features.T).cpu().numpy().flatten()
+    def score_from_embeddings(self, embs):
+        sims = np.asarray(embs, dtype=np.float32) @ self.text_features.T
 
-        pos, neg = sims[0], sims[1]
+        pos, neg = sims[:, 0], sims[:, 1]
         raw = pos - neg  # [-1,1]
-        score = (raw + 1) / 2
-        return float(max(0.0, min(score, 1.0)))
+        scores = (raw + 1) / 2
+        return [float(max(0.0, min(s, 1.0))) for s in scores]
@@ -0,0 +1,417 @@
+"""
+Inner-product nearest-neighbour indexes for L2-normalised embeddings.
+
+    ExactIndex  blocked float32 matmul over every stored vector
+    IVFIndex    inverted-file index: a k-means coarse quantizer splits the
+                vectors into nlist cells and a query only scans the
+                nprobe closest cells
+    AutoIndex   exact while small, switches to IVF past a size threshold
+
+All indexes assign ids in insertion order (0, 1, 2, ...) so ids line up
+with the bank's meta list, grow incrementally with add() (or attach(),
+which references float32 arrays such as mmapped segments instead of
+copying them), and answer
+search(queries, k) with (scores, ids) arrays of shape (n_queries, k).
+Missing neighbours (k larger than the index) have score -inf and id -1.
+"""
+import math
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def _as_matrix(vectors, dim: int) -> np.ndarray:
+    x = np.asarray(vectors, dtype=np.float32)
+    if x.ndim == 1:
+        x = x[None, :]
+    if x.ndim != 2 or x.shape[1] != dim:
+        raise ValueError(f"Expected vectors of dimension {dim}, got shape {x.shape}")
+    return x
+
+
+def _empty_result(n: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    return np.full((n, k), -np.inf, np.float32), np.full((n, k), -1, np.int64)
+
+
+def _merge_topk(best_s, best_i, scores, ids, k):
+    """Merge a new (n, m) score block into the running (n, k) best."""
+    s = np.concatenate([best_s, scores], axis=1)
+    i = np.concatenate([best_i, np.broadcast_to(ids, scores.shape)], axis=1)
+    if s.shape[1] > k:
+        part = np.argpartition(-s, k - 1, axis=1)[:, :k]
+        s = np.take_along_axis(s, part, axis=1)
+        i = np.take_along_axis(i, part, axis=1)
+    return s, i
+
+
+def _sort_topk(s, i):
+    order = np.argsort(-s, axis=1, kind="stable")
+    return np.take_along_axis(s, order, axis=1), np.take_along_axis(i, order, axis=1)
+
+
+class _GrowableRows:
+    """
+    Row-appendable float32 matrix with amortised O(1) appends. view()
+    is safe to call while another thread appends (it returns the rows
+    and ids of one consistent moment).
+    """
+
+    def __init__(self, dim: int):
+        self.data = np.empty((0, dim), np.float32)
+        self.ids = np.empty(0, np.int64)
+        self.size = 0
+        self._view = (self.data, self.ids)
+
+    def append(self, x: np.ndarray, ids: np.ndarray) -> None:
+        need = self.size + len(x)
+        if need > len(self.data):
+            cap = max(need, 2 * len(self.data), 16)
+            data = np.empty((cap, self.data.shape[1]), np.float32)
+            data[:self.size] = self.data[:self.size]
+            new_ids = np.empty(cap, np.int64)
+            new_ids[:self.size] = self.ids[:self.size]
+            self.data, self.ids = data, new_ids
+        self.data[self.size:need] = x
+        self.ids[self.size:need] = ids
+        self.size = need
+        self._view = (self.data[:need], self.ids[:need])
+
+    def view(self):
+        return self._view
+
+
+class ExactIndex:
+    """
+    Brute-force search, one float32 block of at most block_size rows at a
+    time so memory for the score matrix stays bounded however large the
+    bank grows. Blocks are either owned (filled by add) or attached
+    read-only arrays such as memory-mapped store segments.
+    """
+
+    kind = "exact"
+
+    def __init__(self, dim: int = 512, block_size: int = 16384):
+        self.dim = dim
+        self.block_size = block_size
+        # blocks trimmed to their rows; the last one may be backed by _buf,
+        # an owned array with spare capacity that add() keeps filling
+        self._blocks: List[np.ndarray] = []
+        self._buf: Optional[np.ndarray] = None
+        self._ntotal = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._ntotal
+
+    def add(self, vectors) -> np.ndarray:
+        x = _as_matrix(vectors, self.dim)
+        with self._lock:
+            start = self._ntotal
+            pos = 0
+            while pos < len(x):
+                if self._buf is None:
+                    self._buf = np.empty((0, self.dim), np.float32)
+                    self._blocks.append(self._buf)
+                fill = len(self._blocks[-1])
+                need = fill + min(self.block_size - fill, len(x) - pos)
+                if need > len(self._buf):
+                    # capacity doubles up to block_size; rows published
+                    # earlier stay valid in the old array
+                    buf = np.empty((min(self.block_size, max(need, 2 * len(self._buf), 16)), self.dim), np.float32)
+                    buf[:fill] = self._buf[:fill]
+                    self._buf = buf
+                self._buf[fill:need] = x[pos:pos + need - fill]
+                self._blocks[-1] = self._buf[:need]
+                if need == self.block_size:
+                    self._buf = None
+                pos += need - fill
+            self._ntotal += len(x)
+        return np.arange(start, start + len(x))
+
+    def attach(self, vectors) -> np.ndarray:
+        """
+        Like add(), but float32 input is referenced instead of copied, so a
+        memory-mapped segment is searched straight from the page cache.
+        """
+        x = _as_matrix(vectors, self.dim)
+        with self._lock:
+            start = self._ntotal
+            if len(x):
+                self._buf = None  # later adds start a new block after these rows
+            for pos in range(0, len(x), self.block_size):
+                self._blocks.append(x[pos:pos + self.block_size])
+            self._ntotal += len(x)
+        return np.arange(start, start + len(x))
+
+    def _snapshot(self) -> List[np.ndarray]:
+        with self._lock:
+            return list(self._blocks)
+
+    def vectors(self) -> np.ndarray:
+        """All stored vectors as one (N, dim) array (a copy)."""
+        blocks = self._snapshot()
+        if not blocks:
+            return np.empty((0, self.dim), np.float32)
+        return np.concatenate(blocks)
+
+    def search(self, queries, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        q = _as_matrix(queries, self.dim)
+        best_s, best_i = _empty_result(len(q), 0)
+        start = 0
+        for rows in self._snapshot():
+            if len(rows):
+                scores = q @ rows.T
+                ids = np.arange(start, start + len(rows))
+                best_s, best_i = _merge_topk(best_s, best_i, scores, ids, k)
+            start += len(rows)
+        return _pad(*_sort_topk(best_s, best_i), k)
+
+
+def _pad(s, i, k):
+    if s.shape[1] >= k:
+        return s, i
+    pad_s, pad_i = _empty_result(len(s), k - s.shape[1])
+    return np.concatenate([s, pad_s], axis=1), np.concatenate([i, pad_i], axis=1)
+
+
+def spherical_kmeans(x: np.ndarray, n_clusters: int, n_iter: int = 10, seed: int = 0) -> np.ndarray:
+    """
+    k-means on the unit sphere (cosine similarity), returns unit-norm
+    centroids. Pure numpy so the trend engine doesn't need faiss.
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(x))
+    centroids = x[rng.choice(len(x), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assign = _nearest(x, centroids)
+        order = np.argsort(assign, kind="stable")
+        cells, starts = np.unique(assign[order], return_index=True)
+        sums = np.zeros_like(centroids)
+        sums[cells] = np.add.reduceat(x[order], starts, axis=0)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        empty = norms[:, 0] == 0
+        # re-seed empty cells with random points
+        if empty.any():
+            sums[empty] = x[rng.choice(len(x), int(empty.sum()), replace=False)]
+            norms[empty] = np.linalg.norm(sums[empty], axis=1, keepdims=True)
+        centroids = sums / np.maximum(norms, 1e-12)
+    return centroids.astype(np.float32)
+
+
+def _nearest(x: np.ndarray, centroids: np.ndarray, block: int = 65536) -> np.ndarray:
+    out = np.empty(len(x), np.int64)
+    for start in range(0, len(x), block):
+        out[start:start + block] = np.argmax(x[start:start + block] @ centroids.T, axis=1)
+    return out
+
+
+class IVFIndex:
+    """
+    Approximate search. Vectors added before training are kept in a flat
+    buffer and searched exactly; train() learns nlist centroids (default
+    ~2*sqrt(N)) from the vectors seen so far and files every vector into
+    its cell. Later adds go straight into their nearest cell.
+
+    Training is automatic: add() trains once the flat buffer holds
+    train_after vectors, and retrains (on every vector, with nlist
+    recomputed unless it was given) each time the index has grown by
+    retrain_growth times its size at the last training, so the centroids
+    follow the bank. retrain_growth=None trains only once.
+    """
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        dim: int = 512,
+        nlist: Optional[int] = None,
+        nprobe: int = 16,
+        train_sample: int = 64,
+        seed: int = 0,
+        train_after: int = 4096,
+        retrain_growth: Optional[float] = 2.0,
+    ):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_sample = train_sample  # training points per centroid
+        self.seed = seed
+        self.train_after = train_after
+        self.retrain_growth = retrain_growth
+        self._fixed_nlist = nlist
+        # (centroids, cell lists), replaced in one assignment so a search
+        # never sees centroids without their cells
+        self._state: Optional[Tuple[np.ndarray, List[_GrowableRows]]] = None
+        self._flat = _GrowableRows(dim)
+        self._ntotal = 0
+        self._trained_size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._ntotal
+
+    @property
+    def centroids(self) -> Optional[np.ndarray]:
+        state = self._state
+        return state[0] if state is not None else None
+
+    @property
+    def is_trained(self) -> bool:
+        return self._state is not None
+
+    def add(self, vectors) -> np.ndarray:
+        x = _as_matrix(vectors, self.dim)
+        with self._lock:
+            ids = np.arange(self._ntotal, self._ntotal + len(x))
+            if self._state is not None:
+                self._file(self._state, x, ids)
+            else:
+                self._flat.append(x, ids)
+            self._ntotal += len(x)
+            if self._state is None:
+                if self._flat.size >= self.train_after:
+                    self._train()
+            elif self.retrain_growth and self._ntotal >= self.retrain_growth * self._trained_size:
+                self._train()
+        return ids
+
+    # cells own their rows, so there is nothing to share
+    attach = add
+
+    @staticmethod
+    def _file(state, x, ids):
+        centroids, lists = state
+        assign = _nearest(x, centroids)
+        for c in np.unique(assign):
+            mask = assign == c
+            lists[c].append(x[mask], ids[mask])
+
+    def train(self, sample: Optional[np.ndarray] = None) -> None:
+        """Learn (or re-learn) the coarse quantizer and file every vector into its cell."""
+        with self._lock:
+            self._train(sample)
+
+    def _train(self, sample: Optional[np.ndarray] = None) -> None:
+        # every stored vector: the flat buffer plus the current cells
+        parts = [self._flat.view()]
+        if self._state is not None:
+            parts += [rows.view() for rows in self._state[1]]
+        parts = [(v, i) for v, i in parts if len(v)]
+        if parts:
+            vecs = np.concatenate([v for v, _ in parts])
+            vec_ids = np.concatenate([i for _, i in parts])
+        else:
+            vecs, vec_ids = np.empty((0, self.dim), np.float32), np.empty(0, np.int64)
+
+        data = vecs if sample is None else _as_matrix(sample, self.dim)
+        if len(data) == 0:
+            raise ValueError("Cannot train an IVF index without vectors")
+
+        nlist = self._fixed_nlist or max(1, int(2 * math.sqrt(max(len(self), len(data)))))
+        nlist = min(nlist, len(data))
+        rng = np.random.default_rng(self.seed)
+        n_train = min(len(data), nlist * self.train_sample)
+        train = data[rng.choice(len(data), n_train, replace=False)] if n_train < len(data) else data
+
+        # build the new cells off to the side, then publish them at once
+        centroids = spherical_kmeans(train, nlist, seed=self.seed)
+        state = (centroids, [_GrowableRows(self.dim) for _ in range(len(centroids))])
+        if len(vecs):
+            self._file(state, vecs, vec_ids)
+        self.nlist = len(centroids)
+        self._trained_size = max(len(self), len(data))
+        self._state = state
+        self._flat = _GrowableRows(self.dim)
+
+    def search(self, queries, k: int = 1, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        q = _as_matrix(queries, self.dim)
+        state = self._state
+        if state is None:
+            flat, ids = self._flat.view()
+            best_s, best_i = _empty_result(len(q), 0)
+            if len(flat):
+                best_s, best_i = _merge_topk(best_s, best_i, q @ flat.T, ids, k)
+            return _pad(*_sort_topk(best_s, best_i), k)
+
+        centroids, lists = state
+        nprobe = min(nprobe or self.nprobe, len(centroids))
+        coarse = q @ centroids.T
+        probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe]
+
+        out_s, out_i = _empty_result(len(q), k)
+        for row, cells in enumerate(probes):
+            parts = [lists[c].view() for c in cells]
+            vecs = [v for v, _ in parts if len(v)]
+            if not vecs:
+                continue
+            cand = np.concatenate(vecs)
+            cand_ids = np.concatenate([i for v, i in parts if len(v)])
+            s, i = _merge_topk(*_empty_result(1, 0), (cand @ q[row])[None, :], cand_ids, k)
+            s, i = _pad(*_sort_topk(s, i), k)
+            out_s[row], out_i[row] = s[0], i[0]
+        return out_s, out_i
+
+
+class AutoIndex:
+    """
+    ExactIndex until the bank holds more than `threshold` vectors, then an
+    IVFIndex trained on everything stored so far (and retrained by it as
+    the bank keeps growing). Below a few tens of thousands of vectors a
+    blocked matmul is both exact and fast enough.
+    """
+
+    def __init__(self, dim: int = 512, threshold: int = 50000, nprobe: int = 16, nlist: Optional[int] = None):
+        self.dim = dim
+        self.threshold = threshold
+        self.nprobe = nprobe
+        self.nlist = nlist
+        self._index = ExactIndex(dim)
+        self._lock = threading.Lock()
+
+    @property
+    def kind(self) -> str:
+        return self._index.kind
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def add(self, vectors) -> np.ndarray:
+        with self._lock:
+            ids = self._index.add(vectors)
+            self._maybe_switch()
+        return ids
+
+    def attach(self, vectors) -> np.ndarray:
+        with self._lock:
+            ids = self._index.attach(vectors)
+            self._maybe_switch()
+        return ids
+
+    def _maybe_switch(self):
+        if isinstance(self._index, ExactIndex) and len(self._index) > self.threshold:
+            ivf = IVFIndex(self.dim, nlist=self.nlist, nprobe=self.nprobe)
+            ivf.add(self._index.vectors())
+            if not ivf.is_trained:
+                ivf.train()
+            self._index = ivf
+
+    def search(self, queries, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        return self._index.search(queries, k)
+
+
+def build_index(
+    kind: str = "auto",
+    dim: int = 512,
+    nprobe: int = 16,
+    nlist: Optional[int] = None,
+    threshold: int = 50000,
+):
+    """kind: "exact", "ivf" or "auto"."""
+    if kind == "exact":
+        return ExactIndex(dim)
+    if kind == "ivf":
+        return IVFIndex(dim, nlist=nlist, nprobe=nprobe)
+    if kind == "auto":
+        return AutoIndex(dim, threshold=threshold, nprobe=nprobe, nlist=nlist)
+    raise ValueError(f"Unknown index kind: {kind}")
@@ -0,0 +1,112 @@
+"""
+CPU inference backends shared by ClipEncoder (image tower) and
+CaptionAnalyzer (sentiment model).
+
+    "torch"      float model
+    "int8"       torch dynamic int8 quantization of the Linear layers
+    "onnx"       exported graph run by onnxruntime
+    "onnx-int8"  same, with int8 weights (fastest on CPU)
+
+Exported graphs are cached by name in onnx_dir (~/.cache/viralens by
+default); models without a stable name (random weights, local
+checkpoints) are exported to a scratch directory on every load.
+"""
+import os
+import shutil
+import tempfile
+import warnings
+from typing import Callable, Dict, List, Optional
+
+import torch
+
+BACKENDS = ("torch", "int8", "onnx", "onnx-int8")
+
+
+def check_backend(what: str, backend: str, device: str) -> None:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown {what} backend: {backend}")
+    if backend != "torch" and device != "cpu":
+        raise ValueError(f"{what} backend {backend!r} only runs on CPU")
+
+
+def quantize_int8(module: torch.nn.Module) -> None:
+    """Dynamic int8 quantization of module's Linear layers, in place."""
+    with warnings.catch_warnings():
+        # torch.ao.quantization is deprecated in favour of torchao,
+        # which is not a dependency here
+        warnings.simplefilter("ignore")
+        torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def onnx_cache_path(onnx_dir: Optional[str], name: str, quantize: bool) -> str:
+    onnx_dir = onnx_dir or os.path.join(os.path.expanduser("~"), ".cache", "viralens")
+    os.makedirs(onnx_dir, exist_ok=True)
+    suffix = "-int8" if quantize else ""
+    return os.path.join(onnx_dir, f"{name}{suffix}.onnx")
+
+
+def export_onnx(
+    module: torch.nn.Module,
+    args: tuple,
+    path: str,
+    input_names: List[str],
+    output_names: List[str],
+    dynamic_axes: Dict[str, Dict[int, str]],
+    quantize: bool = False,
+) -> None:
+    """
+    Export module (optionally int8-quantized by onnxruntime) to path. The
+    graph is built in a temporary directory next to path and renamed into
+    place, so other processes never load a half-written file.
+    """
+    workdir = tempfile.mkdtemp(dir=os.path.dirname(path) or ".")
+    try:
+        exported = os.path.join(workdir, "model.onnx")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            torch.onnx.export(
+                module,
+                args,
+                exported,
+                input_names=input_names,
+                output_names=output_names,
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+                dynamo=False,
+            )
+        if quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantized = os.path.join(workdir, "model-int8.onnx")
+            quantize_dynamic(exported, quantized, weight_type=QuantType.QInt8)
+            exported = quantized
+        os.replace(exported, path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def onnx_session(what: str, path: Optional[str], export: Callable[[str], None]):
+    """
+    An onnxruntime CPU session for the graph at path, calling export(path)
+    first if it doesn't exist yet. path=None exports to a scratch file
+    that is removed once loaded.
+    """
+    try:
+        import onnxruntime as ort
+    except ImportError as e:
+        raise ImportError(
+            f"{what} backend 'onnx' needs onnxruntime and onnx: pip install onnxruntime onnx"
+        ) from e
+
+    scratch = None
+    if path is None:
+        scratch = tempfile.mkdtemp()
+        path = os.path.join(scratch, "model.onnx")
+    try:
+        if not os.path.exists(path):
+            export(path)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+    finally:
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
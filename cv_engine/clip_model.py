@@ -0,0 +1,132 @@
+import numpy as np
+import torch
+from PIL import Image
+import open_clip
+
+from cv_engine.backends import check_backend, export_onnx, onnx_cache_path, onnx_session, quantize_int8
+from cv_engine.image_io import DecodedImage
+
+
+class ClipEncoder:
+    """
+    One CLIP ViT-B/32 (OpenAI weights, via open_clip) shared by every
+    engine that needs image or text embeddings. All embeddings come back
+    as L2-normalised float32 numpy arrays.
+    """
+
+    def __init__(
+        self,
+        model_name="ViT-B-32",
+        pretrained="openai",
+        device=None,
+        backend="torch",
+        onnx_dir=None,
+    ):
+        """
+        backend: how the image tower runs (the text tower always runs in
+        torch; it only embeds a few fixed prompts)
+            "torch"      float model
+            "int8"       torch dynamic int8 quantization of the Linear layers
+            "onnx"       exported graph run by onnxruntime
+            "onnx-int8"  same, with int8 weights (fastest on CPU)
+        onnx_dir: where exported graphs are cached (~/.cache/viralens)
+        """
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        check_backend("CLIP", backend, self.device)
+        self.model_name = model_name
+        self.pretrained = pretrained
+        self.backend = backend
+
+        self.model, _, self.preprocess = open_clip.create_model_and_transforms(
+            model_name, pretrained=pretrained
+        )
+        self.model.to(self.device)
+        self.model.eval()
+        self.tokenizer = open_clip.get_tokenizer(model_name)
+
+        if backend == "int8":
+            self._encode_image = self._quantize_torch()
+        elif backend.startswith("onnx"):
+            self._encode_image = self._load_onnx(onnx_dir, quantize=backend == "onnx-int8")
+        else:
+            self._encode_image = self.model.encode_image
+
+    # ------------------------------
+    # Backends
+    # ------------------------------
+
+    def _quantize_torch(self):
+        quantize_int8(self.model.visual)
+        return self.model.encode_image
+
+    def _onnx_path(self, onnx_dir, quantize):
+        if not self.pretrained:
+            # randomly initialised weights differ every run: never reuse
+            return None
+        return onnx_cache_path(onnx_dir, f"{self.model_name}-{self.pretrained}-visual", quantize)
+
+    def _load_onnx(self, onnx_dir, quantize):
+        visual = self.model.visual
+        session = onnx_session("CLIP", self._onnx_path(onnx_dir, quantize), lambda path: export_onnx(
+            visual,
+            (torch.zeros(1, 3, *visual.image_size),),
+            path,
+            input_names=["pixel_values"],
+            output_names=["embeds"],
+            dynamic_axes={"pixel_values": {0: "batch"}, "embeds": {0: "batch"}},
+            quantize=quantize,
+        ))
+
+        # the torch image tower is no longer needed
+        self.model.visual = torch.nn.Identity()
+
+        def encode(tensors):
+            out = session.run(None, {"pixel_values": tensors.cpu().numpy().astype(np.float32)})[0]
+            return torch.from_numpy(out)
+        return encode
+
+    # ------------------------------
+    # Images
+    # ------------------------------
+
+    def load_image(self, image):
+        """Accepts a path, DecodedImage, PIL image or BGR numpy array."""
+        if isinstance(image, DecodedImage):
+            return image.to_pil()
+        if isinstance(image, Image.Image):
+            return image.convert("RGB")
+        if isinstance(image, np.ndarray):
+            return DecodedImage(image).to_pil()
+        return Image.open(image).convert("RGB")
+
+    def embed_image(self, image):
+        """One image -> (512,)"""
+        return self.embed_images([image])[0]
+
+    def embed_images(self, images):
+        """Embeds several images in one forward pass. Returns (N, 512)."""
+        return self.embed_preprocessed(
+            torch.stack([self.preprocess(self.load_image(im)) for im in images])
+        )
+
+    def embed_preprocessed(self, tensors):
+        """(N, 3, H, W) output of self.preprocess -> (N, 512)"""
+        tensors = torch.as_tensor(tensors).to(self.device)
+
+        with torch.no_grad():
+            embs = self._encode_image(tensors)
+        embs = embs / embs.norm(dim=-1, keepdim=True)
+        return embs.float().cpu().numpy()
+
+    # ------------------------------
+    # Text
+    # ------------------------------
+
+    def embed_texts(self, texts):
+        """List of prompts -> (N, 512)"""
+        tokens = self.tokenizer(list(texts)).to(self.device)
+
+        with torch.no_grad():
+            embs = self.model.encode_text(tokens)
+        embs = embs / embs.norm(dim=-1, keepdim=True)
+        return embs.float().cpu().numpy()
@@ -1,9 +1,20 @@
 import cv2
-import numpy as np
-from sklearn.cluster import KMeans
+
+from cv_engine.features import as_features
 
 class ColorAnalyzer:
 
+    def __init__(self, mode="exact", pixel_budget=65536):
+        """
+        mode="exact": KMeans over every pixel (original behaviour)
+        mode="fast":  area-downsample to at most pixel_budget pixels first,
+                      then cluster; palettes stay within a few ΔE of exact
+        """
+        if mode not in ("exact", "fast"):
+            raise ValueError(f"Unknown color mode: {mode}")
+        self.mode = mode
+        self.pixel_budget = pixel_budget
+
     def extract_colors(self, image, k=3):
         """
         Main color extraction function expected by full_router.py
@@ -15,10 +26,19 @@ class ColorAnalyzer:
         """
         KMeans dominant color extractor
         """
-        img = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        feats = as_features(image)
+        if self.mode == "fast":
+            # area-averaged copy keeps the color distribution of the original
+            img = cv2.cvtColor(feats.downsampled(self.pixel_budget), cv2.COLOR_BGR2RGB)
+            n_init = 3
+        else:
+            img = feats.rgb
+            n_init = 10
+
         img = img.reshape((-1, 3))
 
-        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
+        from sklearn.cluster import KMeans  # deferred: sklearn is slow to import
+        kmeans = KMeans(n_clusters=k, random_state=42, n_init=n_init)
         kmeans.fit(img)
         colors = kmeans.cluster_centers_
 
@@ -30,19 +50,19 @@ class ColorAnalyzer:
         """
         Average brightness normalized 0–1
         """
-        return float(np.mean(image) / 255.0)
+        return float(as_features(image).mean_intensity / 255.0)
 
     def contrast(self, image):
         """
         Standard deviation of luminance normalized
         """
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        return float(np.std(gray) / 128.0)
+        return float(as_features(image).gray_std / 128.0)
 
     def analyze(self, image):
         """
         Unified analysis block (optional)
         """
+        image = as_features(image)
         return {
             "brightness": self.brightness(image),
             "contrast": self.contrast(image),
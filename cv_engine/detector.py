@@ -1,17 +1,64 @@
 import numpy as np
 from ultralytics import YOLO
 
+from cv_engine.image_io import DecodedImage
+
 class ObjectDetector:
-    def __init__(self, model_path="yolov8n.pt"):
-        self.model = YOLO(model_path)
+    def __init__(
+        self,
+        model_path="yolov8n.pt",
+        imgsz=640,
+        classes=None,
+        max_det=300,
+        conf=0.25,
+        device=None,
+    ):
+        """
+        model_path: .pt weights or an exported model (.onnx, .torchscript,
+                    *_openvino_model/, ...; see export_detector)
+        imgsz:      inference size; 320 is ~4x cheaper than 640 on CPU and
+                    is plenty for picking the main subject
+        classes:    optional allow-list of class ids (e.g. [0] = person)
+        max_det:    keep at most this many boxes after NMS
+        device:     e.g. "cpu" or "cuda:0"; None lets ultralytics pick
+        """
+        self.model = YOLO(model_path, task="detect")
+        self.predict_args = {
+            "imgsz": imgsz,
+            "classes": list(classes) if classes else None,
+            "max_det": max_det,
+            "conf": conf,
+            "verbose": False,
+        }
+        if device is not None:
+            self.predict_args["device"] = device
 
     def load(self, image_source):
         """
         Runs YOLO on the image.
-        image_source = path, URL, or numpy array
+        image_source = path, URL, numpy array (BGR) or DecodedImage
         """
-        result = self.model(image_source)[0]
+        result = self.model(self._source(image_source), **self.predict_args)[0]
+        return self._summarize(result)
 
+    def load_batch(self, image_sources):
+        """
+        Runs YOLO on several images in a single forward pass.
+        Returns one result per image, in the same shape as load().
+        """
+        if not image_sources:
+            return []
+        results = self.model([self._source(src) for src in image_sources], **self.predict_args)
+        return [self._summarize(r) for r in results]
+
+    @staticmethod
+    def _source(image_source):
+        if isinstance(image_source, DecodedImage):
+            return image_source.bgr
+        return image_source
+
+    @staticmethod
+    def _summarize(result):
         boxes = result.boxes.xyxy.cpu().numpy().tolist()      # [[x1,y1,x2,y2], ...]
         classes = result.boxes.cls.cpu().numpy().tolist()     # [class_ids]
         confs   = result.boxes.conf.cpu().numpy().tolist()    # [confidences]
@@ -35,3 +82,20 @@ class ObjectDetector:
             "main_box": main_box,
             "image_size": (w, h),
         }
+
+
+def export_detector(model_path="yolov8n.pt", format="onnx", imgsz=640, int8=False):
+    """
+    Export YOLO weights for CPU inference and return the exported path,
+    to be passed back as ObjectDetector(model_path=...).
+
+    format="onnx" runs through onnxruntime; format="openvino" with
+    int8=True gives an int8-quantized model (calibrated on ultralytics'
+    default dataset). Exported with a dynamic batch axis so load_batch
+    keeps working.
+    """
+    model = YOLO(model_path, task="detect")
+    kwargs = {"format": format, "imgsz": imgsz, "int8": int8}
+    if format == "onnx":
+        kwargs["dynamic"] = True
+    return model.export(**kwargs)
@@ -0,0 +1,374 @@
+"""
+Append-only, memory-mapped storage for the viral bank.
+
+Layout of a bank directory:
+
+    manifest.json        {"version", "dim", "dtype", "next_segment",
+                          "segments": [{"name", "rows"}, ...]}
+    seg-000001.npy       (rows, dim) float16/float32 embeddings
+    seg-000001.jsonl     one meta dict per row
+
+Segments are immutable. An append writes a new segment (both files via a
+temp file + os.replace) and then atomically replaces the manifest, so a
+crash at any point leaves the previous bank intact. Reads memory-map the
+.npy files, so loading is near-instant and several processes serving the
+same bank share one copy in the page cache.
+
+Many small appends produce many small segments; a background thread
+merges runs of `fanout` similarly sized segments into one (size-tiered,
+like an LSM tree), so every row is rewritten O(log N) times overall.
+Merging never reorders rows: ids stay equal to insertion order.
+
+One process writes a bank at a time; any number may read it and pick up
+new rows with refresh().
+"""
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+MANIFEST = "manifest.json"
+_DTYPES = ("float16", "float32")
+
+
+def _atomic_write(path: str, write) -> None:
+    """write(f) into a temp file next to path, fsync, then rename over path."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _atomic_concat_npy(path: str, arrays: List[np.ndarray], chunk_rows: int = 65536) -> None:
+    """
+    Write the row-wise concatenation of arrays to path as .npy, a chunk at
+    a time through a memory-mapped output, so merging large segments
+    doesn't hold them all in RAM. Same temp-file / fsync / rename dance
+    as _atomic_write.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    os.close(fd)
+    try:
+        rows = sum(len(a) for a in arrays)
+        out = np.lib.format.open_memmap(
+            tmp, mode="w+", dtype=arrays[0].dtype, shape=(rows, arrays[0].shape[1])
+        )
+        pos = 0
+        for a in arrays:
+            for start in range(0, len(a), chunk_rows):
+                block = a[start:start + chunk_rows]
+                out[pos:pos + len(block)] = block
+                pos += len(block)
+        out.flush()
+        del out
+        with open(tmp, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _write_meta(f, metas: Iterable[Dict]) -> None:
+    for m in metas:
+        f.write(json.dumps(m).encode("utf-8") + b"\n")
+
+
+class EmbeddingStore:
+    def __init__(
+        self,
+        root: str,
+        dim: int = 512,
+        dtype: str = "float32",
+        fanout: int = 8,
+        background: bool = True,
+    ):
+        """
+        dtype applies to new banks (an existing manifest wins). float32
+        segments can be searched in place; float16 halves disk and page
+        cache but readers need a float32 copy to search.
+        """
+        if dtype not in _DTYPES:
+            raise ValueError(f"Unknown embedding dtype: {dtype}")
+        self.root = root
+        self.fanout = max(2, fanout)
+        self.background = background
+        os.makedirs(root, exist_ok=True)
+
+        self._lock = threading.Lock()           # manifest + segment list
+        self._compact_lock = threading.Lock()   # one merge at a time
+        self._compactor: Optional[threading.Thread] = None
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._meta: Optional[List[Dict]] = None
+        self._manifest_stamp = None
+
+        if os.path.exists(self._path(MANIFEST)):
+            self._manifest = self._read_manifest()
+        else:
+            self._manifest = {
+                "version": 1,
+                "dim": dim,
+                "dtype": dtype,
+                "next_segment": 1,
+                "segments": [],
+            }
+            self._migrate_legacy()
+            self._write_manifest()
+
+    # ----- paths / manifest -----
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def _read_manifest(self) -> Dict:
+        path = self._path(MANIFEST)
+        with open(path, "r") as f:
+            manifest = json.load(f)
+        self._manifest_stamp = self._stamp()
+        return manifest
+
+    def _write_manifest(self) -> None:
+        data = json.dumps(self._manifest, indent=1).encode("utf-8")
+        _atomic_write(self._path(MANIFEST), lambda f: f.write(data))
+        self._manifest_stamp = self._stamp()
+
+    def _stamp(self):
+        # os.replace gives every manifest version a new inode
+        st = os.stat(self._path(MANIFEST))
+        return st.st_ino, st.st_mtime_ns
+
+    def _migrate_legacy(self) -> None:
+        """Import a pre-store bank (embeddings.npy + meta.json) as segment 1."""
+        emb_path, meta_path = self._path("embeddings.npy"), self._path("meta.json")
+        if not (os.path.exists(emb_path) and os.path.exists(meta_path)):
+            return
+        embeddings = np.load(emb_path)
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        if len(embeddings):
+            self._manifest["dim"] = int(embeddings.shape[1])
+            self._manifest["segments"].append(self._write_segment(embeddings, meta))
+
+    # ----- properties -----
+
+    @property
+    def dim(self) -> int:
+        return self._manifest["dim"]
+
+    @property
+    def dtype(self) -> str:
+        return self._manifest["dtype"]
+
+    def __len__(self) -> int:
+        return sum(s["rows"] for s in self._manifest["segments"])
+
+    def segment_names(self) -> List[str]:
+        return [s["name"] for s in self._manifest["segments"]]
+
+    # ----- reading -----
+
+    def _array(self, name: str) -> np.ndarray:
+        arr = self._arrays.get(name)
+        if arr is None:
+            arr = np.load(self._path(name + ".npy"), mmap_mode="r")
+            self._arrays[name] = arr
+        return arr
+
+    def segments(self) -> List[np.ndarray]:
+        """Memory-mapped (rows, dim) arrays, in id order."""
+        with self._lock:
+            return [self._array(s["name"]) for s in self._manifest["segments"]]
+
+    def vectors(self) -> np.ndarray:
+        """Every embedding as one in-memory array (a copy)."""
+        segs = self.segments()
+        if not segs:
+            return np.empty((0, self.dim), self.dtype)
+        return np.concatenate(segs)
+
+    @property
+    def meta(self) -> List[Dict]:
+        """Meta dicts in id order (parsed on first access)."""
+        with self._lock:
+            if self._meta is None:
+                meta = []
+                for s in self._manifest["segments"]:
+                    meta.extend(self._read_meta(s["name"]))
+                self._meta = meta
+            return self._meta
+
+    def _read_meta(self, name: str) -> List[Dict]:
+        with open(self._path(name + ".jsonl"), "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def refresh(self) -> List[np.ndarray]:
+        """
+        Re-read the manifest if another process changed it. Returns the
+        rows added since the last load/refresh (as mmapped slices).
+        """
+        if self._stamp() == self._manifest_stamp:
+            return []
+
+        old_len = len(self)
+        for _ in range(3):
+            manifest = self._read_manifest()
+            try:
+                with self._lock:
+                    self._manifest = manifest
+                    names = {s["name"] for s in manifest["segments"]}
+                    self._arrays = {n: a for n, a in self._arrays.items() if n in names}
+                    self._meta = None
+                    segs = [self._array(s["name"]) for s in manifest["segments"]]
+                break
+            except FileNotFoundError:
+                # a compaction replaced the segments we just read about
+                continue
+        else:
+            raise RuntimeError(f"Could not refresh embedding store at {self.root}")
+
+        new, start = [], 0
+        for seg in segs:
+            end = start + len(seg)
+            if end > old_len:
+                new.append(seg[max(0, old_len - start):])
+            start = end
+        return new
+
+    # ----- writing -----
+
+    def _write_segment(self, embeddings, metas) -> Dict:
+        name = f"seg-{self._manifest['next_segment']:06d}"
+        self._manifest["next_segment"] += 1
+        data = np.ascontiguousarray(embeddings, dtype=self._manifest["dtype"])
+        _atomic_write(self._path(name + ".npy"), lambda f: np.save(f, data))
+        _atomic_write(self._path(name + ".jsonl"), lambda f: _write_meta(f, metas))
+        return {"name": name, "rows": int(len(data))}
+
+    def append(self, embeddings, metas: List[Dict]) -> Tuple[int, int]:
+        """
+        Add rows (one meta dict each). Returns the [start, end) id range.
+        Cost is proportional to the rows added, not to the bank size.
+        """
+        embeddings = np.asarray(embeddings)
+        if embeddings.ndim == 1:
+            embeddings = embeddings[None, :]
+        if embeddings.shape[1] != self.dim:
+            raise ValueError(f"Expected embeddings of dimension {self.dim}, got {embeddings.shape[1]}")
+        if len(embeddings) != len(metas):
+            raise ValueError("Need exactly one meta entry per embedding")
+        if len(embeddings) == 0:
+            return len(self), len(self)
+
+        with self._lock:
+            start = len(self)
+            segment = self._write_segment(embeddings, metas)
+            self._manifest["segments"].append(segment)
+            self._write_manifest()
+            if self._meta is not None:
+                self._meta.extend(metas)
+
+        self.maybe_compact()
+        return start, start + len(embeddings)
+
+    # ----- compaction -----
+
+    def _tier(self, rows: int) -> int:
+        tier = 0
+        while rows >= self.fanout:
+            rows //= self.fanout
+            tier += 1
+        return tier
+
+    def _pick_run(self) -> Optional[Tuple[int, int]]:
+        """[i, j) of the newest run of >= fanout segments in the same tier."""
+        segs = self._manifest["segments"]
+        j = len(segs)
+        while j > 0:
+            tier = self._tier(segs[j - 1]["rows"])
+            i = j - 1
+            while i > 0 and self._tier(segs[i - 1]["rows"]) == tier:
+                i -= 1
+            if j - i >= self.fanout:
+                return i, j
+            j = i
+        return None
+
+    def maybe_compact(self) -> None:
+        """Start a background merge if some tier has fanout segments."""
+        with self._lock:
+            if self._pick_run() is None:
+                return
+        if not self.background:
+            self.compact()
+            return
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(
+                target=self.compact, name="embedding-store-compact", daemon=True
+            )
+            self._compactor.start()
+
+    def compact(self) -> int:
+        """Merge segments until no tier has fanout of them. Returns merges done."""
+        merges = 0
+        with self._compact_lock:
+            while True:
+                with self._lock:
+                    run = self._pick_run()
+                    if run is None:
+                        return merges
+                    i, j = run
+                    inputs = [dict(s) for s in self._manifest["segments"][i:j]]
+                    arrays = [self._array(s["name"]) for s in inputs]
+                    name = f"seg-{self._manifest['next_segment']:06d}"
+                    self._manifest["next_segment"] += 1
+
+                # the slow part runs without the lock; appends only add to
+                # the end. Rows are streamed from the input mmaps, so memory
+                # use doesn't grow with the size of the run.
+                _atomic_concat_npy(self._path(name + ".npy"), arrays)
+                metas = (m for s in inputs for m in self._read_meta(s["name"]))
+                _atomic_write(self._path(name + ".jsonl"), lambda f: _write_meta(f, metas))
+                del arrays
+
+                with self._lock:
+                    segs = self._manifest["segments"]
+                    assert [s["name"] for s in segs[i:j]] == [s["name"] for s in inputs]
+                    segs[i:j] = [{"name": name, "rows": sum(s["rows"] for s in inputs)}]
+                    self._write_manifest()
+                    for s in inputs:
+                        self._arrays.pop(s["name"], None)
+
+                # open mmaps keep the data alive on POSIX; elsewhere a
+                # failed delete just leaves an unreferenced file behind
+                for s in inputs:
+                    for ext in (".npy", ".jsonl"):
+                        try:
+                            os.unlink(self._path(s["name"] + ext))
+                        except OSError:
+                            pass
+                merges += 1
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Block until a running background compaction finishes."""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join(timeout)
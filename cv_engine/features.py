@@ -0,0 +1,150 @@
+import threading
+
+import cv2
+import numpy as np
+
+
+class ImageFeatures:
+    """
+    Lazily computed per-image data shared by the geometry and color
+    metrics. Each item (grayscale, downsampled copies, pyramid levels,
+    edge maps, histogram, ...) is computed at most once, even when
+    several metrics ask for it from different threads.
+    """
+
+    def __init__(self, bgr: np.ndarray):
+        self.bgr = bgr
+        self._memo = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    # locks can't be pickled (process pools); cached values travel along
+    def __getstate__(self):
+        return {"bgr": self.bgr, "_memo": dict(self._memo)}
+
+    def __setstate__(self, state):
+        self.__init__(state["bgr"])
+        self._memo.update(state["_memo"])
+
+    def _get(self, key, compute):
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._memo:
+                self._memo[key] = compute()
+            return self._memo[key]
+
+    # ----- basic views -----
+
+    @property
+    def height(self) -> int:
+        return self.bgr.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.bgr.shape[1]
+
+    @property
+    def rgb(self) -> np.ndarray:
+        """RGB view of the same pixels (no copy)."""
+        return self.bgr[..., ::-1]
+
+    @property
+    def gray(self) -> np.ndarray:
+        return self._get("gray", lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY))
+
+    # ----- resolution -----
+
+    @staticmethod
+    def _fit(h, w, scale):
+        return max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+
+    def working_size(self, max_side):
+        """(width, height) of working_gray(max_side)."""
+        h, w = self.height, self.width
+        if max_side is None or max(h, w) <= max_side:
+            return w, h
+        return self._fit(h, w, max_side / float(max(h, w)))
+
+    def downsampled_size(self, pixel_budget):
+        """(width, height) of downsampled(pixel_budget)."""
+        h, w = self.height, self.width
+        if pixel_budget is None or h * w <= pixel_budget:
+            return w, h
+        return self._fit(h, w, (pixel_budget / float(h * w)) ** 0.5)
+
+    def working_gray(self, max_side) -> np.ndarray:
+        """Grayscale whose longer side is at most max_side (area-averaged)."""
+        size = self.working_size(max_side)
+        if size == (self.width, self.height):
+            return self.gray
+        return self._get(
+            ("working_gray", max_side),
+            lambda: cv2.resize(self.gray, size, interpolation=cv2.INTER_AREA),
+        )
+
+    def downsampled(self, pixel_budget) -> np.ndarray:
+        """BGR copy with at most pixel_budget pixels (area-averaged)."""
+        size = self.downsampled_size(pixel_budget)
+        if size == (self.width, self.height):
+            return self.bgr
+        return self._get(
+            ("downsampled", pixel_budget),
+            lambda: cv2.resize(self.bgr, size, interpolation=cv2.INTER_AREA),
+        )
+
+    def pyramid(self, level: int) -> np.ndarray:
+        """Gaussian pyramid of the grayscale image; level 0 is full size."""
+        if level <= 0:
+            return self.gray
+        return self._get(("pyramid", level), lambda: cv2.pyrDown(self.pyramid(level - 1)))
+
+    # ----- derived maps and statistics -----
+
+    def edges(self, max_side=None, low=100, high=200) -> np.ndarray:
+        """Canny edge map of working_gray(max_side)."""
+        return self._get(
+            ("edges", max_side, low, high),
+            lambda: cv2.Canny(self.working_gray(max_side), low, high),
+        )
+
+    @property
+    def histogram(self) -> np.ndarray:
+        """256-bin grayscale histogram (float64 counts)."""
+        return self._get(
+            "histogram",
+            lambda: cv2.calcHist([self.gray], [0], None, [256], [0, 256]).ravel().astype(np.float64),
+        )
+
+    @property
+    def mean_intensity(self) -> float:
+        """Mean over all BGR channels, 0–255."""
+        return self._get("mean_intensity", lambda: float(np.mean(self.bgr)))
+
+    @property
+    def gray_std(self) -> float:
+        """Standard deviation of the grayscale image, from the histogram."""
+        def compute():
+            hist = self.histogram
+            n = hist.sum()
+            if n == 0:
+                return 0.0
+            levels = np.arange(256, dtype=np.float64)
+            mean = (hist * levels).sum() / n
+            var = (hist * (levels - mean) ** 2).sum() / n
+            return float(np.sqrt(var))
+        return self._get("gray_std", compute)
+
+
+def as_features(image) -> ImageFeatures:
+    """Accepts a BGR ndarray, an ImageFeatures or a DecodedImage."""
+    if isinstance(image, ImageFeatures):
+        return image
+    features = getattr(image, "features", None)
+    if isinstance(features, ImageFeatures):
+        return features
+    return ImageFeatures(image)
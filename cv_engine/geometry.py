@@ -1,6 +1,59 @@
 import cv2
 import numpy as np
-from skimage.metrics import structural_similarity as ssim
+
+from cv_engine.features import as_features
+
+
+# Symmetry and clutter are computed on a copy whose longer side is at most
+# this many pixels (None = full resolution). Scores then no longer depend
+# on the upload resolution, and a 12 MP photo costs the same as a 1 MP one.
+WORKING_MAX_SIDE = 1024
+
+
+def _mean_ssim(x, y=None, data_range=255.0, win_size=7):
+    """
+    Mean SSIM, equal to skimage's structural_similarity defaults (7x7
+    uniform window, sample covariance, border cropped) but computed in
+    float32 without materialising or returning the SSIM map.
+    If y is None it is the horizontal mirror of x, which lets the local
+    means of y be mirrored from x instead of filtered again.
+    """
+    ksize = (win_size, win_size)
+    x = x.astype(np.float32)
+    ux = cv2.blur(x, ksize)
+    uxx = cv2.blur(x * x, ksize)
+
+    if y is None:
+        y = cv2.flip(x, 1)
+        uy = cv2.flip(ux, 1)
+        uyy = cv2.flip(uxx, 1)
+    else:
+        y = y.astype(np.float32)
+        uy = cv2.blur(y, ksize)
+        uyy = cv2.blur(y * y, ksize)
+    uxy = cv2.blur(x * y, ksize)
+
+    n = win_size * win_size
+    cov_norm = n / (n - 1.0)
+    c1 = (0.01 * data_range) ** 2
+    c2 = (0.03 * data_range) ** 2
+
+    # reuse buffers in place to keep peak memory to a handful of maps
+    vx = uxx - ux * ux
+    vx *= cov_norm
+    vy = uyy - uy * uy
+    vy *= cov_norm
+    vxy = uxy - ux * uy
+    vxy *= cov_norm
+
+    num = 2 * ux * uy + c1
+    num *= 2 * vxy + c2
+    den = ux * ux + uy * uy + c1
+    den *= vx + vy + c2
+    num /= den
+
+    pad = (win_size - 1) // 2
+    return float(num[pad:-pad, pad:-pad].mean(dtype=np.float64))
 
 
 # ---------- Rule of Thirds ----------
@@ -25,29 +78,27 @@ def rule_of_thirds_score(cx, cy, w, h):
 
 
 # ---------- Symmetry ----------
-def symmetry_score(image_bgr):
+def symmetry_score(image_bgr, max_side=WORKING_MAX_SIDE):
     """
     Horizontal symmetry based on SSIM between image and its mirror.
     Returns score in [-1, 1] but usually ~[0, 1].
+    image_bgr may also be an ImageFeatures / DecodedImage.
     """
-    gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY).astype("float32")
-    flipped = cv2.flip(gray, 1)
-
-    # Since float, specify data_range explicitly
-    score, _ = ssim(gray, flipped, full=True, data_range=255.0)
-    return float(score)
+    gray = as_features(image_bgr).working_gray(max_side)
+    if min(gray.shape[:2]) < 7:
+        return 1.0 if gray.size == 0 else float(np.array_equal(gray, cv2.flip(gray, 1)))
+    return _mean_ssim(gray, data_range=255.0)
 
 
 # ---------- Clutter / Edge Density ----------
-def clutter_score(image_bgr):
+def clutter_score(image_bgr, max_side=WORKING_MAX_SIDE):
     """
     Edge density using Canny — higher = more clutter.
     Returns value in [0, 1].
     """
-    gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
-    edges = cv2.Canny(gray, 100, 200)
-    edge_pixels = np.sum(edges > 0)
-    total_pixels = image_bgr.shape[0] * image_bgr.shape[1]
+    edges = as_features(image_bgr).edges(max_side, 100, 200)
+    edge_pixels = np.count_nonzero(edges)
+    total_pixels = edges.shape[0] * edges.shape[1]
     if total_pixels == 0:
         return 0.0
     return float(edge_pixels / total_pixels)
@@ -58,7 +109,7 @@ def brightness_score(image_bgr):
     """
     Mean pixel intensity scaled to [0,1]
     """
-    return float(np.mean(image_bgr) / 255.0)
+    return float(as_features(image_bgr).mean_intensity / 255.0)
 
 
 # ---------- Contrast ----------
@@ -67,5 +118,4 @@ def contrast_score(image_bgr):
     Standard deviation of grayscale intensities, normalized.
     Roughly [0, 1] for typical images.
     """
-    gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
-    return float(np.std(gray) / 128.0)
+    return float(as_features(image_bgr).gray_std / 128.0)
@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+from functools import cached_property
+from PIL import Image
+
+from cv_engine.features import ImageFeatures
+
+
+class DecodedImage:
+    """
+    An image decoded once and shared by every engine.
+
+    bgr: HxWx3 uint8 array (OpenCV / YOLO order)
+    rgb: view of the same pixels in RGB order (no copy)
+    """
+
+    def __init__(self, bgr: np.ndarray):
+        if bgr is None or bgr.ndim != 3 or bgr.shape[2] != 3:
+            raise ValueError("Expected an HxWx3 BGR image")
+        self.bgr = bgr
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "DecodedImage":
+        buf = np.frombuffer(data, np.uint8)
+        bgr = cv2.imdecode(buf, cv2.IMREAD_COLOR) if buf.size else None
+        if bgr is None:
+            raise ValueError("Could not read image")
+        return cls(bgr)
+
+    @classmethod
+    def from_path(cls, path: str) -> "DecodedImage":
+        bgr = cv2.imread(path)
+        if bgr is None:
+            raise ValueError(f"Could not read image: {path}")
+        return cls(bgr)
+
+    @property
+    def height(self) -> int:
+        return self.bgr.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.bgr.shape[1]
+
+    @cached_property
+    def rgb(self) -> np.ndarray:
+        return self.bgr[..., ::-1]
+
+    @cached_property
+    def features(self) -> ImageFeatures:
+        """Lazily computed gray / edges / histogram / ... for this image."""
+        return ImageFeatures(self.bgr)
+
+    def to_pil(self) -> Image.Image:
+        return Image.fromarray(np.ascontiguousarray(self.rgb))
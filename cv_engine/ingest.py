@@ -0,0 +1,264 @@
+"""
+Bulk viral-bank ingestion.
+
+    python -m cv_engine.ingest SOURCE [--label viral] [--bank-dir cv_engine/viral_bank/]
+                               [--batch-size 32] [--workers N] [--no-resume]
+
+SOURCE is a directory (searched recursively for images) or a manifest:
+a .jsonl file of {"path": ..., "label": ...} lines or a text file with
+one path per line. Relative manifest paths are resolved against the
+manifest's directory.
+
+Worker processes read, hash (sha256) and CLIP-preprocess images while the
+main process embeds them in batches and appends each batch to the bank.
+Images whose content is already in the bank are skipped. After every
+committed batch the paths that were added (or found to be duplicates)
+are recorded in a checkpoint file in the bank directory, so an
+interrupted run resumes where it stopped. Images that could not be read
+are not checkpointed, so the next run tries them again; each run also
+lists them, with the error, in ingest-failed.jsonl in the bank directory,
+a manifest that can be passed back as SOURCE.
+"""
+import argparse
+import collections
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif", ".tif", ".tiff"}
+CHECKPOINT = "ingest-checkpoint.jsonl"
+FAILED = "ingest-failed.jsonl"
+
+
+@dataclass
+class IngestStats:
+    seen: int = 0
+    added: int = 0
+    duplicates: int = 0
+    resumed: int = 0      # skipped via the checkpoint without reading
+    failed: int = 0
+    seconds: float = 0.0
+
+    @property
+    def images_per_sec(self) -> float:
+        return self.added / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> Dict:
+        return {**asdict(self), "images_per_sec": self.images_per_sec}
+
+
+# ---------- sources ----------
+
+def iter_source(source: str, label: str) -> Iterator[Tuple[str, str]]:
+    """(path, label) pairs from a directory or a manifest file."""
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                    yield os.path.join(root, name), label
+        return
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if source.endswith(".jsonl"):
+                entry = json.loads(line)
+                path, item_label = entry["path"], entry.get("label", label)
+            else:
+                path, item_label = line, label
+            yield os.path.join(base, path), item_label
+
+
+def _file_key(path: str) -> Optional[List]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+
+
+# ---------- worker side ----------
+
+_preprocess: Optional[Callable] = None
+_known: Set[str] = set()
+
+
+def _init_worker(preprocess, known):
+    global _preprocess, _known
+    _preprocess, _known = preprocess, known
+
+
+def _prepare(path: str):
+    """-> (sha256, preprocessed array or None if already known, error)"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if digest in _known:
+            return digest, None, None
+        image = Image.open(io.BytesIO(data)).convert("RGB")
+        return digest, np.asarray(_preprocess(image), dtype=np.float32), None
+    except Exception as e:
+        return None, None, f"{type(e).__name__}: {e}"
+
+
+def _prepare_all(items: Iterable[Tuple], workers: int, preprocess, known: Set[str]):
+    """
+    items: tuples whose first element is a path. Yields (item, result) in
+    order, keeping a bounded number of images in flight.
+    """
+    if workers <= 0:
+        _init_worker(preprocess, known)
+        for item in items:
+            yield item, _prepare(item[0])
+        return
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(preprocess, known)) as pool:
+        pending = collections.deque()
+        for item in items:
+            pending.append((item, pool.submit(_prepare, item[0])))
+            # bounded: preprocessed tensors are ~600 KB each
+            if len(pending) >= workers * 4:
+                item, fut = pending.popleft()
+                yield item, fut.result()
+        while pending:
+            item, fut = pending.popleft()
+            yield item, fut.result()
+
+
+# ---------- main loop ----------
+
+class Ingester:
+    def __init__(self, trend, batch_size: int = 32, workers: Optional[int] = None, resume: bool = True):
+        """trend: a TrendSimilarity (its model, preprocess and bank are used)."""
+        self.trend = trend
+        self.batch_size = max(1, batch_size)
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.resume = resume
+        self.checkpoint_path = os.path.join(trend.bank_dir, CHECKPOINT)
+        self.failed_path = os.path.join(trend.bank_dir, FAILED)
+
+    def _load_checkpoint(self) -> Set[Tuple]:
+        done = set()
+        if self.resume and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        done.add(tuple(json.loads(line)))
+                    except ValueError:
+                        pass  # torn last line from a crash
+        return done
+
+    def _checkpoint(self, keys: List[List]) -> None:
+        with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+            for key in keys:
+                f.write(json.dumps(key) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def run(self, items: Iterable[Tuple[str, str]], log_every: int = 10) -> IngestStats:
+        stats = IngestStats()
+        start = time.perf_counter()
+
+        done = self._load_checkpoint()
+        known = {m["sha256"] for m in self.trend.meta if "sha256" in m}
+
+        def todo():
+            for path, label in items:
+                stats.seen += 1
+                key = _file_key(path)
+                if key is not None and tuple(key) in done:
+                    stats.resumed += 1
+                    continue
+                yield path, label, key
+
+        batch: List[np.ndarray] = []
+        metas: List[Dict] = []
+        processed: List[List] = []
+        batches = 0
+
+        def commit():
+            nonlocal batch, metas, processed, batches
+            if batch:
+                embs = self.trend.embed_preprocessed(np.stack(batch))
+                self.trend.add_embeddings(embs, metas)
+                stats.added += len(batch)
+                stats.seconds = time.perf_counter() - start
+                batches += 1
+                if batches % log_every == 0:
+                    logger.info("ingested %d images (%.1f images/sec)", stats.added, stats.images_per_sec)
+            if processed:
+                self._checkpoint(processed)
+            batch, metas, processed = [], [], []
+
+        prepared = _prepare_all(todo(), self.workers, self.trend.preprocess, known)
+        with open(self.failed_path, "w", encoding="utf-8") as failed:
+            for (path, label, key), (digest, tensor, error) in prepared:
+                if error is not None:
+                    # not checkpointed: the next run retries it
+                    stats.failed += 1
+                    logger.warning("skipping %s: %s", path, error)
+                    failed.write(json.dumps({"path": os.path.abspath(path), "label": label, "error": error}) + "\n")
+                    failed.flush()
+                    continue
+                if tensor is None or digest in known:
+                    stats.duplicates += 1
+                else:
+                    known.add(digest)
+                    batch.append(tensor)
+                    metas.append({"path": path, "label": label, "sha256": digest})
+                if key is not None:
+                    processed.append(key)
+                if len(batch) >= self.batch_size:
+                    commit()
+
+            commit()
+        stats.seconds = time.perf_counter() - start
+        if stats.failed:
+            logger.warning("%d images failed; they are listed in %s", stats.failed, self.failed_path)
+        return stats
+
+
+def main(argv=None) -> Dict:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="image directory or manifest (.jsonl / .txt)")
+    parser.add_argument("--label", default="viral", help="label for entries without one")
+    parser.add_argument("--bank-dir", default="cv_engine/viral_bank/")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=None, help="decode processes (0 = in-process)")
+    parser.add_argument("--no-resume", action="store_true", help="ignore the checkpoint file")
+    parser.add_argument("--device", default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    from cv_engine.trend_similarity import TrendSimilarity
+
+    # exact index: attaching the mmapped bank is free, no IVF training
+    trend = TrendSimilarity(bank_dir=args.bank_dir, device=args.device, index="exact")
+    ingester = Ingester(trend, batch_size=args.batch_size, workers=args.workers, resume=not args.no_resume)
+    stats = ingester.run(iter_source(args.source, args.label))
+    trend.store.wait()
+
+    summary = stats.to_dict()
+    print(json.dumps(summary))
+    return summary
+
+
+if __name__ == "__main__":
+    main()
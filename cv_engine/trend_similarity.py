@@ -1,30 +1,41 @@
 import os
-import json
-import numpy as np
-import torch
-from PIL import Image
-import open_clip
+
+from cv_engine.ann_index import build_index
+from cv_engine.clip_model import ClipEncoder
+from cv_engine.embedding_store import EmbeddingStore
 
 
 class TrendSimilarity:
-    def __init__(self, bank_dir="cv_engine/viral_bank/", device=None):
+    def __init__(
+        self,
+        bank_dir="cv_engine/viral_bank/",
+        device=None,
+        index="auto",
+        index_threshold=50000,
+        nprobe=16,
+        bank_dtype="float32",
+        clip=None,
+    ):
+        """
+        clip: a shared ClipEncoder (one is created if not given)
+        index: "exact", "ivf" or "auto" (exact until the bank holds more
+        than index_threshold embeddings, then IVF scanning nprobe cells)
+        bank_dtype: "float32" or "float16" segments for a new bank
+        """
         self.bank_dir = bank_dir
+        self.index_kind = index
+        self.index_threshold = index_threshold
+        self.nprobe = nprobe
+        self.bank_dtype = bank_dtype
         os.makedirs(self.bank_dir, exist_ok=True)
 
-        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-
-        # Load CLIP model
-        self.model, _, self.preprocess = open_clip.create_model_and_transforms(
-            "ViT-B-32", pretrained="openai"
-        )
-        self.model.to(self.device)
-        self.model.eval()
+        # CLIP model, possibly shared with the aesthetic scorer
+        self.clip = clip or ClipEncoder(device=device)
+        self.device = self.clip.device
+        self.preprocess = self.clip.preprocess
 
-        self.emb_path = os.path.join(self.bank_dir, "embeddings.npy")
-        self.meta_path = os.path.join(self.bank_dir, "meta.json")
-
-        self.embeddings = None
-        self.meta = None
+        self.store = None
+        self.index = None
 
         self._load_bank()
 
@@ -33,45 +44,90 @@ class TrendSimilarity:
     # ------------------------------
 
     def _load_bank(self):
-        if os.path.exists(self.emb_path) and os.path.exists(self.meta_path):
-            self.embeddings = np.load(self.emb_path)
-            with open(self.meta_path, "r") as f:
-                self.meta = json.load(f)
-        else:
-            self.embeddings = np.zeros((0, 512))
-            self.meta = []
-            self._save_bank()
-
-    def _save_bank(self):
-        np.save(self.emb_path, self.embeddings)
-        with open(self.meta_path, "w") as f:
-            json.dump(self.meta, f)
+        # memory-mapped, append-only; an old embeddings.npy/meta.json bank
+        # is imported on first open
+        self.store = EmbeddingStore(self.bank_dir, dim=512, dtype=self.bank_dtype)
+        self.index = build_index(
+            self.index_kind,
+            dim=self.store.dim,
+            nprobe=self.nprobe,
+            threshold=self.index_threshold,
+        )
+        for segment in self.store.segments():
+            self.index.attach(segment)
+        # an IVF index trains itself once it holds enough vectors; a
+        # smaller bank is trained on whatever it has
+        if len(self.index) and hasattr(self.index, "train") and not self.index.is_trained:
+            self.index.train()
+
+    @property
+    def meta(self):
+        return self.store.meta
+
+    def refresh_bank(self):
+        """Pick up embeddings another process appended to the bank."""
+        for rows in self.store.refresh():
+            self.index.attach(rows)
 
     # ------------------------------
     # Public functions
     # ------------------------------
 
-    def _embed_image(self, image_path: str):
-        image = Image.open(image_path).convert("RGB")
-        image_tensor = self.preprocess(image).unsqueeze(0).to(self.device)
+    def _embed_image(self, image):
+        return self.clip.embed_image(image)
 
-        with torch.no_grad():
-            emb = self.model.encode_image(image_tensor)[0]
-        emb = emb / emb.norm()  # Normalize
-        return emb.cpu().numpy()
+    def _embed_images(self, images):
+        return self.clip.embed_images(images)
+
+    def embed_preprocessed(self, tensors):
+        return self.clip.embed_preprocessed(tensors)
 
     def add_to_bank(self, image_path: str, label="viral"):
         emb = self._embed_image(image_path)
-        self.embeddings = np.vstack([self.embeddings, emb])
-        self.meta.append({"path": image_path, "label": label})
-        self._save_bank()
-
-    def similarity_score(self, image_path: str):
-        if len(self.embeddings) == 0:
-            return 0.5  # neutral fallback
+        self.add_embeddings(emb[None, :], [{"path": image_path, "label": label}])
 
-        query_emb = self._embed_image(image_path)
+    def add_embeddings(self, embeddings, metas):
+        """Append precomputed embeddings (one meta dict each) to the bank."""
+        self.store.append(embeddings, metas)
+        self.index.add(embeddings)
 
-        sims = np.dot(self.embeddings, query_emb)
-        best = float(np.max(sims))
-        return best  # already between 0 and 1
+    def similarity_score(self, image):
+        if len(self.index) == 0:
+            return 0.5  # neutral fallback
+        return self.similarity_from_embedding(self._embed_image(image))
+
+    def similarity_scores(self, images):
+        """Batched similarity_score: one score per image, same order."""
+        if len(images) == 0:
+            return []
+        if len(self.index) == 0:
+            return [0.5] * len(images)
+        return self.similarity_from_embeddings(self._embed_images(images))
+
+    def similarity_from_embedding(self, emb):
+        """similarity_score for an image already embedded by the shared CLIP."""
+        return self.similarity_from_embeddings([emb])[0]
+
+    def similarity_from_embeddings(self, embs):
+        if len(self.index) == 0:
+            return [0.5] * len(embs)
+
+        scores, _ = self.index.search(embs, k=1)
+        return [float(s) for s in scores[:, 0]]  # already between 0 and 1
+
+    def top_k(self, image, k=5):
+        """The k most similar bank entries: [{"score", "path", "label"}, ...]."""
+        if len(self.index) == 0 or k <= 0:
+            return []
+        return self.top_k_from_embedding(self._embed_image(image), k)
+
+    def top_k_from_embedding(self, emb, k=5):
+        if len(self.index) == 0 or k <= 0:
+            return []
+
+        scores, ids = self.index.search(emb, k=k)
+        return [
+            {"score": float(s), **self.meta[i]}
+            for s, i in zip(scores[0], ids[0])
+            if i >= 0
+        ]
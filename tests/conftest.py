@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+
+def _fake_clip_parts():
+    torch = pytest.importorskip("torch")
+    pytest.importorskip("open_clip")
+
+    class FakeClip(torch.nn.Module):
+        """Stand-in for CLIP: images embed as their mean color, text as token ids."""
+
+        def encode_image(self, x):
+            return torch.nn.functional.pad(x.mean(dim=(2, 3)), (0, 509)) + 1e-3
+
+        def encode_text(self, tokens):
+            return torch.nn.functional.pad(tokens[:, 1:9].float(), (0, 504)) + 1e-3
+
+    return FakeClip()
+
+
+def preprocess(im):
+    # module level so ingest worker processes can unpickle it
+    import torch
+    return torch.from_numpy(np.asarray(im.resize((8, 8)), dtype=np.float32) / 255.0).permute(2, 0, 1)
+
+
+@pytest.fixture
+def fake_clip(monkeypatch):
+    """
+    Makes cv_engine.clip_model.ClipEncoder build a tiny fake model instead
+    of downloading ViT-B/32. Returns the list of models created.
+    """
+    model = _fake_clip_parts()
+    import cv_engine.clip_model as clip_model
+
+    created = []
+
+    def create(*args, **kwargs):
+        created.append(model)
+        return model, None, preprocess
+
+    monkeypatch.setattr(clip_model.open_clip, "create_model_and_transforms", create)
+    return created
+
+
+# Vocabulary source for the tiny caption model (byte-level BPE, so other
+# text still tokenizes)
+TINY_CAPTIONS = [
+    "Stop scrolling! 🔥 This is the secret to boosting your Reels. Save this. 😎",
+    "worst day ever",
+    "Sunset over the bay. Link in bio for prints.",
+    "I can't believe how good this turned out, so proud of the team 🙌",
+    "Honestly disappointed. The product broke after two days.",
+    "Did you know most creators post at the wrong time? Here's why timing "
+    "matters more than hashtags, and what nobody tells you about the algorithm.",
+    "Grateful for every one of you. Tag a friend who needs this today 💛",
+]
+
+
+@pytest.fixture(scope="session")
+def tiny_caption_model(tmp_path_factory):
+    """
+    A randomly initialised two-layer RoBERTa classifier with a byte-level
+    BPE vocabulary trained on TINY_CAPTIONS, saved as a local checkpoint,
+    so CaptionAnalyzer runs without a download.
+    """
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    tokenizers = pytest.importorskip("tokenizers")
+
+    path = tmp_path_factory.mktemp("tiny-roberta")
+    bpe = tokenizers.ByteLevelBPETokenizer()
+    bpe.train_from_iterator(
+        TINY_CAPTIONS, vocab_size=400, min_frequency=1,
+        special_tokens=["<s>", "<pad>", "</s>", "<unk>", "<mask>"],
+    )
+    bpe.post_processor = tokenizers.processors.RobertaProcessing(("</s>", 2), ("<s>", 0))
+    tokenizer = transformers.RobertaTokenizerFast(tokenizer_object=bpe)
+    tokenizer.save_pretrained(path)
+
+    torch.manual_seed(0)
+    config = transformers.RobertaConfig(
+        vocab_size=tokenizer.vocab_size, hidden_size=64, num_hidden_layers=2,
+        num_attention_heads=4, intermediate_size=128, max_position_embeddings=160,
+        num_labels=3, initializer_range=0.2,
+    )
+    transformers.RobertaForSequenceClassification(config).save_pretrained(path)
+    return str(path)
@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.batching import MicroBatcher
+
+
+def test_concurrent_items_share_a_batch():
+    sizes = []
+
+    def batch_fn(items):
+        sizes.append(len(items))
+        return [x * 2 for x in items]
+
+    batcher = MicroBatcher("test", batch_fn, max_batch_size=4, max_wait_ms=50)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda x: batcher.submit(x).result(timeout=5), range(8)))
+
+    # every caller gets its own result back
+    assert results == [x * 2 for x in range(8)]
+    assert max(sizes) > 1
+    assert all(s <= 4 for s in sizes)
+
+
+def test_batch_errors_reach_every_caller():
+    def batch_fn(items):
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher("test", batch_fn, max_batch_size=2, max_wait_ms=1)
+    with pytest.raises(RuntimeError):
+        batcher.submit(1).result(timeout=5)
+    # the worker survives a failed batch
+    with pytest.raises(RuntimeError):
+        batcher.submit(2).result(timeout=5)
+    assert batcher.stats()["pending"] == 0
+
+
+def test_short_batch_result_fails_every_caller():
+    batcher = MicroBatcher("test", lambda items: items[:1], max_batch_size=4, max_wait_ms=50)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(lambda x=x: batcher.submit(x).result(timeout=5)) for x in range(4)]
+        errors = []
+        for f in futures:
+            try:
+                f.result(timeout=10)
+            except RuntimeError as e:
+                errors.append(e)
+    # nobody is left waiting; every caller of a short batch gets the error
+    assert errors
+    assert batcher.stats()["pending"] == 0
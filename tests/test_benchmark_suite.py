@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from benchmarks import run as suite
+
+
+def _report(**best_ms):
+    return {"meta": {}, "results": {name: {"best_ms": ms} for name, ms in best_ms.items()}}
+
+
+def test_compare_flags_regressions_only_beyond_tolerance():
+    baseline = _report(a=10.0, b=10.0, c=10.0, gone=1.0)
+    current = _report(a=12.0, b=13.0, c=5.0, added=1.0)
+    rows = {r["name"]: r for r in suite.compare(current, baseline, tolerance=0.25)}
+
+    assert rows["a"]["status"] == "ok"
+    assert rows["b"]["status"] == "regression"
+    assert rows["b"]["ratio"] == pytest.approx(1.3)
+    assert rows["c"]["status"] == "improved"
+    assert rows["added"]["status"] == "new"
+    assert rows["gone"]["status"] == "missing"
+
+
+def test_run_writes_results_and_checks_baseline(tmp_path):
+    pytest.importorskip("cv2")
+    out = tmp_path / "results.json"
+    args = ["--suites", "geometry,scoring", "--sizes", "vga", "--repeat", "1", "--out", str(out)]
+    assert suite.main(args) == 0
+
+    report = json.loads(out.read_text())
+    assert report["meta"]["args"]["suites"] == "geometry,scoring"
+    assert report["results"]["scoring.compute"]["loops"] > 1
+    assert report["results"]["geometry.symmetry_score[vga]"]["best_ms"] > 0
+
+    # against a baseline that was 10x faster everywhere
+    baseline = tmp_path / "baseline.json"
+    for r in report["results"].values():
+        r["best_ms"] /= 10
+    baseline.write_text(json.dumps(report))
+    assert suite.main(args + ["--baseline", str(baseline)]) == 1
+
+
+def test_suites_remove_their_temporary_files(tmp_path, monkeypatch):
+    pytest.importorskip("torch")
+    pytest.importorskip("open_clip")
+    scratch = tmp_path / "scratch"
+    scratch.mkdir()
+    monkeypatch.setattr(suite.tempfile, "tempdir", str(scratch))
+    args = suite.argparse.Namespace(bank_sizes="1k,1k")
+
+    benches = suite.trend_suite(args)
+    names = [name for name, _ in benches]
+    assert "trend.similarity_from_embedding[1k]" in names
+    assert list(scratch.iterdir()) == []
+
+    # a suite abandoned half way cleans up too
+    benches = suite.trend_suite(args)
+    while not next(benches)[0].startswith("trend.similarity_score"):
+        pass
+    assert len(list(scratch.iterdir())) == 1
+    benches.close()
+    assert list(scratch.iterdir()) == []
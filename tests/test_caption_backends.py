@@ -0,0 +1,73 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+tokenizers = pytest.importorskip("tokenizers")
+
+from text_engine.caption_analysis import CaptionAnalyzer
+
+# The quantized backends must keep every sentiment_score within this of
+# the float model's.
+MAX_SENTIMENT_DRIFT = 0.05
+
+CAPTIONS = [
+    "Stop scrolling! 🔥 This is the secret to boosting your Reels. Save this. 😎",
+    "worst day ever",
+    "Sunset over the bay. Link in bio for prints.",
+    "ok",
+    "I can't believe how good this turned out, so proud of the team 🙌",
+    "Honestly disappointed. The product broke after two days.",
+    "New video is up, go watch it",
+    "This is crazy, nobody talks about how bad the service was",
+    "Did you know most creators post at the wrong time? Here's why timing "
+    "matters more than hashtags, and what nobody tells you about the algorithm.",
+    "Grateful for every one of you. Tag a friend who needs this today 💛",
+    "meh",
+    "Traffic again. Late again. Great start to the week.",
+]
+
+
+def _scores(analyzer):
+    return [r.sentiment_score for r in analyzer.analyze_batch(CAPTIONS, batch_size=4)]
+
+
+def _check_backend(backend, model_name, tmp_path):
+    if backend.startswith("onnx"):
+        pytest.importorskip("onnxruntime")
+        pytest.importorskip("onnx")
+
+    want = _scores(CaptionAnalyzer(device="cpu", model_name=model_name))
+    analyzer = CaptionAnalyzer(device="cpu", backend=backend, onnx_dir=str(tmp_path), model_name=model_name)
+    got = _scores(analyzer)
+
+    drift = max(abs(g - w) for g, w in zip(got, want))
+    assert drift <= MAX_SENTIMENT_DRIFT, drift
+    # single captions (unpadded) take the same path
+    assert analyzer.analyze(CAPTIONS[1]).sentiment_score == pytest.approx(got[1], abs=1e-4)
+
+
+@pytest.mark.parametrize("backend", ["int8", "onnx", "onnx-int8"])
+def test_backend_parity_tiny_model(backend, tiny_caption_model, tmp_path):
+    _check_backend(backend, tiny_caption_model, tmp_path)
+
+
+@pytest.fixture(scope="module")
+def sentiment_model():
+    """The real sentiment model, if it is already in the local HF cache."""
+    name = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+    try:
+        transformers.AutoTokenizer.from_pretrained(name, local_files_only=True)
+        transformers.AutoModelForSequenceClassification.from_pretrained(name, local_files_only=True)
+    except OSError:
+        pytest.skip(f"{name} is not cached locally")
+    return name
+
+
+@pytest.mark.parametrize("backend", ["int8", "onnx-int8"])
+def test_backend_agreement_on_sentiment_model(backend, sentiment_model, tmp_path):
+    _check_backend(backend, sentiment_model, tmp_path)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        CaptionAnalyzer(backend="tensorrt")
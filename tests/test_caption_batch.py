@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip("transformers")
+
+from text_engine.caption_analysis import CaptionAnalyzer
+
+CAPTIONS = [
+    "Stop scrolling! 🔥 This is the secret to boosting your Reels. Save this. 😎",
+    "worst day ever",
+    "",
+    "Sunset over the bay. Link in bio for prints.",
+    "ok",
+    "Did you know most creators post at the wrong time? Here's why timing "
+    "matters more than hashtags, and what nobody tells you about the algorithm.",
+]
+
+
+def test_batch_matches_single_caption_scores(tiny_caption_model):
+    analyzer = CaptionAnalyzer(device="cpu", model_name=tiny_caption_model)
+
+    batched = analyzer.analyze_batch(CAPTIONS, batch_size=2)
+    assert len(batched) == len(CAPTIONS)
+
+    for caption, result in zip(CAPTIONS, batched):
+        single = analyzer.analyze(caption).to_dict()
+        for key, value in result.to_dict().items():
+            assert value == pytest.approx(single[key], abs=1e-4), (caption, key)
@@ -0,0 +1,36 @@
+from text_engine.cache import LRUCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1   # "a" is now most recent
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_ttl_expires_entries():
+    now = [0.0]
+    cache = LRUCache(max_size=10, ttl=60, clock=lambda: now[0])
+    cache.put("caption", "features")
+
+    now[0] = 59
+    assert cache.get("caption") == "features"
+    now[0] = 61
+    assert cache.get("caption") is None
+
+
+def test_stats_count_hits_and_misses():
+    cache = LRUCache()
+    cache.get("x")
+    cache.put("x", 1)
+    cache.get("x")
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_rate"] == 0.5
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("open_clip")
+
+from benchmarks.synthetic import synthetic_scene
+from cv_engine.ann_index import ExactIndex
+from cv_engine.clip_model import ClipEncoder
+
+# Randomly initialised ViT-B/32 (no download); same seed -> same weights.
+# Thresholds are the ones the quantized backends must meet on real weights.
+MIN_COSINE = 0.995
+MAX_TREND_DRIFT = 0.02
+
+
+def _encoder(backend, tmp_path):
+    torch.manual_seed(0)
+    return ClipEncoder(pretrained=None, device="cpu", backend=backend, onnx_dir=str(tmp_path))
+
+
+@pytest.fixture(scope="module")
+def images():
+    return [synthetic_scene(160, 200, seed=s) for s in range(12)]
+
+
+@pytest.fixture(scope="module")
+def reference(images, tmp_path_factory):
+    enc = _encoder("torch", tmp_path_factory.mktemp("onnx"))
+    return enc.embed_images(images)
+
+
+@pytest.mark.parametrize("backend", ["int8", "onnx", "onnx-int8"])
+def test_backend_parity(backend, images, reference, tmp_path):
+    if backend.startswith("onnx"):
+        pytest.importorskip("onnxruntime")
+        pytest.importorskip("onnx")
+
+    embs = _encoder(backend, tmp_path).embed_images(images)
+
+    # embedding agreement
+    cosine = (embs * reference).sum(axis=1)
+    assert cosine.min() >= MIN_COSINE
+
+    # trend-score drift: bank of the first 8 images, query with the rest
+    bank = ExactIndex(reference.shape[1])
+    bank.add(reference[:8])
+    want, _ = bank.search(reference[8:], k=1)
+    got, _ = bank.search(embs[8:], k=1)
+    assert np.abs(got - want).max() <= MAX_TREND_DRIFT
+
+
+def test_same_seed_gives_same_weights(images, reference, tmp_path):
+    again = _encoder("torch", tmp_path).embed_images(images[:2])
+    np.testing.assert_allclose(again, reference[:2], atol=1e-6)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        ClipEncoder(pretrained=None, backend="tensorrt")
@@ -0,0 +1,23 @@
+from benchmarks.synthetic import synthetic_image, palette_delta_e
+from cv_engine.color import ColorAnalyzer
+
+
+def test_fast_palette_matches_exact():
+    img = synthetic_image(600, 800, seed=1)
+
+    exact = ColorAnalyzer(mode="exact").dominant_colors(img)
+    fast = ColorAnalyzer(mode="fast", pixel_budget=16384).dominant_colors(img)
+
+    assert len(fast) == len(exact) == 3
+    # perceptually indistinguishable at a glance
+    assert palette_delta_e(exact, fast) < 5.0
+
+
+def test_fast_mode_keeps_entry_points():
+    img = synthetic_image(120, 160)
+    analyzer = ColorAnalyzer(mode="fast")
+
+    assert len(analyzer.extract_colors(img, k=4)) == 4
+    out = analyzer.analyze(img)
+    assert set(out) == {"brightness", "contrast", "dominant_colors"}
+    assert all(0.0 <= c <= 1.0 for color in out["dominant_colors"] for c in color)
@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("ultralytics")
+
+from benchmarks.synthetic import synthetic_scene
+from cv_engine.detector import ObjectDetector
+from cv_engine.image_io import DecodedImage
+
+
+@pytest.fixture(scope="module")
+def image():
+    return DecodedImage(synthetic_scene(240, 320))
+
+
+def test_predict_options_are_forwarded(image, monkeypatch):
+    # yolov8n.yaml: randomly initialised, no download needed
+    detector = ObjectDetector("yolov8n.yaml", imgsz=320, classes=[0, 2], max_det=5, conf=0.1)
+    calls = []
+    real_call = type(detector.model).__call__
+
+    def record(self, source, **kwargs):
+        calls.append(kwargs)
+        return real_call(self, source, **kwargs)
+
+    monkeypatch.setattr(type(detector.model), "__call__", record)
+    detector.load(image)
+    detector.load_batch([image, image])
+
+    assert len(calls) == 2
+    for kwargs in calls:
+        assert kwargs["imgsz"] == 320
+        assert kwargs["classes"] == [0, 2]
+        assert kwargs["max_det"] == 5
+        assert kwargs["conf"] == 0.1
+        assert kwargs["verbose"] is False
+        assert "device" not in kwargs  # ultralytics picks, as before
+
+
+def test_device_is_forwarded_when_given():
+    detector = ObjectDetector("yolov8n.yaml", device="cpu")
+    assert detector.predict_args["device"] == "cpu"
+
+
+def test_max_det_and_class_allow_list(image):
+    # a near-zero confidence threshold makes random weights produce boxes
+    detector = ObjectDetector("yolov8n.yaml", imgsz=320, classes=[3], max_det=4, conf=1e-4)
+    result = detector.load(image)
+
+    assert len(result["boxes"]) <= 4
+    assert all(c == 3 for c in result["classes"])
+    assert result["image_size"] == (320, 240)
+    if result["boxes"]:
+        areas = [(b[2] - b[0]) * (b[3] - b[1]) for b in result["boxes"]]
+        assert result["main_box"] == result["boxes"][areas.index(max(areas))]
@@ -0,0 +1,124 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from cv_engine.embedding_store import EmbeddingStore, _atomic_concat_npy
+
+
+def _rows(n, dim=8, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def test_append_and_reopen(tmp_path):
+    store = EmbeddingStore(str(tmp_path), dim=8, background=False)
+    x = _rows(5)
+    assert store.append(x[:3], [{"i": i} for i in range(3)]) == (0, 3)
+    assert store.append(x[3:], [{"i": 3}, {"i": 4}]) == (3, 5)
+
+    again = EmbeddingStore(str(tmp_path))
+    assert len(again) == 5
+    np.testing.assert_array_equal(again.vectors(), x)
+    assert [m["i"] for m in again.meta] == list(range(5))
+    assert all(isinstance(s, np.memmap) for s in again.segments())
+
+
+def test_float16_segments(tmp_path):
+    store = EmbeddingStore(str(tmp_path), dim=8, dtype="float16", background=False)
+    x = _rows(4)
+    store.append(x, [{}] * 4)
+    assert store.vectors().dtype == np.float16
+    np.testing.assert_allclose(store.vectors(), x, atol=1e-2)
+    # an existing manifest wins over the constructor argument
+    assert EmbeddingStore(str(tmp_path), dtype="float32").dtype == "float16"
+
+
+def test_compaction_keeps_order(tmp_path):
+    store = EmbeddingStore(str(tmp_path), dim=8, fanout=4, background=False)
+    x = _rows(40)
+    for i in range(40):
+        store.append(x[i], [{"i": i}])
+
+    assert len(store.segment_names()) < 8
+    np.testing.assert_array_equal(store.vectors(), x)
+    assert [m["i"] for m in EmbeddingStore(str(tmp_path)).meta] == list(range(40))
+    on_disk = {f.rsplit(".", 1)[0] for f in os.listdir(tmp_path) if f.startswith("seg-")}
+    assert on_disk == set(store.segment_names())
+
+
+def test_background_compaction(tmp_path):
+    store = EmbeddingStore(str(tmp_path / "bg"), dim=8, fanout=2)
+    x = _rows(16)
+    for i in range(16):
+        store.append(x[i], [{"i": i}])
+    store.wait()
+    store.compact()
+
+    np.testing.assert_array_equal(store.vectors(), x)
+    # merges race the appends, so the segment sizes depend on timing;
+    # what compact() guarantees is that no tier has fanout segments left
+    assert store._pick_run() is None
+    assert len(store.segment_names()) < 16
+
+    # merging in line, 16 single-row appends end as one segment
+    serial = EmbeddingStore(str(tmp_path / "serial"), dim=8, fanout=2, background=False)
+    for i in range(16):
+        serial.append(x[i], [{"i": i}])
+    assert len(serial.segment_names()) == 1
+    np.testing.assert_array_equal(serial.vectors(), x)
+
+
+def test_crash_before_manifest_leaves_bank_intact(tmp_path, monkeypatch):
+    store = EmbeddingStore(str(tmp_path), dim=8, background=False)
+    store.append(_rows(2), [{}, {}])
+
+    def boom():
+        raise OSError("disk full")
+    monkeypatch.setattr(store, "_write_manifest", boom)
+    with pytest.raises(OSError):
+        store.append(_rows(3), [{}, {}, {}])
+
+    assert len(EmbeddingStore(str(tmp_path))) == 2
+
+
+def test_refresh_sees_other_writers(tmp_path):
+    writer = EmbeddingStore(str(tmp_path), dim=8, background=False)
+    reader = EmbeddingStore(str(tmp_path))
+    x = _rows(3)
+    writer.append(x[:1], [{"i": 0}])
+    writer.append(x[1:], [{"i": 1}, {"i": 2}])
+
+    new = reader.refresh()
+    np.testing.assert_array_equal(np.concatenate(new), x)
+    assert [m["i"] for m in reader.meta] == [0, 1, 2]
+    assert reader.refresh() == []
+
+
+def test_legacy_bank_is_migrated(tmp_path):
+    legacy = _rows(2).astype(np.float64)
+    np.save(tmp_path / "embeddings.npy", legacy)
+    with open(tmp_path / "meta.json", "w") as f:
+        json.dump([{"path": "a.jpg", "label": "x"}, {"path": "b.jpg", "label": "y"}], f)
+
+    store = EmbeddingStore(str(tmp_path), dim=8)
+    assert len(store) == 2
+    np.testing.assert_allclose(store.vectors(), legacy, rtol=1e-6)
+    assert store.meta[1]["path"] == "b.jpg"
+
+
+def test_rejects_mismatched_input(tmp_path):
+    store = EmbeddingStore(str(tmp_path), dim=8)
+    with pytest.raises(ValueError):
+        store.append(_rows(2), [{}])
+    with pytest.raises(ValueError):
+        store.append(_rows(1, dim=4), [{}])
+
+
+def test_merged_segment_is_written_in_chunks(tmp_path):
+    parts = [_rows(5), _rows(7)[2:], _rows(1)]
+    path = str(tmp_path / "merged.npy")
+    _atomic_concat_npy(path, parts, chunk_rows=3)
+
+    np.testing.assert_array_equal(np.load(path, mmap_mode="r"), np.concatenate(parts))
+    assert os.listdir(tmp_path) == ["merged.npy"]
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.executors import BoundedExecutor, Overloaded
+
+
+def _wait_until(condition, timeout=5.0):
+    # pending is decremented in a done-callback, which may run just after
+    # result() returns
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+def test_rejects_work_beyond_queue_depth():
+    pool = BoundedExecutor("test", max_workers=1, max_queue=1)
+    gate = threading.Event()
+
+    running = pool.submit(gate.wait)
+    queued = pool.submit(gate.wait)
+    with pytest.raises(Overloaded):
+        pool.submit(gate.wait)
+
+    gate.set()
+    running.result(timeout=5)
+    queued.result(timeout=5)
+    assert _wait_until(lambda: pool.pending == 0)
+
+    # capacity is released once work finishes
+    assert pool.submit(lambda: 42).result(timeout=5) == 42
+    pool.shutdown()
+
+
+def test_run_does_not_block_event_loop():
+    pool = BoundedExecutor("test", max_workers=1, max_queue=0)
+    gate = threading.Event()
+
+    async def main():
+        task = asyncio.ensure_future(pool.run(gate.wait, 5))
+        # the loop stays responsive while the pool is busy
+        await asyncio.sleep(0.01)
+        assert not task.done()
+        gate.set()
+        return await task
+
+    assert asyncio.run(main()) is True
+    pool.shutdown()
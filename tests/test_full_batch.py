@@ -0,0 +1,196 @@
+import io
+import json
+import threading
+import zipfile
+
+import numpy as np
+import pytest
+
+pytest.importorskip("httpx")
+cv2 = pytest.importorskip("cv2")
+from fastapi.testclient import TestClient
+
+import backend.main as main
+import backend.routers.full_router as full_router
+from backend.cache import ResultCache
+from backend.registry import registry
+from cv_engine.image_io import DecodedImage
+from text_engine.caption_analysis import CaptionAnalysisResult
+
+
+class StubDetector:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def load(self, image):
+        return self.load_batch([image])[0]
+
+    def load_batch(self, images):
+        self.batch_sizes.append(len(images))
+        return [
+            {"boxes": [], "classes": [], "confidences": [], "main_box": [0, 0, im.width // 2, im.height // 2],
+             "image_size": (im.width, im.height)}
+            for im in images
+        ]
+
+
+class StubClip:
+    def embed_image(self, image):
+        return self.embed_images([image])[0]
+
+    def embed_images(self, images):
+        return [np.ones(512, dtype=np.float32) / np.sqrt(512) for _ in images]
+
+
+class StubTrend:
+    def similarity_from_embedding(self, emb):
+        return 0.4
+
+
+class StubAesthetic:
+    def score_from_embedding(self, emb):
+        return 0.6
+
+
+class StubCaption:
+    def analyze(self, caption):
+        return self.analyze_batch([caption])[0]
+
+    def analyze_batch(self, captions):
+        return [CaptionAnalysisResult(0.5, 0.0, 0.0, len(c) / 100.0, 0.0, 0.3) for c in captions]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """TestClient with stub model engines and an empty result cache."""
+    factories = dict(registry._factories)
+    detector = StubDetector()
+    registry.register("detector", lambda: detector)
+    registry.register("clip", StubClip)
+    registry.register("trend", StubTrend)
+    registry.register("aesthetic", StubAesthetic)
+    registry.register("caption", StubCaption)
+    monkeypatch.setattr(full_router, "result_cache", ResultCache(max_bytes=0))
+    monkeypatch.setattr(main.settings, "warmup", False)
+    with TestClient(main.app) as c:
+        c.detector = detector
+        yield c
+    for name, factory in factories.items():
+        registry.register(name, factory)
+
+
+def _jpeg(seed):
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 255, (48, 64, 3), dtype=np.uint8)
+    return cv2.imencode(".jpg", img)[1].tobytes()
+
+
+def _lines(response):
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return sorted((json.loads(line) for line in response.text.splitlines()), key=lambda r: r["index"])
+
+
+def _zip(members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def test_multipart_items_stream_one_line_each(client):
+    files = [("files", (f"{i}.jpg", _jpeg(i), "image/jpeg")) for i in range(3)]
+    r = client.post("/full/batch", files=files, data={"captions": ["one", "two", "three"]})
+
+    rows = _lines(r)
+    assert [row["name"] for row in rows] == ["0.jpg", "1.jpg", "2.jpg"]
+    for row in rows:
+        assert "error" not in row
+        assert "virality" in row and "dominant_colors" in row
+    # captions are matched to files by position
+    assert rows[2]["caption_analysis"]["length_score"] == pytest.approx(len("three") / 100.0)
+
+
+def test_zip_with_captions(client):
+    archive = _zip({
+        "a.jpg": _jpeg(1),
+        "dir/b.jpg": _jpeg(2),
+        "captions.json": json.dumps({"a.jpg": "hello there"}),
+    })
+    r = client.post("/full/batch", files={"archive": ("items.zip", archive, "application/zip")})
+
+    rows = _lines(r)
+    assert [row["name"] for row in rows] == ["a.jpg", "dir/b.jpg"]
+    assert rows[0]["caption_analysis"]["length_score"] == pytest.approx(len("hello there") / 100.0)
+    assert rows[1]["caption_analysis"]["length_score"] == 0.0
+
+
+def test_bad_image_fails_only_its_own_item(client):
+    files = [
+        ("files", ("good.jpg", _jpeg(1), "image/jpeg")),
+        ("files", ("bad.jpg", b"not an image", "image/jpeg")),
+    ]
+    rows = _lines(client.post("/full/batch", files=files))
+
+    assert "error" not in rows[0]
+    assert rows[1]["name"] == "bad.jpg" and rows[1]["error"]
+
+
+def test_items_are_processed_in_chunks(client, monkeypatch):
+    monkeypatch.setattr(full_router.settings, "full_batch_chunk", 2)
+    files = [("files", (f"{i}.jpg", _jpeg(i), "image/jpeg")) for i in range(5)]
+
+    rows = _lines(client.post("/full/batch", files=files))
+    assert len(rows) == 5
+    assert client.detector.batch_sizes == [2, 2, 1]
+
+
+def test_rejects_too_many_items(client, monkeypatch):
+    monkeypatch.setattr(full_router.settings, "full_batch_limit", 2)
+    files = [("files", (f"{i}.jpg", _jpeg(i), "image/jpeg")) for i in range(3)]
+
+    r = client.post("/full/batch", files=files)
+    assert r.status_code == 413
+
+
+@pytest.mark.parametrize("captions", [b"[1, 2]", b"{not json"])
+def test_rejects_bad_captions_json(client, captions):
+    archive = _zip({"a.jpg": _jpeg(1), "captions.json": captions})
+    r = client.post("/full/batch", files={"archive": ("items.zip", archive, "application/zip")})
+    assert r.status_code == 400
+
+
+def test_rejects_empty_and_non_zip_input(client):
+    assert client.post("/full/batch").status_code == 400
+    r = client.post("/full/batch", files={"archive": ("items.zip", b"plain text", "application/zip")})
+    assert r.status_code == 400
+
+
+def test_decoding_and_lazy_engines_stay_off_the_event_loop(client, monkeypatch):
+    threads = []
+
+    def record(build):
+        def factory():
+            threads.append(threading.current_thread().name)
+            return build()
+        return factory
+
+    # built on first use, as with VIRALENS_WARMUP=0
+    registry.register("trend", record(StubTrend))
+    registry.register("aesthetic", record(StubAesthetic))
+    real_from_bytes = DecodedImage.from_bytes
+
+    def from_bytes(data):
+        threads.append(threading.current_thread().name)
+        return real_from_bytes(data)
+
+    monkeypatch.setattr(DecodedImage, "from_bytes", staticmethod(from_bytes))
+
+    files = [("files", (f"{i}.jpg", _jpeg(i), "image/jpeg")) for i in range(2)]
+    assert len(_lines(client.post("/full/batch", files=files))) == 2
+    r = client.post("/full/full/", files={"file": ("x.jpg", _jpeg(9), "image/jpeg")}, data={"caption": "hi"})
+    assert r.status_code == 200, r.text
+
+    assert len(threads) == 5  # three decodes, one trend and one aesthetic build
+    assert all(name.startswith("viralens-") for name in threads), threads
@@ -0,0 +1,48 @@
+import itertools
+
+import cv2
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import synthetic_image, synthetic_scene
+from cv_engine.geometry import _mean_ssim, symmetry_score, clutter_score
+
+
+def test_mean_ssim_matches_skimage():
+    skimage_metrics = pytest.importorskip("skimage.metrics")
+    gray = cv2.cvtColor(synthetic_image(300, 400, seed=2), cv2.COLOR_BGR2GRAY)
+    other = cv2.GaussianBlur(gray, (5, 5), 0)
+
+    for a, b in [(gray, cv2.flip(gray, 1)), (gray, other)]:
+        expected = skimage_metrics.structural_similarity(
+            a.astype("float32"), b.astype("float32"), data_range=255.0
+        )
+        assert _mean_ssim(a, b) == pytest.approx(expected, abs=1e-5)
+
+    # mirror shortcut gives the same value as passing the flip explicitly
+    assert _mean_ssim(gray) == pytest.approx(_mean_ssim(gray, cv2.flip(gray, 1)), abs=1e-6)
+
+
+def test_scores_stable_across_resolutions():
+    # same scene, same 4:3 aspect, increasing resolution
+    sizes = [(1536, 2048), (2250, 3000), (3000, 4000)]
+    scores = [
+        (symmetry_score(img), clutter_score(img))
+        for img in (synthetic_scene(h, w) for h, w in sizes)
+    ]
+
+    for (sym_a, clt_a), (sym_b, clt_b) in itertools.combinations(scores, 2):
+        assert abs(sym_a - sym_b) < 0.03
+        assert clt_b == pytest.approx(clt_a, rel=0.2)
+
+
+def test_small_images_use_full_resolution():
+    img = synthetic_scene(240, 320)
+    assert symmetry_score(img) == symmetry_score(img, max_side=None)
+    assert clutter_score(img) == clutter_score(img, max_side=None)
+
+
+def test_tiny_images_do_not_crash():
+    img = np.zeros((4, 4, 3), np.uint8)
+    assert symmetry_score(img) == 1.0
+    assert clutter_score(img) == 0.0
@@ -0,0 +1,75 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import synthetic_scene
+from cv_engine.features import ImageFeatures, as_features
+from cv_engine.geometry import brightness_score, contrast_score, clutter_score, symmetry_score
+from cv_engine.color import ColorAnalyzer
+from cv_engine.image_io import DecodedImage
+
+
+def test_features_are_computed_once():
+    feats = ImageFeatures(synthetic_scene(600, 800))
+
+    assert feats.gray is feats.gray
+    assert feats.working_gray(256) is feats.working_gray(256)
+    assert feats.edges(256) is feats.edges(256)
+    assert feats.pyramid(2).shape == (150, 200)
+    assert np.shares_memory(feats.rgb, feats.bgr)
+
+
+def test_working_sizes_match_arrays():
+    feats = ImageFeatures(synthetic_scene(600, 800))
+
+    for max_side in (None, 256, 1024):
+        w, h = feats.working_size(max_side)
+        assert feats.working_gray(max_side).shape == (h, w)
+    for budget in (None, 10000, 10 ** 6):
+        w, h = feats.downsampled_size(budget)
+        assert feats.downsampled(budget).shape[:2] == (h, w)
+    assert feats.working_size(256) == (256, 192)
+
+
+def test_concurrent_access_computes_once():
+    feats = ImageFeatures(np.zeros((10, 10, 3), np.uint8))
+    calls = []
+    barrier = threading.Barrier(8)
+
+    def compute():
+        calls.append(1)
+        return object()
+
+    def worker():
+        barrier.wait()
+        feats._get("expensive", compute)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+
+
+def test_metrics_match_plain_arrays():
+    img = synthetic_scene(300, 400, seed=4)
+    feats = as_features(img)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+    assert contrast_score(feats) == pytest.approx(np.std(gray) / 128.0)
+    assert brightness_score(feats) == pytest.approx(np.mean(img) / 255.0)
+    assert symmetry_score(feats) == symmetry_score(img)
+    assert clutter_score(feats) == clutter_score(img)
+
+    color = ColorAnalyzer()
+    assert color.contrast(feats) == pytest.approx(contrast_score(img))
+    assert color.brightness(feats) == pytest.approx(brightness_score(img))
+
+
+def test_decoded_image_shares_its_features():
+    ok, buf = cv2.imencode(".png", synthetic_scene(60, 80))
+    image = DecodedImage.from_bytes(buf.tobytes())
+    assert as_features(image) is image.features
@@ -0,0 +1,27 @@
+import cv2
+import numpy as np
+import pytest
+
+from cv_engine.image_io import DecodedImage
+
+
+def test_decode_once_from_bytes():
+    bgr = np.zeros((40, 60, 3), np.uint8)
+    bgr[..., 0] = 255  # blue
+    ok, buf = cv2.imencode(".png", bgr)
+    assert ok
+
+    image = DecodedImage.from_bytes(buf.tobytes())
+
+    assert (image.width, image.height) == (60, 40)
+    assert np.array_equal(image.bgr, bgr)
+    # RGB is a view over the same pixels
+    assert np.shares_memory(image.rgb, image.bgr)
+    assert image.to_pil().getpixel((0, 0)) == (0, 0, 255)
+
+
+def test_invalid_bytes_raise():
+    with pytest.raises(ValueError):
+        DecodedImage.from_bytes(b"not an image")
+    with pytest.raises(ValueError):
+        DecodedImage.from_bytes(b"")
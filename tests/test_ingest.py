@@ -0,0 +1,64 @@
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("open_clip")
+
+import cv_engine.trend_similarity as ts
+from cv_engine.ingest import Ingester, iter_source, main
+
+
+def _images(directory, colors):
+    directory.mkdir(exist_ok=True)
+    for i, bgr in enumerate(colors):
+        cv2.imwrite(str(directory / f"img{i:02d}.png"), np.full((16, 16, 3), bgr, np.uint8))
+
+
+def test_ingest_dedupes_and_resumes(tmp_path, fake_clip):
+    images = tmp_path / "images"
+    _images(images, [(i * 20, 0, 0) for i in range(10)] + [(0, 0, 0)])  # last is a duplicate
+    (images / "broken.jpg").write_bytes(b"not an image")
+    bank = tmp_path / "bank"
+
+    trend = ts.TrendSimilarity(bank_dir=str(bank), device="cpu", index="exact")
+    stats = Ingester(trend, batch_size=4, workers=0).run(iter_source(str(images), "viral"))
+
+    assert (stats.added, stats.duplicates, stats.failed) == (10, 1, 1)
+    assert len(trend.index) == 10
+    assert len({m["sha256"] for m in trend.meta}) == 10
+
+    # the failure is listed with its error, as a manifest for a retry
+    failed = [json.loads(line) for line in (bank / "ingest-failed.jsonl").read_text().splitlines()]
+    assert [f["path"] for f in failed] == [str(images / "broken.jpg")]
+    assert failed[0]["label"] == "viral" and failed[0]["error"]
+
+    # second run: everything else comes from the checkpoint, the failed
+    # file is tried again
+    _images(images, [(0, 0, 200 + i) for i in range(3)])  # overwrite three files
+    again = ts.TrendSimilarity(bank_dir=str(bank), device="cpu", index="exact")
+    stats = Ingester(again, batch_size=4, workers=0).run(iter_source(str(images), "viral"))
+    assert stats.resumed == 8
+    assert stats.failed == 1
+    assert stats.added == 3
+    assert len(again.store) == 13
+
+
+def test_ingest_with_worker_processes_and_manifest(tmp_path, fake_clip):
+    images = tmp_path / "images"
+    _images(images, [(0, i * 30, 0) for i in range(6)])
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text("\n".join(
+        json.dumps({"path": f"images/img{i:02d}.png", "label": f"topic{i % 2}"}) for i in range(6)
+    ))
+    bank = tmp_path / "bank"
+
+    summary = main([str(manifest), "--bank-dir", str(bank), "--workers", "2", "--batch-size", "4"])
+    assert summary["added"] == 6 and summary["images_per_sec"] > 0
+
+    trend = ts.TrendSimilarity(bank_dir=str(bank), device="cpu", index="exact")
+    assert [m["label"] for m in trend.meta] == ["topic0", "topic1"] * 3
+    top = trend.top_k(np.full((16, 16, 3), (0, 150, 0), np.uint8), k=1)
+    assert top[0]["path"].endswith("img05.png")
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("cv2")
+
+from benchmarks import loadtest
+from backend.registry import registry
+
+
+@pytest.fixture
+def restore_registry():
+    """install_stubs() replaces engines in the global registry; put them back."""
+    factories = dict(registry._factories)
+    yield
+    for name, factory in factories.items():
+        registry.register(name, factory)
+
+
+def test_parse_specs():
+    assert loadtest.parse_mix("full=6,caption") == {"full": 6.0, "caption": 1.0}
+    assert loadtest.parse_stub_ms("detector=5+20,clip=10") == {"detector": (5.0, 20.0), "clip": (0.0, 10.0)}
+
+
+def test_workload_unique_requests_differ_but_decode():
+    from cv_engine.image_io import DecodedImage
+
+    workload = loadtest.Workload({"full": 1}, size="vga", images=1, unique=True)
+    _, path, a = workload.next()
+    _, _, b = workload.next()
+    assert path == "/full/full/"
+    assert a["files"]["file"][1] != b["files"]["file"][1]
+    assert a["data"]["caption"] != b["data"]["caption"]
+    assert DecodedImage.from_bytes(b["files"]["file"][1]).width == 640
+
+    with pytest.raises(ValueError):
+        loadtest.Workload({"nope": 1}, size="vga", images=1)
+
+
+def test_stub_run_reports_throughput_latency_and_memory(tmp_path, monkeypatch, restore_registry):
+    pytest.importorskip("torch")
+    scratch = tmp_path / "scratch"
+    scratch.mkdir()
+    monkeypatch.setattr(loadtest.tempfile, "tempdir", str(scratch))
+    out = tmp_path / "report.json"
+    loadtest.main([
+        "--stub", "--stub-ms", "detector=1,clip=1,caption=1", "--bank-size", "100",
+        "--mix", "full=2,caption=1,virality=1", "--size", "vga", "--images", "2", "--unique",
+        "--concurrency", "4", "--duration", "1.5", "--interval", "0.5", "--out", str(out),
+    ])
+    report = json.loads(out.read_text())
+    assert list(scratch.iterdir()) == []  # the stub trend bank is gone
+
+    summary = report["summary"]
+    assert summary["ok"] == summary["requests"] > 0
+    assert summary["throughput_rps"] > 0
+    lat = summary["latency"]
+    assert 0 < lat["p50_ms"] <= lat["p95_ms"] <= lat["p99_ms"] <= lat["max_ms"]
+    assert set(report["routes"]) == {"full", "caption", "virality"}
+    assert sum(r["requests"] for r in report["routes"].values()) == summary["requests"]
+
+    assert len(report["timeline"]) >= 3
+    assert report["memory"]["processes"] == 1
+    assert report["memory"]["rss_peak_mb"] > 0
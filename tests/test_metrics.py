@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from backend.cache import ResultCache
+from backend.metrics import MetricsRegistry, cache_lookups, stage_latency
+from backend.pipeline import StageGraph
+
+
+def test_render_counters_and_histograms():
+    reg = MetricsRegistry()
+    requests = reg.counter("requests_total", "Requests.", ("route",))
+    latency = reg.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    reg.gauge("depth", "Depth.", ("queue",), lambda: [(("cpu",), 3), (("gpu",), None)])
+
+    requests.inc(route="/a")
+    requests.inc(2, route="/a")
+    latency.observe(0.05, route="/a")
+    latency.observe(0.5, route="/a")
+    latency.observe(5.0, route="/a")
+
+    text = reg.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/a"} 3.0' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+    assert 'latency_seconds_sum{route="/a"} 5.55' in text
+    assert 'depth{queue="cpu"} 3.0' in text
+    assert "gpu" not in text  # None values are skipped
+
+
+def test_wrong_labels_are_rejected():
+    reg = MetricsRegistry()
+    c = reg.counter("c_total", "C.", ("stage",))
+    with pytest.raises(ValueError):
+        c.inc(route="/a")
+    with pytest.raises(ValueError):
+        reg.counter("c_total", "again")
+
+
+def test_stage_graph_records_stage_latency():
+    async def fast():
+        return 1
+
+    before = stage_latency.count(stage="metrics_test_stage")
+    graph = StageGraph().add("metrics_test_stage", fast)
+    asyncio.run(graph.run())
+    assert stage_latency.count(stage="metrics_test_stage") == before + 1
+
+
+def test_plain_cache_gets_are_counted_once():
+    cache = ResultCache()
+
+    async def main():
+        await cache.get("v1:metrics_test:a")
+        await cache.put("v1:metrics_test:a", 1)
+        await cache.get("v1:metrics_test:a")
+        # get_or_compute counts its own lookup, not the get() inside it
+        await cache.get_or_compute("v1:metrics_test:a", None)
+
+    asyncio.run(main())
+    assert cache_lookups.value(stage="metrics_test", source="miss") == 1
+    assert cache_lookups.value(stage="metrics_test", source="memory") == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_metrics_endpoint():
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+    import backend.main as main
+
+    client = TestClient(main.app)
+    client.get("/healthz")
+    r = client.get("/metrics")
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    text = r.text
+    assert 'viralens_http_requests_total{method="GET",route="/healthz",status="200"}' in text
+    assert 'viralens_http_request_duration_seconds_count{method="GET",route="/healthz"}' in text
+    assert 'viralens_queue_depth{queue="inference"} 0' in text
+    assert 'viralens_engine_loaded{engine="detector"}' in text
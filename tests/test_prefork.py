@@ -0,0 +1,71 @@
+import gc
+import json
+import os
+
+import pytest
+
+torch = pytest.importorskip("torch")
+if not hasattr(os, "fork") or not os.path.exists("/proc/self/smaps_rollup"):
+    pytest.skip("needs fork() and /proc smaps", allow_module_level=True)
+
+import backend.serve as serve
+from backend.registry import ModelRegistry
+
+WEIGHTS = 64 * 2**20
+
+
+class FakeModelEngine:
+    def __init__(self):
+        torch.manual_seed(0)
+        self.model = torch.nn.Linear(4096, 4096)  # 64 MB of float32 weights
+
+    def predict(self, x):
+        with torch.no_grad():
+            return self.model(x)
+
+
+@pytest.fixture
+def parent(monkeypatch):
+    reg = ModelRegistry()
+    reg.register("fake", FakeModelEngine)
+    monkeypatch.setattr(serve, "registry", reg)
+    serve.prepare_parent()
+    yield reg
+    gc.unfreeze()
+
+
+def _in_worker(fn):
+    """Run fn in a forked child; return what it wrote as JSON."""
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read)
+        with os.fdopen(write, "w") as f:
+            f.write(json.dumps(fn()))
+        os._exit(0)
+    os.close(write)
+    with os.fdopen(read) as f:
+        out = json.loads(f.read())
+    os.waitpid(pid, 0)
+    return out
+
+
+def test_weights_are_moved_to_shared_memory(parent):
+    engine = parent.get("fake")
+    assert all(p.is_shared() for p in engine.model.parameters())
+    assert serve.share_weights(engine) == 0  # already shared
+
+
+def test_forked_worker_shares_weights(parent):
+    engine = parent.get("fake")
+    want = engine.predict(torch.ones(1, 4096)).sum().item()
+
+    def work():
+        got = engine.predict(torch.ones(8, 4096))[0].sum().item()
+        return {"got": got, **serve.worker_memory()}
+
+    mem = _in_worker(work)
+    assert mem["got"] == pytest.approx(want, rel=1e-5)
+    # the weights count towards the worker's RSS but not its private memory
+    assert mem["rss"] - mem["private"] >= WEIGHTS
+    assert mem["private"] < WEIGHTS / 2
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from backend.pipeline import StageGraph
+from backend.profiling import RequestProfile, StackSampler
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_disabled_profile_returns_nothing():
+    prof = RequestProfile()
+    with prof.stage("decode"):
+        pass
+    assert not prof.enabled
+    assert prof.finish() is None
+    assert "decode" in prof.stages_ms  # still timed for the metrics
+
+
+def test_timings_merge_graph_run():
+    async def stage():
+        return 1
+
+    prof = RequestProfile("timings")
+    with prof.stage("decode"):
+        run = asyncio.run(StageGraph().add("detect", stage).run())
+    prof.add_run(run)
+    out = prof.finish()
+
+    assert out["mode"] == "timings"
+    assert set(out["stages_ms"]) == {"decode", "detect"}
+    assert out["total_ms"] >= out["stages_ms"]["decode"]
+    assert "profile_file" not in out
+
+
+def test_sampler_writes_collapsed_stacks(tmp_path):
+    import threading
+
+    sampler = StackSampler(interval=0.001)
+    sampler.start()
+    worker = threading.Thread(target=_busy, args=(0.2,), name="busy-worker")
+    worker.start()
+    worker.join()
+    sampler.stop()
+
+    path = sampler.write(os.path.join(tmp_path, "p.folded"))
+    lines = open(path).read().splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+    assert any(line.startswith("busy-worker;") and "_busy (test_profiling.py" in line for line in lines)
+
+
+def test_profile_query_flag(tmp_path, monkeypatch):
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+    import backend.main as main
+    from backend.registry import ModelRegistry
+
+    class Scores:
+        def to_dict(self):
+            return dict(sentiment_score=0.5, hook_score=0.0, cta_score=0.0,
+                        length_score=0.0, emoji_score=0.0, overall_caption_score=0.2)
+
+    class Caption:
+        def analyze_batch(self, captions):
+            _busy(0.05)
+            return [Scores() for _ in captions]
+
+    reg = ModelRegistry()
+    reg.register("caption", Caption)
+    import backend.batching as batching
+    monkeypatch.setattr(batching, "registry", reg)
+    monkeypatch.setattr(main, "registry", reg)
+    monkeypatch.setattr(main.settings, "warmup", False)
+    client = TestClient(main.app)
+
+    plain = client.post("/caption/", json={"caption": "hello"}).json()
+    assert "profile" not in plain
+
+    monkeypatch.setattr(main.settings, "profile_dir", None)
+    r = client.post("/caption/?profile=sample", json={"caption": "hello"})
+    assert r.status_code == 400
+
+    monkeypatch.setattr(main.settings, "profile_dir", str(tmp_path))
+    prof = client.post("/caption/?profile=sample", json={"caption": "hello again"}).json()["profile"]
+    assert prof["mode"] == "sample"
+    assert prof["stages_ms"]["caption"] >= 50
+    assert os.path.dirname(prof["profile_file"]) == str(tmp_path)
+    assert prof["profile_file"].endswith(".folded") and prof["samples"] > 0
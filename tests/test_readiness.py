@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient
+
+import backend.main as main
+from backend.registry import ModelRegistry
+
+
+@pytest.fixture
+def slow_registry(monkeypatch):
+    """Every engine blocks loading until the returned event is set."""
+    release = threading.Event()
+
+    def factory():
+        release.wait(5)
+        return object()
+
+    reg = ModelRegistry()
+    for name in main.ANALYSIS_ENGINES:
+        reg.register(name, factory)
+    monkeypatch.setattr(main, "registry", reg)
+    monkeypatch.setattr(main.settings, "warmup", True)
+    yield reg, release
+    release.set()
+
+
+def test_probes_and_warming_up_routes(slow_registry):
+    reg, release = slow_registry
+
+    with TestClient(main.app) as client:
+        assert client.get("/healthz").json() == {"status": "ok"}
+
+        r = client.get("/readyz")
+        assert r.status_code == 503
+        assert r.json()["status"] == "warming_up"
+        assert set(r.json()["engines"]) == set(main.ANALYSIS_ENGINES)
+
+        r = client.post("/caption/", json={"caption": "hello"})
+        assert r.status_code == 503
+        assert r.json() == {"detail": "warming_up", "engines": ["caption"]}
+        assert "Retry-After" in r.headers
+
+        release.set()
+        for name in main.ANALYSIS_ENGINES:
+            reg.get(name)
+        r = client.get("/readyz")
+        assert r.status_code == 200
+        assert set(r.json()["engines"].values()) == {"loaded"}
+
+
+def test_chat_without_api_key_is_unavailable(monkeypatch):
+    import backend.routers.chat_router as chat_router
+
+    monkeypatch.delenv("GROQ_API_KEY", raising=False)
+    monkeypatch.setattr(chat_router, "_chatbot", None)
+    monkeypatch.setattr(main.settings, "warmup", False)
+
+    with TestClient(main.app) as client:
+        r = client.post("/chatbot/chat/", json={"message": "hi"})
+    assert r.status_code == 503
+    assert "GROQ_API_KEY" in r.json()["detail"]
@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from backend.registry import ModelRegistry, WarmingUp
+
+
+def test_engine_is_built_once_across_threads():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return object()
+
+    reg = ModelRegistry()
+    reg.register("engine", factory)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(reg.get("engine"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+
+    info = reg.stats()["engine"]
+    assert info["loaded"] is True
+    assert info["load_seconds"] is not None
+
+
+def test_warmup_records_errors():
+    def broken():
+        raise RuntimeError("no weights")
+
+    reg = ModelRegistry()
+    reg.register("broken", broken)
+    stats = reg.warmup()
+
+    assert stats["broken"]["loaded"] is False
+    assert "no weights" in stats["broken"]["error"]
+
+
+def test_background_warmup_reports_loading_until_done():
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return object()
+
+    reg = ModelRegistry()
+    reg.register("slow", slow)
+    reg.register("lazy", object)
+    thread = reg.warmup_in_background(["slow"])
+
+    assert reg.state("slow") in ("pending", "loading")
+    assert reg.state("lazy") == "unloaded"
+    assert not reg.ready()
+    with pytest.raises(WarmingUp) as exc:
+        reg.require(["slow", "lazy"])
+    assert exc.value.engines == ["slow"]
+
+    release.set()
+    thread.join(5)
+    assert reg.state("slow") == "loaded"
+    assert reg.ready()
+    reg.require(["slow", "lazy"])
+
+
+def test_failed_warmup_is_not_ready():
+    def broken():
+        raise RuntimeError("no weights")
+
+    reg = ModelRegistry()
+    reg.register("broken", broken)
+    reg.warmup_in_background().join(5)
+
+    assert reg.state("broken") == "failed"
+    assert not reg.ready()
+    reg.require(["broken"])  # not loading: callers get the real error on use
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from backend.cache import ResultCache, MEMORY, DISK, MISS, COALESCED
+
+
+def test_concurrent_requests_share_one_computation():
+    cache = ResultCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"main_box": [1, 2, 3, 4]}
+
+    async def main():
+        return await asyncio.gather(*[cache.get_or_compute("k", compute) for _ in range(5)])
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert all(value == {"main_box": [1, 2, 3, 4]} for value, _ in results)
+    assert sorted(source for _, source in results) == [COALESCED] * 4 + [MISS]
+
+    _, source = asyncio.run(cache.get_or_compute("k", compute))
+    assert source == MEMORY
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_is_bounded_by_bytes():
+    cache = ResultCache(max_bytes=300)
+
+    async def main():
+        for i in range(10):
+            await cache.put(f"k{i}", b"x" * 100)
+
+    asyncio.run(main())
+    stats = cache.stats()
+    assert stats["bytes"] <= 300
+    assert stats["entries"] < 10
+    # most recent entries survive
+    assert asyncio.run(cache.get("k9"))[0]
+    assert not asyncio.run(cache.get("k0"))[0]
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    first = ResultCache(disk_dir=str(tmp_path))
+    asyncio.run(first.put("v1:colors:abc", [[0.1, 0.2, 0.3]]))
+
+    second = ResultCache(disk_dir=str(tmp_path))
+    found, value, source = asyncio.run(second.get("v1:colors:abc"))
+    assert found and source == DISK
+    assert value == [[0.1, 0.2, 0.3]]
+
+
+def test_failures_are_not_cached():
+    cache = ResultCache()
+
+    async def boom():
+        raise RuntimeError("model failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_compute("k", boom))
+    assert not asyncio.run(cache.get("k"))[0]
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(max_bytes=0, disk_dir=str(tmp_path), disk_max_bytes=2500)
+    blob = b"x" * 1000
+
+    async def main():
+        await cache.put("v1:colors:a", blob)
+        await cache.put("v1:colors:b", blob)
+        assert (await cache.get("v1:colors:a"))[0]  # a is now the most recent
+        await cache.put("v1:colors:c", blob)
+
+    asyncio.run(main())
+    assert cache.stats()["disk_bytes"] <= 2500
+    assert asyncio.run(cache.get("v1:colors:a"))[0]
+    assert not asyncio.run(cache.get("v1:colors:b"))[0]
+    assert asyncio.run(cache.get("v1:colors:c"))[0]
+
+    # the size cap also applies to entries left by an earlier process
+    smaller = ResultCache(max_bytes=0, disk_dir=str(tmp_path), disk_max_bytes=1500)
+    assert smaller.stats()["disk_entries"] == 1
+
+
+def test_stage_keys_change_with_engine_settings(monkeypatch):
+    from backend.cache import settings, stage_key
+
+    before = stage_key("detect", "abc")
+    assert stage_key("detect", "abc") == before
+    monkeypatch.setattr(settings, "detector_imgsz", settings.detector_imgsz // 2)
+    assert stage_key("detect", "abc") != before
+    assert stage_key("detect", "abc").split(":")[1:] == ["detect", "abc"]
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("open_clip")
+
+from cv_engine.aesthetic import AestheticScorer
+from cv_engine.clip_model import ClipEncoder
+from cv_engine.trend_similarity import TrendSimilarity
+
+
+def test_trend_and_aesthetic_share_one_model(tmp_path, fake_clip):
+    clip = ClipEncoder(device="cpu")
+    trend = TrendSimilarity(bank_dir=str(tmp_path), clip=clip, index="exact")
+    aesthetic = AestheticScorer(clip=clip)
+
+    assert len(fake_clip) == 1
+    assert trend.clip is aesthetic.clip is clip
+
+
+def test_scores_from_embedding_match_direct_scores(tmp_path, fake_clip):
+    clip = ClipEncoder(device="cpu")
+    trend = TrendSimilarity(bank_dir=str(tmp_path), clip=clip, index="exact")
+    aesthetic = AestheticScorer(clip=clip)
+
+    bank = np.full((8, 8, 3), (0, 200, 0), np.uint8)
+    trend.add_embeddings(clip.embed_images([bank]), [{"path": "bank.png", "label": "x"}])
+
+    image = np.full((8, 8, 3), (30, 180, 60), np.uint8)
+    emb = clip.embed_image(image)
+
+    assert trend.similarity_from_embedding(emb) == pytest.approx(trend.similarity_score(image))
+    assert aesthetic.score_from_embedding(emb) == pytest.approx(aesthetic.score(image))
+    assert 0.0 <= aesthetic.score_from_embedding(emb) <= 1.0
+    assert aesthetic.score_from_embeddings([emb, emb]) == [aesthetic.score_from_embedding(emb)] * 2
+
+
+def test_prompt_features_are_precomputed(fake_clip):
+    aesthetic = AestheticScorer(clip=ClipEncoder(device="cpu"))
+    assert aesthetic.text_features.shape == (2, 512)
+    norms = np.linalg.norm(aesthetic.text_features, axis=1)
+    np.testing.assert_allclose(norms, 1.0, rtol=1e-5)
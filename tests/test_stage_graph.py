@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.pipeline import StageGraph
+
+
+async def _sleep(value, seconds=0.1):
+    await asyncio.sleep(seconds)
+    return value
+
+
+def test_independent_stages_overlap():
+    async def rule(detect):
+        return detect + 1
+
+    graph = StageGraph()
+    graph.add("detect", lambda: _sleep(1))
+    graph.add("rule", rule, "detect")
+    graph.add("colors", lambda: _sleep("red"))
+    graph.add("caption", lambda: _sleep("ok"))
+
+    start = time.perf_counter()
+    run = asyncio.run(graph.run())
+    elapsed = time.perf_counter() - start
+
+    assert run.results == {"detect": 1, "rule": 2, "colors": "red", "caption": "ok"}
+    # longest chain (~0.1s), not the sum of all stages (~0.3s)
+    assert elapsed < 0.25
+    assert set(run.timings_ms) == {"detect", "rule", "colors", "caption"}
+
+
+def test_unknown_dependency_is_rejected():
+    graph = StageGraph()
+    with pytest.raises(ValueError):
+        graph.add("rule", lambda detect: _sleep(detect), "detect")
+
+
+def test_stage_errors_propagate():
+    async def boom():
+        raise RuntimeError("stage failed")
+
+    graph = StageGraph()
+    graph.add("slow", lambda: _sleep(1, seconds=5))
+    graph.add("boom", boom)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(graph.run())
@@ -0,0 +1,184 @@
+import cv2
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import synthetic_embeddings
+from cv_engine.ann_index import AutoIndex, ExactIndex, IVFIndex, build_index
+
+
+def _brute_force(bank, queries, k):
+    scores = queries @ bank.T
+    ids = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(scores, ids, axis=1), ids
+
+
+def test_exact_matches_brute_force_across_blocks():
+    bank = synthetic_embeddings(1000, dim=32, n_topics=20)
+    queries = synthetic_embeddings(7, dim=32, seed=3, n_topics=20)
+
+    index = ExactIndex(32, block_size=128)
+    index.add(bank)
+    scores, ids = index.search(queries, k=5)
+    want_scores, want_ids = _brute_force(bank, queries, 5)
+
+    np.testing.assert_allclose(scores, want_scores, rtol=1e-5)
+    assert (ids == want_ids).all()
+
+
+def test_incremental_adds_keep_insertion_ids():
+    bank = synthetic_embeddings(300, dim=16, n_topics=10)
+    index = ExactIndex(16, block_size=64)
+    for row in bank:
+        index.add(row)
+
+    assert len(index) == 300
+    _, ids = index.search(bank[[0, 150, 299]], k=1)
+    assert ids[:, 0].tolist() == [0, 150, 299]
+
+
+def test_add_then_attach_keeps_ids_and_rows():
+    bank = synthetic_embeddings(40, dim=4, n_topics=5)
+    index = ExactIndex(4, block_size=8)
+    index.add(bank[:1])
+    index.attach(bank[1:3])
+    index.add(bank[3:12])
+    index.attach(bank[12:30])
+    index.add(bank[30:])
+
+    assert len(index) == 40
+    np.testing.assert_array_equal(index.vectors(), bank)
+    _, ids = index.search(bank, k=1)
+    assert ids[:, 0].tolist() == list(range(40))
+
+
+def test_k_larger_than_index_is_padded():
+    index = ExactIndex(8)
+    index.add(np.eye(8, dtype=np.float32)[:2])
+    scores, ids = index.search(np.eye(8, dtype=np.float32)[0], k=4)
+
+    assert ids[0].tolist() == [0, 1, -1, -1]
+    assert np.isneginf(scores[0, 2:]).all()
+
+
+def test_ivf_recall_and_incremental_add():
+    bank = synthetic_embeddings(4000, dim=32, n_topics=40)
+    queries = bank[:50] + 0.01
+    index = IVFIndex(32, nlist=32, nprobe=4)
+    index.add(bank[:3000])
+    index.train()
+    index.add(bank[3000:])
+
+    assert len(index) == 4000
+    _, truth = _brute_force(bank, queries, 10)
+    _, found = index.search(queries, k=10)
+    recall = np.mean([len(set(t) & set(f)) / 10 for t, f in zip(truth, found)])
+    assert recall > 0.9
+
+    # probing every cell is exact
+    _, found = index.search(queries, k=10, nprobe=32)
+    assert (found == truth).all()
+
+
+def test_untrained_ivf_searches_exactly():
+    bank = synthetic_embeddings(50, dim=16, n_topics=5)
+    index = IVFIndex(16)
+    index.add(bank)
+    _, ids = index.search(bank[7], k=1)
+    assert ids[0, 0] == 7
+
+
+def test_auto_switches_to_ivf_past_threshold():
+    bank = synthetic_embeddings(600, dim=16, n_topics=10)
+    index = AutoIndex(16, threshold=500)
+    index.add(bank[:500])
+    assert index.kind == "exact"
+
+    index.add(bank[500:])
+    assert index.kind == "ivf"
+    assert len(index) == 600
+    _, ids = index.search(bank[550], k=1)
+    assert ids[0, 0] == 550
+
+
+def test_build_index_rejects_unknown_kind():
+    assert build_index("exact", dim=4).kind == "exact"
+    with pytest.raises(ValueError):
+        build_index("hnsw")
+
+
+def test_trend_top_k_returns_meta(tmp_path, fake_clip):
+    import cv_engine.trend_similarity as ts
+
+    trend = ts.TrendSimilarity(bank_dir=str(tmp_path), device="cpu", index="exact")
+
+    colors = {"red": (0, 0, 255), "green": (0, 255, 0), "blue": (255, 0, 0)}
+    for label, bgr in colors.items():
+        path = str(tmp_path / f"{label}.png")
+        cv2.imwrite(path, np.full((8, 8, 3), bgr, np.uint8))
+        trend.add_to_bank(path, label=label)
+
+    query = np.full((8, 8, 3), (10, 250, 10), np.uint8)
+    top = trend.top_k(query, k=2)
+    assert len(top) == 2 and top[0]["label"] == "green"
+    assert top[0]["score"] >= top[1]["score"]
+    assert top[0]["score"] == pytest.approx(trend.similarity_score(query))
+    assert trend.similarity_scores([query])[0] == pytest.approx(top[0]["score"])
+
+    # the bank reloads into a fresh index
+    again = ts.TrendSimilarity(bank_dir=str(tmp_path), device="cpu", index="auto")
+    assert len(again.index) == 3
+
+    # rows another process appends are attached after the ones added here
+    path = str(tmp_path / "white.png")
+    cv2.imwrite(path, np.full((8, 8, 3), 255, np.uint8))
+    again.add_to_bank(path, label="white")
+    trend.refresh_bank()
+    assert len(trend.index) == 4
+    top = trend.top_k(np.full((8, 8, 3), 250, np.uint8), k=4)
+    assert len(top) == 4 and top[0]["label"] == "white"
+
+
+def test_ivf_trains_itself_and_retrains_as_it_grows():
+    bank = synthetic_embeddings(2000, dim=16, n_topics=20)
+    index = IVFIndex(16, train_after=200, retrain_growth=2.0)
+    index.add(bank[:199])
+    assert not index.is_trained
+
+    index.add(bank[199:250])
+    assert index.is_trained
+    first = index.nlist
+
+    for start in range(250, 2000, 50):
+        index.add(bank[start:start + 50])
+    # retrained at 500 and 1000 vectors, with nlist recomputed
+    assert index.nlist > first
+    assert len(index) == 2000
+    _, ids = index.search(bank[1234], k=1, nprobe=index.nlist)
+    assert ids[0, 0] == 1234
+
+
+def test_ivf_search_during_training_never_fails():
+    import threading
+
+    bank = synthetic_embeddings(3000, dim=16, n_topics=20)
+    index = IVFIndex(16, train_after=10**9)
+    index.add(bank)
+    errors = []
+    stop = threading.Event()
+
+    def search():
+        while not stop.is_set():
+            try:
+                _, ids = index.search(bank[5], k=1, nprobe=1000)
+                assert ids[0, 0] == 5
+            except Exception as e:  # pragma: no cover - the failure being tested
+                errors.append(e)
+                return
+
+    t = threading.Thread(target=search)
+    t.start()
+    for _ in range(3):
+        index.train()
+    stop.set()
+    t.join()
+    assert not errors
@@ -1,15 +1,19 @@
 from __future__ import annotations
+import os
 import re
 import math
 from dataclasses import dataclass
-from typing import Dict, Any
+from typing import Dict, Any, List, Sequence
 
+import numpy as np
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import torch
 
+from cv_engine.backends import check_backend, export_onnx, onnx_cache_path, onnx_session, quantize_int8
+from text_engine.cache import LRUCache
 
-_MODEL_NAME = "cardiffnlp/twitter-roberta-base-sentiment-latest"
 
+_MODEL_NAME = "cardiffnlp/twitter-roberta-base-sentiment-latest"
 
 # ---------- Utilities ----------
 
@@ -63,61 +67,209 @@ class CaptionAnalysisResult:
         }
 
 
+@dataclass
+class CaptionFeatures:
+    """Everything derived from one caption; this is what gets cached."""
+    probs: List[float]         # [negative, neutral, positive]
+    hook_score: float
+    cta_score: float
+    length_score: float
+    emoji_score: float
+
+
 class CaptionAnalyzer:
-    def __init__(self, device: str | None = None):
+    def __init__(
+        self,
+        device: str | None = None,
+        cache_size: int = 4096,
+        cache_ttl: float | None = None,
+        backend: str = "torch",
+        onnx_dir: str | None = None,
+        model_name: str = _MODEL_NAME,
+    ):
+        """
+        backend: how the sentiment model runs
+            "torch"      float model
+            "int8"       torch dynamic int8 quantization of the Linear layers
+            "onnx"       exported graph run by onnxruntime
+            "onnx-int8"  same, with int8 weights (fastest on CPU)
+        onnx_dir: where exported graphs are cached (~/.cache/viralens)
+        """
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-        self.tokenizer = AutoTokenizer.from_pretrained(_MODEL_NAME)
-        self.model = AutoModelForSequenceClassification.from_pretrained(_MODEL_NAME).to(self.device)
+        check_backend("Caption", backend, self.device)
+        self.model_name = model_name
+        self.backend = backend
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_name).to(self.device)
         self.model.eval()
 
+        if backend == "int8":
+            self._logits = self._quantize_torch()
+        elif backend.startswith("onnx"):
+            self._logits = self._load_onnx(onnx_dir, quantize=backend == "onnx-int8")
+        else:
+            self._logits = lambda inputs: self.model(**inputs).logits
+
+        # normalized caption -> CaptionFeatures
+        self.cache = LRUCache(max_size=cache_size, ttl=cache_ttl)
+
+    # ----- backends -----
+
+    def _quantize_torch(self):
+        quantize_int8(self.model)
+        return lambda inputs: self.model(**inputs).logits
+
+    def _onnx_path(self, onnx_dir, quantize):
+        if os.path.isdir(self.model_name):
+            # local checkpoints can change under the same name: never reuse
+            return None
+        return onnx_cache_path(onnx_dir, self.model_name.replace("/", "--"), quantize)
+
+    def _load_onnx(self, onnx_dir, quantize):
+        sample = self.tokenizer(["export sample"], return_tensors="pt")
+        session = onnx_session("Caption", self._onnx_path(onnx_dir, quantize), lambda path: export_onnx(
+            self.model,
+            (sample["input_ids"], sample["attention_mask"]),
+            path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "tokens"},
+                "attention_mask": {0: "batch", 1: "tokens"},
+                "logits": {0: "batch"},
+            },
+            quantize=quantize,
+        ))
+
+        # the torch model is no longer needed
+        self.model = None
+        names = [i.name for i in session.get_inputs()]
+
+        def logits(inputs):
+            feed = {name: inputs[name].cpu().numpy().astype(np.int64) for name in names}
+            return torch.from_numpy(session.run(None, feed)[0])
+        return logits
+
     # ----- public -----
 
     def analyze(self, caption: str) -> CaptionAnalysisResult:
-        caption = (caption or "").strip()
-        if not caption:
-            # handle empty caption gracefully
-            return CaptionAnalysisResult(
-                sentiment_score=0.5,
-                hook_score=0.0,
-                cta_score=0.0,
-                length_score=0.0,
-                emoji_score=0.0,
-                overall_caption_score=0.0,
-            )
-
-        sentiment = self._sentiment_score(caption)
-        hook = self._hook_score(caption)
-        cta = self._cta_score(caption)
-        length = self._length_score(caption)
-        emojis = self._emoji_score(caption)
+        return self.analyze_batch([caption])[0]
+
+    def analyze_batch(self, captions: Sequence[str], batch_size: int = 32) -> List[CaptionAnalysisResult]:
+        """
+        Analyze many captions at once. Cached captions skip the model;
+        the rest run in batched forward passes. Results are returned in
+        input order.
+        """
+        keys = [self._normalize(c) for c in captions]
+
+        features: Dict[str, CaptionFeatures | None] = {}
+        missing: List[str] = []
+        for key in keys:
+            if not key or key in features:
+                continue
+            features[key] = self.cache.get(key)
+            if features[key] is None:
+                missing.append(key)
+
+        for key, probs in zip(missing, self._sentiment_probs(missing, batch_size=batch_size)):
+            features[key] = self._features(key, probs)
+            self.cache.put(key, features[key])
+
+        return [self._build_result(features[k]) if k else self._empty_result() for k in keys]
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+    # ----- internals -----
+
+    @staticmethod
+    def _normalize(caption: str | None) -> str:
+        # collapse whitespace so trivially different submissions share a key
+        return " ".join((caption or "").split())
+
+    def _empty_result(self) -> CaptionAnalysisResult:
+        # handle empty caption gracefully
+        return CaptionAnalysisResult(
+            sentiment_score=0.5,
+            hook_score=0.0,
+            cta_score=0.0,
+            length_score=0.0,
+            emoji_score=0.0,
+            overall_caption_score=0.0,
+        )
+
+    def _features(self, caption: str, probs: List[float]) -> CaptionFeatures:
+        return CaptionFeatures(
+            probs=probs,
+            hook_score=self._hook_score(caption),
+            cta_score=self._cta_score(caption),
+            length_score=self._length_score(caption),
+            emoji_score=self._emoji_score(caption),
+        )
+
+    def _build_result(self, f: CaptionFeatures) -> CaptionAnalysisResult:
+        sentiment = self._probs_to_score(f.probs)
 
         overall = (
             0.40 * sentiment +
-            0.25 * hook +
-            0.15 * cta +
-            0.10 * length +
-            0.10 * emojis
+            0.25 * f.hook_score +
+            0.15 * f.cta_score +
+            0.10 * f.length_score +
+            0.10 * f.emoji_score
         )
 
         return CaptionAnalysisResult(
             sentiment_score=sentiment,
-            hook_score=hook,
-            cta_score=cta,
-            length_score=length,
-            emoji_score=emojis,
+            hook_score=f.hook_score,
+            cta_score=f.cta_score,
+            length_score=f.length_score,
+            emoji_score=f.emoji_score,
             overall_caption_score=float(overall),
         )
 
-    # ----- internals -----
-
     def _sentiment_score(self, caption: str) -> float:
         """Maps sentiment to [0,1], where 1 ~ very positive, 0 ~ very negative."""
-        inputs = self.tokenizer(caption, return_tensors="pt", truncation=True, max_length=128).to(self.device)
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            logits = outputs.logits[0]
+        return self._probs_to_score(self._sentiment_probs([caption])[0])
+
+    def _sentiment_probs(self, captions: Sequence[str], batch_size: int = 32) -> List[List[float]]:
+        """
+        Batched sentiment probabilities. Captions are sorted by token
+        length and split into batches so each batch pads to a similar length.
+        """
+        if not captions:
+            return []
+
+        if len(captions) == 1:
+            order = [0]
+        else:
+            lengths = [
+                len(ids) for ids in
+                self.tokenizer(list(captions), truncation=True, max_length=128)["input_ids"]
+            ]
+            order = sorted(range(len(captions)), key=lengths.__getitem__)
+
+        out: List[List[float]] = [[]] * len(captions)
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            inputs = self.tokenizer(
+                [captions[i] for i in idx],
+                return_tensors="pt",
+                truncation=True,
+                max_length=128,
+                padding=True,
+            ).to(self.device)
+            with torch.no_grad():
+                logits = self._logits(inputs)
+
+            probs = torch.softmax(logits, dim=-1).cpu().numpy().tolist()
+            for i, p in zip(idx, probs):
+                out[i] = p
+        return out
 
-        probs = torch.softmax(logits, dim=-1).cpu().numpy().tolist()
+    @staticmethod
+    def _probs_to_score(probs) -> float:
         # cardiffnlp ordering: [negative, neutral, positive]
         negative, neutral, positive = probs
         score = 0.2 * negative + 0.5 * neutral + 1.0 * positive